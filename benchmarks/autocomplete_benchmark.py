@@ -0,0 +1,64 @@
+"""
+Player name autocomplete benchmark at 500k names.
+
+Builds the in-process PrefixIndex used by /api/player_profiles/autocomplete
+from synthetic names and reports build time, memory and lookup latency.
+Runs without a database.
+
+    python -m benchmarks.autocomplete_benchmark
+"""
+import random
+import statistics
+import string
+import time
+import tracemalloc
+
+from common.prefix_index import PrefixIndex
+
+NAME_COUNT = 500_000
+LOOKUPS = 100_000
+
+
+def random_name() -> str:
+    first = "".join(random.choices(string.ascii_lowercase, k=random.randint(3, 9))).capitalize()
+    last = "".join(random.choices(string.ascii_lowercase, k=random.randint(4, 12))).capitalize()
+    return f"{first} {last}"
+
+
+def run_benchmark():
+    names = [(i, f"{random_name()} {i}") for i in range(1, NAME_COUNT + 1)]
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    index = PrefixIndex()
+    index.build(names)
+    build_seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"Built index of {len(index):,} names in {build_seconds:.2f} s, "
+          f"{current / 2**20:.1f} MiB resident, {peak / 2**20:.1f} MiB peak")
+
+    prefixes = []
+    for _ in range(LOOKUPS):
+        _, name = random.choice(names)
+        prefixes.append(name[:random.randint(1, 6)])
+
+    timings = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        index.search(prefix, 10)
+        timings.append((time.perf_counter() - started) * 1_000_000)
+
+    timings.sort()
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    print(f"search  p50 {statistics.median(timings):7.1f} us   p99 {p99:7.1f} us   max {timings[-1]:7.1f} us")
+
+    started = time.perf_counter()
+    for i in range(1_000):
+        index.add(NAME_COUNT + i + 1, random_name())
+    print(f"add     {(time.perf_counter() - started) * 1000:7.1f} us per insert")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,82 @@
+"""
+Knockout round advancement benchmark for a 1,024-player bracket.
+
+Creates a throwaway knockout tournament, then repeatedly scores the open
+round with one UPDATE and times `tournament_service.advance_knockout_tournament`
+until a winner is recorded. Everything it created is removed afterwards.
+Needs a reachable database configured through `database_info`.
+
+    python -m benchmarks.knockout_advance_benchmark
+"""
+import asyncio
+import time
+
+from data.database import DatabaseConnection
+from services import tournament_service
+
+PLAYER_COUNT = 1024
+NAME_PREFIX = "Benchmark Knockout Player"
+
+
+async def create_tournament() -> int:
+    return await DatabaseConnection.insert_query(
+        "INSERT INTO tournament (title, format, match_format, prize) VALUES ($1, $2, $3, $4)",
+        f"Knockout benchmark {PLAYER_COUNT}",
+        "Knockout",
+        "Score limited",
+        0
+    )
+
+
+async def score_open_round(tournament_id: int):
+    await DatabaseConnection.update_query("""
+        UPDATE match_participants mp
+        SET score = (random() * 10)::int
+        FROM match m
+        WHERE m.id = mp.match_id AND m.tournament_id = $1 AND m.finished = False
+    """, tournament_id)
+
+
+async def cleanup(tournament_id: int):
+    async with DatabaseConnection.transaction() as tx:
+        await tx.update_query("""
+            DELETE FROM match_participants
+            WHERE match_id IN (SELECT id FROM match WHERE tournament_id = $1)
+        """, tournament_id)
+        await tx.update_query("DELETE FROM match WHERE tournament_id = $1", tournament_id)
+        await tx.update_query("DELETE FROM tournament_winners WHERE tournament_id = $1", tournament_id)
+        await tx.update_query("DELETE FROM tournament_participants WHERE tournament_id = $1", tournament_id)
+        await tx.update_query("DELETE FROM tournament WHERE id = $1", tournament_id)
+        await tx.update_query("DELETE FROM player_profiles WHERE full_name LIKE $1", f"{NAME_PREFIX}%")
+
+
+async def run_benchmark():
+    participants = [f"{NAME_PREFIX} {i}" for i in range(PLAYER_COUNT)]
+    tournament_id = await create_tournament()
+    try:
+        if not await tournament_service.create_knockout_matches(tournament_id, participants, "Score limited"):
+            print("Knockout creation failed")
+            return
+
+        print(f"{'round':>6} {'matches':>8} {'seconds':>10}")
+        round_number, matches, total = 1, PLAYER_COUNT // 2, 0.0
+        while True:
+            await score_open_round(tournament_id)
+            started = time.perf_counter()
+            result = await tournament_service.advance_knockout_tournament(tournament_id)
+            elapsed = time.perf_counter() - started
+            total += elapsed
+            print(f"{round_number:>6} {matches:>8} {elapsed:>10.3f}")
+            if result is not True:
+                print(result)
+                break
+            round_number, matches = round_number + 1, matches // 2
+
+        print(f"Bracket of {PLAYER_COUNT} advanced in {total:.3f} s")
+    finally:
+        await cleanup(tournament_id)
+        await DatabaseConnection.close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
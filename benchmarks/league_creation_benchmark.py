@@ -0,0 +1,64 @@
+"""
+League fixture generation benchmark.
+
+Creates a throwaway league for each participant count, times
+`tournament_service.create_league_matches` and removes everything it created
+afterwards. Needs a reachable database configured through `database_info`.
+
+    python -m benchmarks.league_creation_benchmark
+"""
+import asyncio
+import time
+
+from data.database import DatabaseConnection
+from services import tournament_service
+
+PARTICIPANT_COUNTS = [8, 16, 32, 64, 128]
+NAME_PREFIX = "Benchmark League Player"
+
+
+async def create_tournament(participant_count: int) -> int:
+    return await DatabaseConnection.insert_query(
+        "INSERT INTO tournament (title, format, match_format, prize) VALUES ($1, $2, $3, $4)",
+        f"League benchmark {participant_count}",
+        "League",
+        "Score limited",
+        0
+    )
+
+
+async def cleanup(tournament_id: int):
+    async with DatabaseConnection.transaction() as tx:
+        await tx.update_query("""
+            DELETE FROM match_participants
+            WHERE match_id IN (SELECT id FROM match WHERE tournament_id = $1)
+        """, tournament_id)
+        await tx.update_query("DELETE FROM match WHERE tournament_id = $1", tournament_id)
+        await tx.update_query("DELETE FROM tournament_participants WHERE tournament_id = $1", tournament_id)
+        await tx.update_query("DELETE FROM tournament WHERE id = $1", tournament_id)
+        await tx.update_query("DELETE FROM player_profiles WHERE full_name LIKE $1", f"{NAME_PREFIX}%")
+
+
+async def run_benchmark():
+    print(f"{'players':>8} {'matches':>8} {'seconds':>10} {'matches/s':>10}")
+    for participant_count in PARTICIPANT_COUNTS:
+        participants = [f"{NAME_PREFIX} {participant_count}-{i}" for i in range(participant_count)]
+        tournament_id = await create_tournament(participant_count)
+        try:
+            started = time.perf_counter()
+            created = await tournament_service.create_league_matches(tournament_id, participants, "Score limited")
+            elapsed = time.perf_counter() - started
+            if not created:
+                print(f"{participant_count:>8} league creation failed")
+                continue
+
+            match_count = participant_count * (participant_count - 1) // 2
+            print(f"{participant_count:>8} {match_count:>8} {elapsed:>10.3f} {match_count / elapsed:>10.0f}")
+        finally:
+            await cleanup(tournament_id)
+
+    await DatabaseConnection.close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
@@ -0,0 +1,130 @@
+"""
+Middleware throughput before and after the single ASGI middleware.
+
+Builds two apps with the same static mount and public page: one with the
+three @app.middleware("http") layers main.py used to stack (session,
+security and CSRF), one with common.middleware.RequestMiddleware. Requests
+are driven straight through the ASGI interface, so the numbers are the
+framework and middleware cost only. Runs without a database or server.
+
+    python -m benchmarks.middleware_benchmark
+"""
+import asyncio
+import os
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse
+from fastapi.staticfiles import StaticFiles
+
+from common.middleware import RequestMiddleware
+from services import user_service
+
+REQUESTS = 5_000
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
+STATIC_PATH = "/static/images/tennis_ball.png"
+PUBLIC_PATHS = {"/", "/players", "/players/"}
+DETAIL_PREFIXES = ["/matches/", "/players/", "/tournaments/"]
+
+
+def base_app() -> FastAPI:
+    app = FastAPI()
+    app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+
+    @app.get("/players/", response_class=HTMLResponse)
+    async def player_list():
+        return "<html><body>Players</body></html>"
+
+    @app.get("/players/{player_id}", response_class=HTMLResponse)
+    async def player_detail(player_id: int):
+        return f"<html><body>Player {player_id}</body></html>"
+
+    return app
+
+
+def legacy_app() -> FastAPI:
+    """The public and static paths of the previous middleware stack in main.py."""
+    app = base_app()
+
+    @app.middleware("http")
+    async def session_middleware(request: Request, call_next):
+        with user_service.request_auth_scope():
+            if request.url.path.startswith("/static/"):
+                return await call_next(request)
+            if any(
+                request.url.path.startswith(prefix) and request.url.path[len(prefix):].replace("/", "").isdigit()
+                for prefix in DETAIL_PREFIXES
+            ):
+                return await call_next(request)
+            if request.url.path in PUBLIC_PATHS:
+                return await call_next(request)
+            return await call_next(request)
+
+    @app.middleware("http")
+    async def security_middleware(request: Request, call_next):
+        if request.url.path in ["/docs", "/redoc", "/openapi.json"]:
+            return await call_next(request)
+        return await call_next(request)
+
+    @app.middleware("http")
+    async def csrf_middleware(request: Request, call_next):
+        if request.url.path in ["/docs", "/redoc", "/openapi.json"]:
+            return await call_next(request)
+        return await call_next(request)
+
+    return app
+
+
+def asgi_app() -> FastAPI:
+    app = base_app()
+    app.add_middleware(RequestMiddleware, public_paths=PUBLIC_PATHS, public_detail_prefixes=DETAIL_PREFIXES)
+    return app
+
+
+async def request(app, path: str) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 80),
+    }
+    status = None
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def throughput(app, path: str) -> float:
+    assert await request(app, path) == 200
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        await request(app, path)
+    return REQUESTS / (time.perf_counter() - started)
+
+
+async def run_benchmark():
+    before, after = legacy_app(), asgi_app()
+    for label, path in [("static file", STATIC_PATH), ("public list", "/players/"), ("detail page", "/players/42")]:
+        old = await throughput(before, path)
+        new = await throughput(after, path)
+        print(f"{label:<12} before {old:8,.0f} req/s   after {new:8,.0f} req/s   {new / old:4.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
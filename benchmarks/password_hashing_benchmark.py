@@ -0,0 +1,84 @@
+"""
+Event-loop lag during a login storm.
+
+Fires LOGINS concurrent password verifications, first inline on the event
+loop as login_user used to, then through the bounded PasswordHasher, while
+a probe task measures how late a 10 ms sleep wakes up. Lag is what every
+other request on the worker waits on top of its own work. Runs without a
+database; set BCRYPT_ROUNDS to try other cost factors.
+
+    python -m benchmarks.password_hashing_benchmark
+"""
+import asyncio
+import os
+import statistics
+import time
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from common.password_hasher import PasswordHasher
+
+LOGINS = 50
+PROBE_INTERVAL = 0.01
+ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+
+async def probe(lags, stop):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append((time.perf_counter() - started - PROBE_INTERVAL) * 1000)
+
+
+async def storm(verify, hashed):
+    lags = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    await asyncio.sleep(PROBE_INTERVAL * 2)
+
+    async def login():
+        try:
+            await verify("password123", hashed)
+            return True
+        except HTTPException:
+            return False
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(login() for _ in range(LOGINS)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe_task
+
+    lags.sort()
+    p99 = lags[int(len(lags) * 0.99) - 1] if len(lags) > 1 else lags[-1]
+    return elapsed, sum(results), statistics.median(lags), p99, lags[-1]
+
+
+def report(name, result):
+    elapsed, succeeded, p50, p99, worst = result
+    print(f"{name:<13} {succeeded:3d}/{LOGINS} logins in {elapsed:6.2f} s   "
+          f"loop lag p50 {p50:7.1f} ms   p99 {p99:7.1f} ms   max {worst:7.1f} ms")
+
+
+async def run_benchmark():
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=ROUNDS)
+    hashed = context.hash("password123")
+    print(f"bcrypt cost {ROUNDS}, {LOGINS} concurrent logins, {os.cpu_count()} CPUs")
+
+    async def inline_verify(password, hashed_password):
+        return context.verify(password, hashed_password)
+
+    report("inline", await storm(inline_verify, hashed))
+
+    hasher = PasswordHasher(context, max_workers=4, max_queue=LOGINS)
+    report("thread pool", await storm(hasher.verify, hashed))
+    hasher.shutdown()
+
+    hasher = PasswordHasher(context, max_workers=4, max_queue=16)
+    report("queue of 16", await storm(hasher.verify, hashed))
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
@@ -0,0 +1,71 @@
+"""
+Player profile lookup-by-name benchmark at 1M profiles.
+
+Seeds the profiles inside a transaction that is rolled back at the end, so
+the database is left untouched. Compares the old LOWER(TRIM(full_name))
+predicate with the indexed normalized_name column (migration 0002).
+
+    python -m benchmarks.player_lookup_benchmark
+"""
+import asyncio
+import random
+import statistics
+import time
+
+from data.database import DatabaseConnection
+
+PROFILE_COUNT = 1_000_000
+LOOKUPS = 200
+
+LEGACY_QUERY = """
+    SELECT id, full_name, country, sports_club, wins, losses, draws
+    FROM player_profiles
+    WHERE LOWER(TRIM(full_name)) = LOWER(TRIM($1))
+"""
+NORMALIZED_QUERY = """
+    SELECT id, full_name, country, sports_club, wins, losses, draws
+    FROM player_profiles
+    WHERE normalized_name = LOWER(TRIM($1))
+"""
+
+
+async def time_lookups(conn, query: str, names: list) -> list:
+    timings = []
+    for name in names:
+        started = time.perf_counter()
+        await conn.fetch(query, name)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def report(label: str, timings: list):
+    timings = sorted(timings)
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    print(f"{label:<16} p50 {statistics.median(timings):8.3f} ms   p99 {p99:8.3f} ms")
+
+
+async def run_benchmark():
+    async with DatabaseConnection.get_connection() as conn:
+        tx = conn.transaction()
+        await tx.start()
+        try:
+            print(f"Seeding {PROFILE_COUNT:,} profiles...")
+            await conn.execute("""
+                INSERT INTO player_profiles (full_name, country, sports_club, wins, losses, draws)
+                SELECT 'Benchmark Player ' || i, NULL, NULL, 0, 0, 0
+                FROM generate_series(1, $1) AS i
+            """, PROFILE_COUNT)
+            await conn.execute("ANALYZE player_profiles")
+
+            names = [f" benchmark player {random.randint(1, PROFILE_COUNT)} " for _ in range(LOOKUPS)]
+            # Legacy predicate scans the whole table, so sample fewer lookups.
+            report("LOWER(TRIM())", await time_lookups(conn, LEGACY_QUERY, names[:20]))
+            report("normalized_name", await time_lookups(conn, NORMALIZED_QUERY, names))
+        finally:
+            await tx.rollback()
+
+    await DatabaseConnection.close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
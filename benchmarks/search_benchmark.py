@@ -0,0 +1,86 @@
+"""
+Search latency benchmark on a 1M-row dataset.
+
+Seeds 1,000,000 player profiles and 50,000 tournaments, compares the old
+LOWER(col) LIKE '%term%' filter with the trigram-indexed search_service
+(migration 0008) and deletes the seeded rows afterwards. Needs a reachable
+database configured through `database_info`.
+
+    python -m benchmarks.search_benchmark
+"""
+import asyncio
+import random
+import statistics
+import time
+
+from data.database import DatabaseConnection
+from services import search_service
+
+PROFILE_COUNT = 1_000_000
+TOURNAMENT_COUNT = 50_000
+SEARCHES = 100
+NAME_PREFIX = "Search Benchmark"
+
+LEGACY_QUERY = """
+    SELECT id, full_name
+    FROM player_profiles
+    WHERE LOWER(full_name) LIKE LOWER($1)
+    ORDER BY id
+    LIMIT 10
+"""
+
+
+async def seed():
+    await DatabaseConnection.update_query("""
+        INSERT INTO player_profiles (full_name, country, sports_club, wins, losses, draws)
+        SELECT $1 || ' ' || md5(i::text) || ' ' || i, NULL, NULL, 0, 0, 0
+        FROM generate_series(1, $2) AS i
+    """, f"{NAME_PREFIX} Player", PROFILE_COUNT)
+    await DatabaseConnection.update_query("""
+        INSERT INTO tournament (title, format, match_format, prize)
+        SELECT $1 || ' ' || md5(i::text), 'League', 'Score limited', 0
+        FROM generate_series(1, $2) AS i
+    """, f"{NAME_PREFIX} Cup", TOURNAMENT_COUNT)
+    await DatabaseConnection.update_query("ANALYZE player_profiles")
+    await DatabaseConnection.update_query("ANALYZE tournament")
+
+
+async def cleanup():
+    await DatabaseConnection.update_query("DELETE FROM tournament WHERE title LIKE $1", f"{NAME_PREFIX}%")
+    await DatabaseConnection.update_query("DELETE FROM player_profiles WHERE full_name LIKE $1", f"{NAME_PREFIX}%")
+
+
+async def timed(call, terms: list) -> list:
+    timings = []
+    for term in terms:
+        started = time.perf_counter()
+        await call(term)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def report(label: str, timings: list):
+    timings = sorted(timings)
+    p99 = timings[max(int(len(timings) * 0.99) - 1, 0)]
+    print(f"{label:<18} p50 {statistics.median(timings):8.3f} ms   p99 {p99:8.3f} ms")
+
+
+async def run_benchmark():
+    print(f"Seeding {PROFILE_COUNT:,} profiles and {TOURNAMENT_COUNT:,} tournaments...")
+    await seed()
+    try:
+        # md5 fragments occur in few names, like a real surname search
+        terms = [f"{random.getrandbits(24):06x}" for _ in range(SEARCHES)]
+
+        # The legacy filter scans the whole table, so sample fewer searches.
+        report("LOWER() LIKE", await timed(
+            lambda term: DatabaseConnection.read_query(LEGACY_QUERY, f"%{term}%"), terms[:10]
+        ))
+        report("/api/search", await timed(search_service.search, terms))
+    finally:
+        await cleanup()
+        await DatabaseConnection.close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
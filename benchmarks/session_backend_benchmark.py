@@ -0,0 +1,93 @@
+"""
+Per-request overhead of the session backends.
+
+Replays the work validate_token_with_session does on every authenticated
+request - read the session, then record activity - against each backend in
+common/session_store.py, with activity flushed in batches as the app's
+session_maintenance task does. The Postgres run needs a reachable database
+with migration 0009 applied and uses the sessions of existing users; it is
+skipped otherwise.
+
+    python -m benchmarks.session_backend_benchmark
+"""
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from common.session_store import MemorySessionBackend, PostgresSessionBackend, SqliteSessionBackend
+from data.database import DatabaseConnection
+
+SESSIONS = 1_000
+REQUESTS = 20_000
+REQUESTS_PER_FLUSH = 500
+
+
+async def replay(backend, users):
+    now = datetime.now()
+    for user_id, email in users:
+        await backend.save(user_id, email, now)
+
+    timings = []
+    flush_timings = []
+    for i in range(REQUESTS):
+        user_id = random.choice(users)[0]
+        started = time.perf_counter()
+        session = await backend.get(user_id)
+        if session:
+            backend.touch(user_id, datetime.now())
+        timings.append((time.perf_counter() - started) * 1_000_000)
+
+        if i % REQUESTS_PER_FLUSH == REQUESTS_PER_FLUSH - 1:
+            started = time.perf_counter()
+            await backend.flush()
+            flush_timings.append((time.perf_counter() - started) * 1000)
+
+    for user_id, _ in users:
+        await backend.delete(user_id)
+
+    timings.sort()
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    return statistics.median(timings), p99, statistics.mean(flush_timings)
+
+
+def report(name, result):
+    p50, p99, flush_ms = result
+    print(f"{name:<9} p50 {p50:8.1f} us   p99 {p99:8.1f} us   "
+          f"flush of {REQUESTS_PER_FLUSH} touches {flush_ms:7.2f} ms")
+
+
+async def run_benchmark():
+    users = [(i, f"session-benchmark-{i}@example.com") for i in range(1, SESSIONS + 1)]
+    report("memory", await replay(MemorySessionBackend(), users))
+
+    with tempfile.TemporaryDirectory() as directory:
+        backend = SqliteSessionBackend(os.path.join(directory, "sessions.sqlite3"))
+        report("sqlite", await replay(backend, users))
+        await backend.close()
+
+    try:
+        existing = await DatabaseConnection.read_query("""
+            SELECT u.id, u.email
+            FROM users u
+            WHERE NOT EXISTS (SELECT 1 FROM user_sessions s WHERE s.user_id = u.id)
+            LIMIT $1
+        """, SESSIONS)
+    except Exception as e:
+        print(f"postgres  skipped: {str(e)}")
+        return
+
+    try:
+        if existing:
+            report("postgres", await replay(PostgresSessionBackend(), existing))
+        else:
+            print("postgres  skipped: no users without a session")
+    finally:
+        await DatabaseConnection.close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
@@ -4,8 +4,11 @@ from fastapi import Request, HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError
 
+from typing import Optional
+
 from data.database import DatabaseConnection
-from services.user_service import SECRET_KEY, ALGORITHM, get_user_by_id
+from data.models import User
+from services.user_service import SECRET_KEY, ALGORITHM, get_user_by_id, get_cached_user, validate_token_with_session
 from jose import jwt
 
 security = HTTPBearer()
@@ -17,6 +20,26 @@ def validate_token(token: str):
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
+async def get_current_user(request: Request) -> Optional[User]:
+    """
+    Dependency returning the user logged in through the access_token cookie, or None.
+
+    Resolved once per request and stored on request.state; users come from
+    the short-lived user_cache instead of a SELECT on every page view.
+    """
+    if hasattr(request.state, "current_user"):
+        return request.state.current_user
+
+    user = None
+    token = request.cookies.get("access_token")
+    if token:
+        payload = await validate_token_with_session(token)
+        if payload:
+            user = await get_cached_user(payload["id"])
+
+    request.state.current_user = user
+    return user
+
 async def auth_middleware(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
     request.state.user = validate_token(token)
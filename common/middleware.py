@@ -0,0 +1,102 @@
+import re
+from typing import Dict, Iterable
+
+from jose import JWTError
+from starlette.requests import HTTPConnection
+from starlette.responses import JSONResponse, RedirectResponse
+
+from services import user_service
+
+STATIC = "static"
+PUBLIC = "public"
+API = "api"
+WEB = "web"
+
+
+class RequestMiddleware:
+    """
+    Pure ASGI middleware that authenticates requests.
+
+    Each path is classified once per request by a dict lookup, a prefix
+    check and one precompiled regex, all built when the app starts:
+
+        static  - served without touching the session store
+        public  - anonymous pages and endpoints, including /<section>/<id> detail pages
+        api     - /api/*, authenticated by the `token` header (401 without it)
+        web     - everything else, authenticated by the access_token cookie
+                  (redirect to the login page without it)
+
+    Tokens are validated inside user_service.request_auth_scope(), so the
+    handlers' own role checks reuse the same validation.
+    """
+
+    def __init__(
+        self,
+        app,
+        public_paths: Iterable[str] = (),
+        public_detail_prefixes: Iterable[str] = (),
+        static_prefix: str = "/static/",
+        api_prefix: str = "/api/"
+    ):
+        self.app = app
+        self.static_prefix = static_prefix
+        self.api_prefix = api_prefix
+        self.routes: Dict[str, str] = {path: PUBLIC for path in public_paths}
+        sections = "|".join(re.escape(prefix.strip("/")) for prefix in public_detail_prefixes)
+        self.detail_page = re.compile(rf"/(?:{sections})/[\d/]*\d[\d/]*") if sections else None
+
+    def classify(self, path: str) -> str:
+        route = self.routes.get(path)
+        if route:
+            return route
+        if path.startswith(self.static_prefix):
+            return STATIC
+        if self.detail_page and self.detail_page.fullmatch(path):
+            return PUBLIC
+        if path.startswith(self.api_prefix):
+            return API
+        return WEB
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = self.classify(scope["path"])
+        if route == STATIC:
+            await self.app(scope, receive, send)
+            return
+
+        with user_service.request_auth_scope():
+            if route == PUBLIC:
+                await self.app(scope, receive, send)
+                return
+
+            connection = HTTPConnection(scope)
+            if route == API:
+                token = connection.headers.get("token")
+                connection.state.user = None
+                if not token:
+                    response = JSONResponse({"detail": "Authorization header missing"}, status_code=401)
+                    await response(scope, receive, send)
+                    return
+            else:
+                token = connection.cookies.get("access_token")
+
+            payload = None
+            if token:
+                try:
+                    payload = await user_service.validate_token_with_session(token)
+                except JWTError:
+                    payload = None
+
+            if payload:
+                connection.state.user = payload
+                await self.app(scope, receive, send)
+                return
+
+            if route == API:
+                response = JSONResponse({"detail": "Session expired"}, status_code=401)
+            else:
+                response = RedirectResponse(url="/users/login", status_code=302)
+            await response(scope, receive, send)
@@ -0,0 +1,47 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+
+class PasswordHasher:
+    """
+    Runs password hashing and verification on a dedicated thread pool.
+
+    bcrypt takes tens to hundreds of milliseconds per call and releases the
+    GIL, so off the event loop it no longer stalls other requests. At most
+    `max_workers` calls run at once and `max_queue` more may wait; beyond
+    that callers get a 503 right away instead of queueing without bound.
+    """
+
+    def __init__(self, context: CryptContext, max_workers: int = 4, max_queue: int = 32):
+        self.context = context
+        self.max_pending = max_workers + max_queue
+        self.pending = 0
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hasher")
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(self.context.verify, password, hashed)
+
+    async def _run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Too many sign-in requests in progress. Please try again shortly.",
+                headers={"Retry-After": "1"}
+            )
+
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
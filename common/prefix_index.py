@@ -0,0 +1,74 @@
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+
+class PrefixIndex:
+    """
+    Sorted-array prefix index of names.
+
+    Keys are kept in one sorted list with a parallel array of ids, so a
+    lookup is a binary search to the first key with the prefix followed by
+    a short scan: O(log n + limit). Keys must be unique, like the
+    player_profiles.normalized_name column they mirror.
+    """
+
+    def __init__(self):
+        self._keys: List[str] = []
+        self._ids = array("q")
+        self._names: Dict[int, str] = {}
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        return name.strip(" ").lower()
+
+    def build(self, entries: Iterable[Tuple[int, str]]) -> None:
+        """Replaces the contents with (id, name) pairs."""
+        names = dict(entries)
+        ordered = sorted((self.normalize(name), entry_id) for entry_id, name in names.items())
+        self._keys = [key for key, _ in ordered]
+        self._ids = array("q", (entry_id for _, entry_id in ordered))
+        self._names = names
+
+    def add(self, entry_id: int, name: str) -> None:
+        if entry_id in self._names:
+            self.remove(entry_id)
+
+        key = self.normalize(name)
+        position = bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            # Same normalized name under a new id: the old entry is stale.
+            del self._names[self._ids[position]]
+            self._ids[position] = entry_id
+        else:
+            self._keys.insert(position, key)
+            self._ids.insert(position, entry_id)
+        self._names[entry_id] = name
+
+    def remove(self, entry_id: int) -> None:
+        name = self._names.pop(entry_id, None)
+        if name is None:
+            return
+
+        key = self.normalize(name)
+        position = bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key and self._ids[position] == entry_id:
+            del self._keys[position]
+            del self._ids[position]
+
+    def search(self, prefix: str, limit: int = 10) -> List[Tuple[int, str]]:
+        """Returns up to `limit` (id, name) pairs whose name starts with `prefix`, in name order."""
+        prefix = self.normalize(prefix)
+        if not prefix:
+            return []
+
+        matches = []
+        position = bisect_left(self._keys, prefix)
+        while position < len(self._keys) and len(matches) < limit and self._keys[position].startswith(prefix):
+            entry_id = self._ids[position]
+            matches.append((entry_id, self._names[entry_id]))
+            position += 1
+        return matches
+
+    def __len__(self) -> int:
+        return len(self._keys)
@@ -1,71 +1,295 @@
-from fastapi import FastAPI, Request, HTTPException, Depends
-from datetime import datetime, timedelta
+"""
+Per-client rate limiting for individual routes.
+
+Each limited route gets a policy of `max_requests` per `window_seconds`,
+set where the route declares `create_rate_limit(...)`. The RATE_LIMITS
+environment variable overrides policies without a code change, keyed like
+the limiter keys its counters, by method and route template:
+
+    RATE_LIMITS="POST /api/users/login=5/60;POST /users/claim-director=10/3600"
+
+Limits use a sliding-window counter: the count of the current fixed window
+plus the previous window's count weighted by how much of it still overlaps
+the sliding window. That needs two integers per client and route, and a
+check is O(1).
+
+Counters are kept in a store chosen with RATE_LIMIT_BACKEND:
+
+    memory  - an LRU cache in the current process, capped at
+              RATE_LIMIT_MAX_KEYS (default). Each uvicorn worker counts
+              separately.
+    sqlite  - a local SQLite file in WAL mode (RATE_LIMIT_SQLITE_PATH) shared
+              by the workers of one host. Every check is one atomic upsert,
+              so concurrent workers never lose a count. Checks run on the
+              store's own thread and fail open if another worker holds the
+              write lock for longer than a short busy timeout.
+
+The app creates the limiter in its lifespan and keeps it in
+`app.state.rate_limiter`; see create_rate_limiter().
+"""
 import asyncio
-from typing import Dict, List
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+from common.cache import LRUCache
+
+
+class RateLimitPolicy(NamedTuple):
+    max_requests: int
+    window_seconds: int = 60
+
+
+def parse_policies(spec: Optional[str]) -> Dict[str, RateLimitPolicy]:
+    """Parses "METHOD /path=max/window;..." into policies by route key."""
+    policies = {}
+    for item in (spec or "").split(";"):
+        if not item.strip():
+            continue
+        route, limit = item.rsplit("=", 1)
+        max_requests, _, window = limit.partition("/")
+        policies[route.strip()] = RateLimitPolicy(int(max_requests), int(window or 60))
+    return policies
+
+
+class MemoryRateLimitStore:
+    """Counters in an LRU cache of this process."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        # key -> [window index, count in that window, count in the window before]
+        self._counters = LRUCache(max_size=max_keys)
+
+    def increment(self, key: str, window: int, previous_weight: float, policy: RateLimitPolicy) -> bool:
+        """Counts a request in `window` if the weighted count is below the limit; returns whether it was."""
+        counter = self._counters.get(key)
+        if counter is None or counter[0] < window - 1:
+            counter = [window, 0, 0]
+            self._counters.set(key, counter)
+        elif counter[0] == window - 1:
+            counter[0], counter[1], counter[2] = window, 0, counter[1]
+
+        if counter[2] * previous_weight + counter[1] >= policy.max_requests:
+            return False
+        counter[1] += 1
+        return True
+
+    async def run(self, func, *args):
+        """Runs a store operation; dict lookups are cheap enough for the event loop."""
+        return func(*args)
+
+    def prune(self, now: float) -> int:
+        # The LRU cap bounds memory; stale counters reset when next read
+        return 0
+
+    def close(self):
+        self._counters.clear()
+
+    async def count(self) -> int:
+        return len(self._counters)
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+
+class SqliteRateLimitStore:
+    """
+    Counters in a local SQLite file shared by the workers of one host.
+
+    A check is a single INSERT ... ON CONFLICT DO UPDATE ... RETURNING that
+    rolls the window over, decides and increments under SQLite's write
+    lock. The connection is owned by one worker thread, so waiting on
+    another worker's lock never blocks the event loop; a check still
+    waiting after BUSY_TIMEOUT_MS is allowed rather than delayed further.
+    Expired rows are removed by prune().
+    """
+
+    BUSY_TIMEOUT_MS = 100
+
+    INCREMENT_QUERY = """
+        INSERT INTO rate_limits (key, window, current, previous, allowed, expires_at)
+        VALUES (:key, :window, 1, 0, 1, :expires_at)
+        ON CONFLICT (key) DO UPDATE SET
+            previous = CASE
+                WHEN window = :window THEN previous
+                WHEN window = :window - 1 THEN current
+                ELSE 0
+            END,
+            allowed = (
+                CASE
+                    WHEN window = :window THEN previous
+                    WHEN window = :window - 1 THEN current
+                    ELSE 0
+                END * :weight
+                + CASE WHEN window = :window THEN current ELSE 0 END
+            ) < :max_requests,
+            current = CASE WHEN window = :window THEN current ELSE 0 END + ((
+                CASE
+                    WHEN window = :window THEN previous
+                    WHEN window = :window - 1 THEN current
+                    ELSE 0
+                END * :weight
+                + CASE WHEN window = :window THEN current ELSE 0 END
+            ) < :max_requests),
+            window = :window,
+            expires_at = :expires_at
+        RETURNING allowed
+    """
+
+    def __init__(self, path: str, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rate-limit-store")
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA busy_timeout={self.BUSY_TIMEOUT_MS}")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                key TEXT PRIMARY KEY,
+                window INTEGER NOT NULL,
+                current INTEGER NOT NULL,
+                previous INTEGER NOT NULL,
+                allowed INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS rate_limits_expires_at_idx ON rate_limits (expires_at)")
+
+    async def run(self, func, *args):
+        """Runs a store operation on the thread that owns the connection."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def increment(self, key: str, window: int, previous_weight: float, policy: RateLimitPolicy) -> bool:
+        try:
+            row = self._conn.execute(self.INCREMENT_QUERY, {
+                "key": key,
+                "window": window,
+                "weight": previous_weight,
+                "max_requests": policy.max_requests,
+                "expires_at": (window + 2) * policy.window_seconds,
+            }).fetchone()
+        except sqlite3.OperationalError as e:
+            # SQLITE_BUSY past the busy timeout: fail open instead of stalling the request
+            print(f"Error updating rate limit counter: {str(e)}")
+            return True
+        return bool(row[0])
+
+    def prune(self, now: float) -> int:
+        """Deletes counters that no longer affect any decision, then the oldest ones above max_keys."""
+        with self._conn:
+            self._conn.execute("BEGIN")
+            expired = self._conn.execute("DELETE FROM rate_limits WHERE expires_at < ?", (now,)).rowcount
+            evicted = self._conn.execute("""
+                DELETE FROM rate_limits WHERE key IN (
+                    SELECT key FROM rate_limits
+                    ORDER BY expires_at
+                    LIMIT MAX(0, (SELECT COUNT(*) FROM rate_limits) - ?)
+                )
+            """, (self.max_keys,)).rowcount
+        return expired + evicted
+
+    def close(self):
+        self._executor.shutdown()
+        self._conn.close()
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+    async def count(self) -> int:
+        return await self.run(self._count)
+
+    def __len__(self) -> int:
+        # Blocks the caller; on the event loop use count()
+        return self._executor.submit(self._count).result()
+
 
 class RateLimiter:
-    def __init__(self, requests_per_minute: int = 60):
-        self.requests_per_minute = requests_per_minute
-        self.requests: Dict[str, Dict[str, List[datetime]]] = {}
-        
-        asyncio.create_task(self._cleanup_old_requests())
-
-    async def _check_request(self, request: Request, max_requests: int) -> None:
-        client_ip = request.client.host
-        endpoint = request.url.path
-        current_time = datetime.now()
-
-        if client_ip not in self.requests:
-            self.requests[client_ip] = {}
-        if endpoint not in self.requests[client_ip]:
-            self.requests[client_ip][endpoint] = []
-
-        self.requests[client_ip][endpoint].append(current_time)
-       
-        recent_requests = len([
-            ts for ts in self.requests[client_ip][endpoint]
-            if (current_time - ts) < timedelta(minutes=1)
-        ])
-
-        print(f"IP: {client_ip}, Endpoint: {endpoint}, Recent requests: {recent_requests}")
-
-        if recent_requests > max_requests:
+    def __init__(self, store=None, policies: Optional[Dict[str, RateLimitPolicy]] = None):
+        self.store = store if store is not None else MemoryRateLimitStore()
+        self.policies = policies or {}
+        self.rejected = 0
+
+    @property
+    def max_keys(self) -> int:
+        return self.store.max_keys
+
+    def policy_for(self, route: str, default: RateLimitPolicy) -> RateLimitPolicy:
+        return self.policies.get(route, default)
+
+    def hit(self, client: str, route: str, policy: RateLimitPolicy, now: Optional[float] = None) -> Tuple[bool, float]:
+        """
+        Counts a request of `client` to `route` if it is within `policy`.
+
+        Returns whether the request is allowed and, when it is not, the
+        seconds until the current window ends.
+        """
+        now = time.time() if now is None else now
+        position = now / policy.window_seconds
+        window = int(position)
+
+        if self.store.increment(f"{client} {route}", window, 1 - (position - window), policy):
+            return True, 0.0
+        self.rejected += 1
+        return False, (window + 1 - position) * policy.window_seconds
+
+    async def _check_request(self, request: Request, policy: RateLimitPolicy) -> None:
+        route = request.scope.get("route")
+        route_key = f"{request.method} {route.path if route else request.url.path}"
+        policy = self.policy_for(route_key, policy)
+
+        allowed, retry_after = await self.store.run(self.hit, request.client.host, route_key, policy)
+        if not allowed:
             raise HTTPException(
                 status_code=429,
-                detail=f"Rate limit exceeded. Maximum {max_requests} requests per minute."
+                detail=f"Rate limit exceeded. Maximum {policy.max_requests} requests "
+                       f"per {policy.window_seconds} seconds.",
+                headers={"Retry-After": str(max(1, round(retry_after)))}
             )
 
-    async def _cleanup_old_requests(self):
+    async def prune_periodically(self, interval: float = 60):
+        """Removes stale counters every `interval` seconds; run as a background task."""
         while True:
+            await asyncio.sleep(interval)
             try:
-                current_time = datetime.now()
-                for ip in list(self.requests.keys()):
-                    for endpoint in list(self.requests[ip].keys()):
-                        self.requests[ip][endpoint] = [
-                            ts for ts in self.requests[ip][endpoint]
-                            if (current_time - ts) < timedelta(minutes=1)
-                        ]
-                        
-                        if not self.requests[ip][endpoint]:
-                            del self.requests[ip][endpoint]
-                    
-                    if not self.requests[ip]:
-                        del self.requests[ip]
+                await self.store.run(self.store.prune, time.time())
             except Exception as e:
-                print(f"Error in cleanup task: {e}")
-            await asyncio.sleep(60)
+                print(f"Error pruning rate limit counters: {str(e)}")
+
+    def close(self):
+        self.store.close()
+
+    async def count(self) -> int:
+        """Number of tracked counters, read without blocking the event loop."""
+        return await self.store.count()
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+
+def create_rate_limiter(backend: Optional[str] = None) -> RateLimiter:
+    """Builds the limiter configured by RATE_LIMIT_BACKEND, RATE_LIMIT_MAX_KEYS and RATE_LIMITS."""
+    backend = (backend or os.getenv("RATE_LIMIT_BACKEND", "memory")).lower()
+    max_keys = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+    if backend == "memory":
+        store = MemoryRateLimitStore(max_keys)
+    elif backend == "sqlite":
+        store = SqliteRateLimitStore(os.getenv("RATE_LIMIT_SQLITE_PATH", "rate_limits.sqlite3"), max_keys)
+    else:
+        raise ValueError(f"Unknown rate limit backend: {backend}")
+    return RateLimiter(store, parse_policies(os.getenv("RATE_LIMITS")))
 
 
-rate_limiter = RateLimiter()
+def create_rate_limit(max_requests: int = 10, window_seconds: int = 60):
+    """Creates a rate limit dependency allowing max_requests per window_seconds per client"""
+    policy = RateLimitPolicy(max_requests, window_seconds)
 
-def create_rate_limit(max_requests: int = 10):
-    """Creates a rate limit dependency with specified max requests"""
-    async def rate_limit_dependency(
-        request: Request,
-        limiter: RateLimiter = Depends(lambda: rate_limiter)
-    ):
-        await limiter._check_request(request, max_requests)
+    async def rate_limit_dependency(request: Request):
+        await request.app.state.rate_limiter._check_request(request, policy)
     return rate_limit_dependency
 
 # Export these names
-__all__ = ['rate_limiter', 'create_rate_limit']
\ No newline at end of file
+__all__ = ['RateLimitPolicy', 'RateLimiter', 'create_rate_limiter', 'create_rate_limit']
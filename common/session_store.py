@@ -0,0 +1,289 @@
+"""
+Session storage backends.
+
+SessionManager keeps sessions in one of these, chosen with the
+SESSION_BACKEND environment variable:
+
+    memory    - a dict in the current process (default). Sessions are lost on
+                restart and are not seen by other uvicorn workers.
+    postgres  - the user_sessions table (migration 0009). Shared by every
+                worker on every host.
+    sqlite    - a local SQLite file in WAL mode (SESSION_SQLITE_PATH). Shared
+                by the workers of one host without a database round trip.
+
+Activity updates are buffered by `touch()` and written in one batch by
+`flush()`, which the app runs periodically. Reads in the same process see
+buffered activity immediately; other workers see it after the next flush.
+"""
+import asyncio
+import heapq
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from data.database import DatabaseConnection
+
+
+class SessionBackend(ABC):
+    """Stores {'email', 'last_activity'} per user id."""
+
+    def __init__(self):
+        self._pending: Dict[int, datetime] = {}
+
+    async def get(self, user_id: int) -> Optional[Dict]:
+        session = await self._read(user_id)
+        pending = self._pending.get(user_id)
+        if session and pending and pending > session["last_activity"]:
+            session = {**session, "last_activity": pending}
+        return session
+
+    async def save(self, user_id: int, email: str, last_activity: datetime):
+        """Creates or replaces the session of a user."""
+        self._pending.pop(user_id, None)
+        await self._write(user_id, email, last_activity)
+
+    def touch(self, user_id: int, last_activity: datetime):
+        """Records activity of an existing session; written by the next flush()."""
+        self._pending[user_id] = last_activity
+
+    async def flush(self) -> int:
+        """Writes buffered activity and returns the number of sessions updated."""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        await self._write_activity(pending)
+        return len(pending)
+
+    async def delete(self, user_id: int):
+        self._pending.pop(user_id, None)
+        await self._delete(user_id)
+
+    @abstractmethod
+    async def delete_expired(self, cutoff: datetime) -> int:
+        """Removes sessions inactive since before `cutoff` and returns how many."""
+
+    async def close(self):
+        await self.flush()
+
+    @abstractmethod
+    async def _read(self, user_id: int) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    async def _write(self, user_id: int, email: str, last_activity: datetime):
+        ...
+
+    @abstractmethod
+    async def _write_activity(self, activity: Dict[int, datetime]):
+        ...
+
+    @abstractmethod
+    async def _delete(self, user_id: int):
+        ...
+
+
+class MemorySessionBackend(SessionBackend):
+    """
+    Sessions in a dict of this process. Touches are applied directly.
+
+    Expiry uses a min-heap of (last_activity, user_id) with one live entry
+    per session, so delete_expired() only looks at sessions that may have
+    expired: O(log n) each, instead of scanning every session. An entry
+    whose session was touched since it was pushed is pushed again with the
+    newer time; entries of deleted sessions are skipped when they surface.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._sessions: Dict[int, Dict] = {}
+        self._expiry_heap: List[Tuple[datetime, int]] = []
+        self._scheduled: Dict[int, datetime] = {}
+
+    def touch(self, user_id: int, last_activity: datetime):
+        session = self._sessions.get(user_id)
+        if session:
+            session["last_activity"] = last_activity
+
+    async def delete_expired(self, cutoff: datetime) -> int:
+        expired = 0
+        while self._expiry_heap and self._expiry_heap[0][0] < cutoff:
+            scheduled_at, user_id = heapq.heappop(self._expiry_heap)
+            if self._scheduled.get(user_id) != scheduled_at:
+                continue
+
+            last_activity = self._sessions[user_id]["last_activity"]
+            if last_activity < cutoff:
+                del self._sessions[user_id]
+                del self._scheduled[user_id]
+                expired += 1
+            else:
+                self._schedule(user_id, last_activity)
+        return expired
+
+    async def close(self):
+        self._sessions.clear()
+        self._expiry_heap.clear()
+        self._scheduled.clear()
+
+    def _schedule(self, user_id: int, last_activity: datetime):
+        self._scheduled[user_id] = last_activity
+        heapq.heappush(self._expiry_heap, (last_activity, user_id))
+
+    async def _read(self, user_id: int) -> Optional[Dict]:
+        return self._sessions.get(user_id)
+
+    async def _write(self, user_id: int, email: str, last_activity: datetime):
+        self._sessions[user_id] = {"last_activity": last_activity, "email": email}
+        if user_id not in self._scheduled:
+            self._schedule(user_id, last_activity)
+
+    async def _write_activity(self, activity: Dict[int, datetime]):
+        for user_id, last_activity in activity.items():
+            self.touch(user_id, last_activity)
+
+    async def _delete(self, user_id: int):
+        self._sessions.pop(user_id, None)
+        self._scheduled.pop(user_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class PostgresSessionBackend(SessionBackend):
+    """Sessions in the user_sessions table."""
+
+    async def delete_expired(self, cutoff: datetime) -> int:
+        query = """
+            WITH deleted AS (
+                DELETE FROM user_sessions
+                WHERE last_activity < $1
+                RETURNING 1
+            )
+            SELECT COUNT(*) FROM deleted
+        """
+        result = await DatabaseConnection.read_query(query, cutoff)
+        return result[0][0]
+
+    async def _read(self, user_id: int) -> Optional[Dict]:
+        query = "SELECT email, last_activity FROM user_sessions WHERE user_id = $1"
+        result = await DatabaseConnection.read_query(query, user_id)
+        if not result:
+            return None
+        return {"email": result[0][0], "last_activity": result[0][1]}
+
+    async def _write(self, user_id: int, email: str, last_activity: datetime):
+        query = """
+            INSERT INTO user_sessions (user_id, email, last_activity)
+            VALUES ($1, $2, $3)
+            ON CONFLICT (user_id) DO UPDATE
+            SET email = EXCLUDED.email, last_activity = EXCLUDED.last_activity
+        """
+        await DatabaseConnection.update_query(query, user_id, email, last_activity)
+
+    async def _write_activity(self, activity: Dict[int, datetime]):
+        query = """
+            UPDATE user_sessions s
+            SET last_activity = GREATEST(s.last_activity, a.last_activity)
+            FROM unnest($1::int[], $2::timestamp[]) AS a(user_id, last_activity)
+            WHERE s.user_id = a.user_id
+        """
+        await DatabaseConnection.update_query(query, list(activity.keys()), list(activity.values()))
+
+    async def _delete(self, user_id: int):
+        await DatabaseConnection.update_query("DELETE FROM user_sessions WHERE user_id = $1", user_id)
+
+
+class SqliteSessionBackend(SessionBackend):
+    """
+    Sessions in a local SQLite file shared by the workers of one host.
+
+    The connection is owned by a single worker thread and every statement
+    runs there, so a write waiting on another worker's lock (up to
+    busy_timeout) never blocks the event loop. Activity is batched so
+    writes stay rare.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-store")
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS user_sessions (
+                user_id INTEGER PRIMARY KEY,
+                email TEXT NOT NULL,
+                last_activity REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS user_sessions_last_activity_idx ON user_sessions (last_activity)")
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def delete_expired(self, cutoff: datetime) -> int:
+        return await self._run(self._delete_expired_sync, cutoff.timestamp())
+
+    async def close(self):
+        await self.flush()
+        await self._run(self._conn.close)
+        self._executor.shutdown(wait=False)
+
+    async def _read(self, user_id: int) -> Optional[Dict]:
+        row = await self._run(self._read_sync, user_id)
+        if not row:
+            return None
+        return {"email": row[0], "last_activity": datetime.fromtimestamp(row[1])}
+
+    async def _write(self, user_id: int, email: str, last_activity: datetime):
+        await self._run(self._write_sync, user_id, email, last_activity.timestamp())
+
+    async def _write_activity(self, activity: Dict[int, datetime]):
+        await self._run(
+            self._write_activity_sync,
+            [(last_activity.timestamp(), user_id) for user_id, last_activity in activity.items()]
+        )
+
+    async def _delete(self, user_id: int):
+        await self._run(self._delete_sync, user_id)
+
+    def _delete_expired_sync(self, cutoff: float) -> int:
+        return self._conn.execute("DELETE FROM user_sessions WHERE last_activity < ?", (cutoff,)).rowcount
+
+    def _read_sync(self, user_id: int) -> Optional[Tuple[str, float]]:
+        return self._conn.execute(
+            "SELECT email, last_activity FROM user_sessions WHERE user_id = ?", (user_id,)
+        ).fetchone()
+
+    def _write_sync(self, user_id: int, email: str, last_activity: float):
+        self._conn.execute(
+            """
+            INSERT INTO user_sessions (user_id, email, last_activity) VALUES (?, ?, ?)
+            ON CONFLICT (user_id) DO UPDATE SET email = excluded.email, last_activity = excluded.last_activity
+            """,
+            (user_id, email, last_activity)
+        )
+
+    def _write_activity_sync(self, activity: List[Tuple[float, int]]):
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("UPDATE user_sessions SET last_activity = MAX(last_activity, ?) WHERE user_id = ?", activity)
+
+    def _delete_sync(self, user_id: int):
+        self._conn.execute("DELETE FROM user_sessions WHERE user_id = ?", (user_id,))
+
+
+def create_session_backend(name: Optional[str] = None) -> SessionBackend:
+    """Builds the backend named by `name` or the SESSION_BACKEND environment variable."""
+    name = (name or os.getenv("SESSION_BACKEND", "memory")).lower()
+    if name == "memory":
+        return MemorySessionBackend()
+    if name == "postgres":
+        return PostgresSessionBackend()
+    if name == "sqlite":
+        return SqliteSessionBackend(os.getenv("SESSION_SQLITE_PATH", "sessions.sqlite3"))
+    raise ValueError(f"Unknown session backend: {name}")
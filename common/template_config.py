@@ -1,8 +1,18 @@
 from fastapi.templating import Jinja2Templates
 from common.auth_middleware import get_user_if_token
+from common.security import csrf
 
 
 class CustomJinja2Templates(Jinja2Templates):
     def __init__(self, directory: str):
         super().__init__(directory=directory)
-        # self.env.globals['get_user'] = get_user_if_token
\ No newline at end of file
+        # self.env.globals['get_user'] = get_user_if_token
+
+    def TemplateResponse(self, *args, **kwargs):
+        """Renders a template, giving every page a CSRF token for its forms and the header's logout form"""
+        context = kwargs.get("context")
+        if context is None:
+            context = next((arg for arg in args if isinstance(arg, dict)), None)
+        if context is not None and not context.get("csrf_token"):
+            context["csrf_token"] = csrf.generate_token()
+        return super().TemplateResponse(*args, **kwargs)
@@ -1,9 +1,73 @@
 import asyncpg
 import database_info as db
-from typing import List, Any, Optional, Union
+from typing import List, Any, Optional, Union, Iterable, Sequence
 from contextlib import asynccontextmanager
 
 
+class Transaction:
+    """
+    Unit of work bound to a single pooled connection.
+
+    Exposes the same query helpers as DatabaseConnection, but every statement
+    runs on the held connection and is committed once when the surrounding
+    `DatabaseConnection.transaction()` block exits. Errors are re-raised so the
+    whole unit of work is rolled back.
+    """
+
+    def __init__(self, connection: asyncpg.Connection):
+        self._conn = connection
+
+    async def read_query(self, sql: str, *params) -> List[Any]:
+        try:
+            results = await self._conn.fetch(sql, *params)
+            return [tuple(row) for row in results]
+        except Exception as e:
+            print(f"Error executing read query in transaction: {str(e)}")
+            print(f"Query: {sql}")
+            print(f"Parameters: {params}")
+            raise
+
+    async def insert_query(self, sql: str, *params) -> Optional[int]:
+        if "RETURNING" not in sql.upper():
+            sql += " RETURNING id"
+        try:
+            return await self._conn.fetchval(sql, *params)
+        except Exception as e:
+            print(f"Error executing insert query in transaction: {str(e)}")
+            print(f"Query: {sql}")
+            print(f"Parameters: {params}")
+            raise
+
+    async def update_query(self, sql: str, *params) -> bool:
+        try:
+            await self._conn.execute(sql, *params)
+            return True
+        except Exception as e:
+            print(f"Error executing update query in transaction: {str(e)}")
+            print(f"Query: {sql}")
+            print(f"Parameters: {params}")
+            raise
+
+    async def execute_many(self, sql: str, args: Iterable[Sequence]) -> bool:
+        try:
+            await self._conn.executemany(sql, args)
+            return True
+        except Exception as e:
+            print(f"Error executing batch query in transaction: {str(e)}")
+            print(f"Query: {sql}")
+            raise
+
+    async def copy_records(self, table: str, records: Iterable[Sequence], columns: List[str]) -> int:
+        """Streams rows into `table` with COPY and returns the number of rows written."""
+        try:
+            status = await self._conn.copy_records_to_table(table, records=records, columns=columns)
+            return int(status.split()[-1])
+        except Exception as e:
+            print(f"Error copying records into {table} in transaction: {str(e)}")
+            print(f"Columns: {columns}")
+            raise
+
+
 class DatabaseConnection:
     _pool: Optional[asyncpg.Pool] = None
 
@@ -38,6 +102,22 @@ class DatabaseConnection:
         async with pool.acquire() as connection:
             yield connection
 
+    @classmethod
+    @asynccontextmanager
+    async def transaction(cls):
+        """
+        Usage:
+            async with DatabaseConnection.transaction() as tx:
+                match_id = await tx.insert_query(...)
+                await tx.update_query(...)
+
+        Holds one connection for the whole block and commits once on exit;
+        any exception rolls every statement back.
+        """
+        async with cls.get_connection() as conn:
+            async with conn.transaction():
+                yield Transaction(conn)
+
     @classmethod
     async def read_query(cls, sql: str, *params) -> List[Any]:
         try:
@@ -76,6 +156,29 @@ class DatabaseConnection:
             print(f"Parameters: {params}")
             return False
 
+    @classmethod
+    async def execute_many(cls, sql: str, args: Iterable[Sequence]) -> bool:
+        try:
+            async with cls.get_connection() as conn:
+                await conn.executemany(sql, args)
+                return True
+        except Exception as e:
+            print(f"Error executing batch query: {str(e)}")
+            print(f"Query: {sql}")
+            return False
+
+    @classmethod
+    async def copy_records(cls, table: str, records: Iterable[Sequence], columns: List[str]) -> int:
+        """Streams rows into `table` with COPY and returns the number of rows written."""
+        try:
+            async with cls.get_connection() as conn:
+                status = await conn.copy_records_to_table(table, records=records, columns=columns)
+                return int(status.split()[-1])
+        except Exception as e:
+            print(f"Error copying records into {table}: {str(e)}")
+            print(f"Columns: {columns}")
+            raise
+
     @classmethod
     async def test_connection(cls) -> bool:
         try:
@@ -0,0 +1,45 @@
+"""
+Applies the versioned SQL files in /migrations on top of database_script.sql.
+
+    python -m data.migrate
+
+Each file runs in its own transaction and is recorded in schema_migrations,
+so running the command again only applies files that are new.
+"""
+import asyncio
+import os
+from typing import List
+
+from data.database import DatabaseConnection
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migrations")
+
+
+def pending_files(applied: set) -> List[str]:
+    files = sorted(f for f in os.listdir(MIGRATIONS_DIR) if f.endswith(".sql"))
+    return [f for f in files if f[:-len(".sql")] not in applied]
+
+
+async def migrate():
+    await DatabaseConnection.update_query("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version text PRIMARY KEY,
+            applied_at timestamp without time zone DEFAULT now()
+        )
+    """)
+    applied = {row[0] for row in await DatabaseConnection.read_query("SELECT version FROM schema_migrations")}
+
+    for file_name in pending_files(applied):
+        with open(os.path.join(MIGRATIONS_DIR, file_name)) as f:
+            sql = f.read()
+
+        async with DatabaseConnection.transaction() as tx:
+            await tx.update_query(sql)
+            await tx.update_query("INSERT INTO schema_migrations (version) VALUES ($1)", file_name[:-len(".sql")])
+        print(f"Applied migration {file_name}")
+
+    await DatabaseConnection.close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -32,6 +32,21 @@ class User(BaseModel):
             player_profile_id=player_profile_id
         )
     
+class Principal(BaseModel):
+    id: int
+    email: str
+    is_admin: bool = False
+    is_director: bool = False
+
+    @classmethod
+    def from_query_result(cls, id, email, is_admin, is_director):
+        return cls(
+            id=id,
+            email=email,
+            is_admin=bool(is_admin),
+            is_director=bool(is_director)
+        )
+
 class PlayerProfile(BaseModel):
     id: Optional[int] = None
     full_name: constr(min_length=2, max_length=50) = Field(..., description="Full name of the player with minimum 2 and maximum 50 characters")
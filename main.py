@@ -1,33 +1,44 @@
+import asyncio
 import os
 import uvicorn
-from fastapi import Depends, FastAPI, Request, HTTPException
-from fastapi.responses import RedirectResponse
+from fastapi import Depends, FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
-from common.rate_limiter import RateLimiter, rate_limiter,create_rate_limit
-from common.security import csrf, verify_csrf_token
+from common.rate_limiter import create_rate_limit, create_rate_limiter
+from common.middleware import RequestMiddleware
 from routers.api.user import users_router as api_users_router
 from routers.api.player_profile import players_profiles_router as api_players_profiles_router
 from routers.api.match import matches_router as api_matches_router
 from routers.api.tournament import tournaments_router as api_tournaments_router
+from routers.api.search import search_router as api_search_router
 from routers.web.match import web_match_router
 from routers.web.player_profile import web_player_router
 from routers.web.tournament import web_tournament_router
 from routers.web.user import web_users_router
 from routers.web.web_home_router import web_home_router
-from services import user_service
-from services.user_service import validate_token_with_session, SessionManager
-from jose import JWTError
+from services import player_profile_service, user_service
+from services.user_service import SessionManager
 
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global rate_limiter
-    rate_limiter = RateLimiter()
+    app.state.rate_limiter = create_rate_limiter()
+    try:
+        await player_profile_service.load_name_index()
+    except Exception as e:
+        print(f"Error loading player name index: {str(e)}")
+    session_task = asyncio.create_task(user_service.session_maintenance())
+    name_index_task = asyncio.create_task(player_profile_service.refresh_name_index())
+    rate_limit_task = asyncio.create_task(app.state.rate_limiter.prune_periodically())
     yield
-    
-    SessionManager._sessions.clear()
+
+    session_task.cancel()
+    name_index_task.cancel()
+    rate_limit_task.cancel()
+    app.state.rate_limiter.close()
+    await SessionManager.backend.close()
+    user_service.password_hasher.shutdown()
 
 app = FastAPI(lifespan=lifespan,docs_url="/docs")
 
@@ -42,119 +53,60 @@ async def test_rate_limit():
     return {"message": "Request successful"}
 
 @app.get("/test/rate-limit-status")
-async def test_rate_limit_status():
+async def test_rate_limit_status(request: Request):
     """Check rate limiter state"""
+    rate_limiter = request.app.state.rate_limiter
     return {
-        "active_ips": len(rate_limiter.requests),
-        "request_counts": {
-            ip: {endpoint: len(timestamps) 
-                for endpoint, timestamps in endpoints.items()}
-            for ip, endpoints in rate_limiter.requests.items()
-        }
-    }
-
-@app.middleware("http")
-async def session_middleware(request: Request, call_next):
-    """Middleware to track user activity and validate sessions"""
-
-    await user_service.cleanup_expired_sessions()
-
-    if request.url.path.startswith("/static/"):
-        return await call_next(request)
-    is_api_route = request.url.path.startswith("/api/")
-    
-    # Public paths that don't require authentication
-    public_paths = {
-        "/api/users/login",
-        "/api/users/register",
-        "/users/login",
-        "/users/register",
-        "/docs",
-        "/redoc",
-        "/openapi.json",
-        "/",  # Home page should be public
-        "/tournaments",
-        "/tournaments/",
-        "/matches",
-        "/matches/",
-        "/players",
-        "/players/"
+        "tracked_keys": await rate_limiter.count(),
+        "max_keys": rate_limiter.max_keys,
+        "rejected": rate_limiter.rejected,
+        "policies": {route: policy._asdict() for route, policy in rate_limiter.policies.items()}
     }
 
-    # Check if the path is a public detail page
-    if any(
-        request.url.path.startswith(prefix) and request.url.path[len(prefix):].replace("/", "").isdigit()
-        for prefix in ["/matches/", "/players/", "/tournaments/"]
-    ):
-        return await call_next(request)
-    
-    if request.url.path in public_paths:
-        return await call_next(request)
-        
-    if is_api_route:
-        # Handle API authentication
-        auth_header = request.headers.get("token")
-        request.state.user = None
-        if not auth_header:
-            raise HTTPException(status_code=401, detail="Authorization header missing")
-            
-        token = auth_header
-        try:
-            payload = await validate_token_with_session(token)
-            if not payload:
-                raise HTTPException(status_code=401, detail="Session expired")
-            
-            request.state.user = payload
-            return await call_next(request)
-        except JWTError:
-            raise HTTPException(status_code=401, detail="Invalid token")
-    else:
-        # Handle web authentication via cookies
-        token = request.cookies.get("access_token")
-        if token:
-            try:
-                payload = await validate_token_with_session(token)
-                if payload:
-                    request.state.user = payload
-                    return await call_next(request)
-            except JWTError:
-                pass
-                
-        if request.url.path not in public_paths:
-            return RedirectResponse(url="/users/login", status_code=302)
-    
-    return await call_next(request)
-
-@app.middleware("http")
-async def security_middleware(request: Request, call_next):
-    """Global security middleware"""
-    if request.url.path in ["/docs", "/redoc", "/openapi.json"]:
-        return await call_next(request)
-        
-    response = await call_next(request)
-   
-    return response
-
-@app.middleware("http")
-async def csrf_middleware(request: Request, call_next):
-    """CSRF protection middleware"""
-    # Don't check CSRF for OpenAPI endpoints
-    if request.url.path in ["/docs", "/redoc", "/openapi.json"]:
-        return await call_next(request)
-        
-    if request.method in ["POST", "PUT", "DELETE", "PATCH"]:
-        if "web" in str(request.url.path):
-            if not await verify_csrf_token(request):
-                raise HTTPException(
-                    status_code=403,
-                    detail="CSRF token missing or invalid"
-                )
-    return await call_next(request)
+@app.get("/test/session-status")
+async def test_session_status():
+    """Check session activity writes made and avoided by touch throttling"""
+    return {"touches": SessionManager.touch_stats()}
+
+@app.get("/test/login-timings")
+async def test_login_timings():
+    """Check average time per login spent in the database, password hash and token stages"""
+    return user_service.login_timing_stats()
+
+# Paths served without a session; everything else under /api needs the
+# `token` header and every other page the access_token cookie.
+PUBLIC_PATHS = {
+    "/api/users/login",
+    "/api/users/register",
+    "/api/player_profiles/autocomplete",
+    "/api/search",
+    "/users/login",
+    "/users/register",
+    "/docs",
+    "/redoc",
+    "/openapi.json",
+    "/",  # Home page should be public
+    "/tournaments",
+    "/tournaments/",
+    "/matches",
+    "/matches/",
+    "/players",
+    "/players/"
+}
+# /<section>/<id> detail pages are public too
+PUBLIC_DETAIL_PREFIXES = ["/matches/", "/players/", "/tournaments/"]
+
+app.add_middleware(
+    RequestMiddleware,
+    public_paths=PUBLIC_PATHS,
+    public_detail_prefixes=PUBLIC_DETAIL_PREFIXES
+)
 
 app.include_router(api_users_router)
 app.include_router(api_players_profiles_router)
 app.include_router(api_matches_router)
 app.include_router(api_tournaments_router)
+app.include_router(api_search_router)
 
 app.include_router(web_users_router)
 app.include_router(web_tournament_router)
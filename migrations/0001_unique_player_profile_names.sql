@@ -0,0 +1,7 @@
+-- Player profiles are matched by their trimmed, case-insensitive full name.
+-- Enforce that key so participant rosters can be resolved with a single
+-- INSERT ... ON CONFLICT instead of a check-then-insert per name.
+--
+-- Fails if duplicate names already exist; merge them before applying.
+CREATE UNIQUE INDEX IF NOT EXISTS player_profiles_full_name_key
+    ON public.player_profiles (LOWER(TRIM(full_name)));
@@ -0,0 +1,11 @@
+-- Store the name lookup key instead of recomputing LOWER(TRIM(full_name))
+-- for every row on each lookup. The generated column is maintained by
+-- PostgreSQL on insert/update and replaces the expression index from 0001.
+ALTER TABLE public.player_profiles
+    ADD COLUMN IF NOT EXISTS normalized_name text
+    GENERATED ALWAYS AS (LOWER(TRIM(full_name))) STORED;
+
+CREATE UNIQUE INDEX IF NOT EXISTS player_profiles_normalized_name_key
+    ON public.player_profiles (normalized_name);
+
+DROP INDEX IF EXISTS public.player_profiles_full_name_key;
@@ -0,0 +1,36 @@
+-- database_script.sql only creates primary keys. Index the foreign keys and
+-- filter columns used by match, standings, statistics and login queries.
+
+-- Table used by tournament_service but missing from database_script.sql.
+CREATE TABLE IF NOT EXISTS public.tournament_winners
+(
+    tournament_id integer NOT NULL REFERENCES public.tournament (id),
+    player_profile_id integer NOT NULL REFERENCES public.player_profiles (id)
+);
+
+CREATE INDEX IF NOT EXISTS match_tournament_id_finished_idx
+    ON public.match (tournament_id, finished);
+
+CREATE INDEX IF NOT EXISTS match_date_idx
+    ON public.match (date);
+
+CREATE INDEX IF NOT EXISTS match_participants_player_profile_id_idx
+    ON public.match_participants (player_profile_id);
+
+CREATE INDEX IF NOT EXISTS tournament_participants_player_profile_id_idx
+    ON public.tournament_participants (player_profile_id);
+
+CREATE INDEX IF NOT EXISTS users_player_profile_id_idx
+    ON public.users (player_profile_id);
+
+CREATE INDEX IF NOT EXISTS users_email_idx
+    ON public.users (email);
+
+CREATE INDEX IF NOT EXISTS requests_user_id_idx
+    ON public.requests (user_id);
+
+CREATE INDEX IF NOT EXISTS requests_player_profile_id_idx
+    ON public.requests (player_profile_id);
+
+CREATE INDEX IF NOT EXISTS tournament_winners_tournament_id_idx
+    ON public.tournament_winners (tournament_id);
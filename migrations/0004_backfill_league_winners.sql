@@ -0,0 +1,28 @@
+-- League winners used to be inserted whenever the standings were viewed, once
+-- per request. They are now recorded when the last league match ends, so drop
+-- the duplicate rows and record winners for finished leagues nobody viewed.
+
+DELETE FROM public.tournament_winners tw
+USING public.tournament_winners newer
+WHERE tw.tournament_id = newer.tournament_id
+AND tw.ctid < newer.ctid;
+
+INSERT INTO public.tournament_winners (tournament_id, player_profile_id)
+SELECT DISTINCT ON (tp.tournament_id) tp.tournament_id, tp.player_profile_id
+FROM public.tournament_participants tp
+JOIN public.tournament t ON t.id = tp.tournament_id
+JOIN public.player_profiles pp ON pp.id = tp.player_profile_id
+WHERE t.format = 'League'
+AND EXISTS (
+    SELECT 1 FROM public.match m
+    WHERE m.tournament_id = tp.tournament_id
+)
+AND NOT EXISTS (
+    SELECT 1 FROM public.match m
+    WHERE m.tournament_id = tp.tournament_id AND m.finished = FALSE
+)
+AND NOT EXISTS (
+    SELECT 1 FROM public.tournament_winners tw
+    WHERE tw.tournament_id = tp.tournament_id
+)
+ORDER BY tp.tournament_id, tp.points DESC, tp.wins DESC, pp.full_name, pp.id;
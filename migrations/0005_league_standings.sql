@@ -0,0 +1,69 @@
+-- Read model for league tables, maintained by services/standings_service.py
+-- when a league match ends. Rebuild with: python -m services.standings_service
+
+CREATE TABLE IF NOT EXISTS public.league_standings
+(
+    tournament_id integer NOT NULL REFERENCES public.tournament (id),
+    player_profile_id integer NOT NULL REFERENCES public.player_profiles (id),
+    points integer NOT NULL DEFAULT 0,
+    wins integer NOT NULL DEFAULT 0,
+    draws integer NOT NULL DEFAULT 0,
+    losses integer NOT NULL DEFAULT 0,
+    score_for integer NOT NULL DEFAULT 0,
+    score_against integer NOT NULL DEFAULT 0,
+    rank integer NOT NULL,
+    PRIMARY KEY (tournament_id, player_profile_id)
+);
+
+CREATE INDEX IF NOT EXISTS league_standings_tournament_id_rank_idx
+    ON public.league_standings (tournament_id, rank);
+
+CREATE INDEX IF NOT EXISTS league_standings_player_profile_id_idx
+    ON public.league_standings (player_profile_id);
+
+-- Populate from the matches already played.
+WITH results AS (
+    SELECT
+        m.tournament_id,
+        mp.player_profile_id,
+        COALESCE(mp.score, 0) AS score_for,
+        COALESCE(opp.score, 0) AS score_against
+    FROM public.match m
+    JOIN public.match_participants mp ON mp.match_id = m.id
+    JOIN public.match_participants opp ON opp.match_id = m.id
+        AND opp.player_profile_id <> mp.player_profile_id
+    WHERE m.tournament_type = 'League' AND m.finished = TRUE
+),
+totals AS (
+    SELECT
+        tp.tournament_id,
+        tp.player_profile_id,
+        COUNT(*) FILTER (WHERE r.score_for > r.score_against) AS wins,
+        COUNT(*) FILTER (WHERE r.score_for = r.score_against) AS draws,
+        COUNT(*) FILTER (WHERE r.score_for < r.score_against) AS losses,
+        COALESCE(SUM(r.score_for), 0) AS score_for,
+        COALESCE(SUM(r.score_against), 0) AS score_against
+    FROM public.tournament_participants tp
+    JOIN public.tournament t ON t.id = tp.tournament_id AND t.format = 'League'
+    LEFT JOIN results r ON r.tournament_id = tp.tournament_id
+        AND r.player_profile_id = tp.player_profile_id
+    GROUP BY tp.tournament_id, tp.player_profile_id
+)
+INSERT INTO public.league_standings
+    (tournament_id, player_profile_id, points, wins, draws, losses, score_for, score_against, rank)
+SELECT
+    t.tournament_id,
+    t.player_profile_id,
+    3 * t.wins + t.draws,
+    t.wins,
+    t.draws,
+    t.losses,
+    t.score_for,
+    t.score_against,
+    ROW_NUMBER() OVER (
+        PARTITION BY t.tournament_id
+        ORDER BY 3 * t.wins + t.draws DESC, t.wins DESC, pp.full_name, pp.id
+    )
+FROM totals t
+JOIN public.player_profiles pp ON pp.id = t.player_profile_id
+ON CONFLICT (tournament_id, player_profile_id) DO NOTHING;
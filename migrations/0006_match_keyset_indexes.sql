@@ -0,0 +1,10 @@
+-- Keyset pagination of the match list walks match in (date, id) order,
+-- optionally within one tournament. (date, id) supersedes match_date_idx.
+
+CREATE INDEX IF NOT EXISTS match_date_id_idx
+    ON public.match (date DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS match_tournament_id_date_id_idx
+    ON public.match (tournament_id, date DESC, id DESC);
+
+DROP INDEX IF EXISTS public.match_date_idx;
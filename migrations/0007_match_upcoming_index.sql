@@ -0,0 +1,6 @@
+-- Home page "upcoming matches": the soonest unfinished matches after now.
+-- Finished matches are the bulk of the table and are left out of the index.
+
+CREATE INDEX IF NOT EXISTS match_upcoming_idx
+    ON public.match (date, id)
+    WHERE finished = FALSE;
@@ -0,0 +1,11 @@
+-- Substring and fuzzy name search (services/search_service.py). Trigram GIN
+-- indexes serve LIKE '%term%' and the similarity operator (%), which btree
+-- indexes cannot.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS player_profiles_normalized_name_trgm_idx
+    ON public.player_profiles USING gin (normalized_name gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS tournament_title_trgm_idx
+    ON public.tournament USING gin (LOWER(title) gin_trgm_ops);
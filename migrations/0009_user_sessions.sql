@@ -0,0 +1,12 @@
+-- Session store shared by all uvicorn workers, used when SESSION_BACKEND=postgres
+-- (common/session_store.py). last_activity is indexed for expiry sweeps.
+
+CREATE TABLE IF NOT EXISTS public.user_sessions
+(
+    user_id integer PRIMARY KEY REFERENCES public.users (id) ON DELETE CASCADE,
+    email character varying NOT NULL,
+    last_activity timestamp without time zone NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS user_sessions_last_activity_idx
+    ON public.user_sessions (last_activity);
@@ -1,5 +1,5 @@
-from fastapi import APIRouter, HTTPException, Header, status
-from typing import List
+from fastapi import APIRouter, HTTPException, Header, status, Query
+from typing import List, Optional
 from data.models import Match, PlayerProfile
 from services import match_service
 from services.match_service import create, match_end_league
@@ -34,8 +34,21 @@ async def create_new_match(
         )
     return match
 
-# @matches_router.get('/', response_model=Match)
-# async def get_matches(sort: str | None = None, sort_by: str | None = None):
+@matches_router.get('/')
+async def get_matches(
+    cursor: Optional[str] = Query(None, description="Cursor returned as next_cursor by the previous page"),
+    page_size: int = Query(20, ge=1, le=100),
+    tournament_id: Optional[int] = Query(None, description="Only matches of this tournament"),
+    tournament: Optional[str] = Query(None, description="Search matches by tournament title")
+):
+    try:
+        matches, next_cursor = await match_service.get_page(cursor, page_size, tournament_id, tournament)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid page cursor"
+        )
+    return {"matches": matches, "next_cursor": next_cursor}
 
 @matches_router.get('/{match_id}', response_model=Match)
 async def get_match_by_id(match_id: int):
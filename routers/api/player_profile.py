@@ -1,5 +1,6 @@
 
-from fastapi import APIRouter, HTTPException, status, Header
+from fastapi import APIRouter, HTTPException, status, Header, Query
+from typing import Optional
 
 
 from data.models import PlayerProfile,UpdateProfile
@@ -141,14 +142,26 @@ async def delete_profile(
     return {"message": "Player deleted successfully"}
 
 @players_profiles_router.get('/', status_code=status.HTTP_200_OK)
-async def get_all_profiles(search: str = None):
-    """Get all player profiles"""
-    if search:
-        profiles = await player_profile_service.get_all(search)
-    else:
-        profiles = await player_profile_service.get_all()
-    
-    return profiles
+async def get_all_profiles(
+    search: str = None,
+    page: int = Query(1, ge=1, description="Page number"),
+    cursor: Optional[int] = Query(None, description="next_cursor of the previous page; switches to cursor paging for deep pages"),
+    per_page: int = Query(10, ge=1, le=100),
+    estimated_count: bool = Query(False, description="Estimate the total for large result sets")
+):
+    """Get player profiles one page at a time, by page number or, when a cursor is given, by cursor"""
+    if cursor is not None:
+        return await player_profile_service.get_page(cursor, per_page, search, estimated_count)
+
+    return await player_profile_service.get_all(search, page, per_page, estimated_count)
+
+@players_profiles_router.get('/autocomplete', status_code=status.HTTP_200_OK)
+async def autocomplete_profiles(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=25)
+):
+    """Player names starting with the prefix, for participant name fields"""
+    return player_profile_service.autocomplete(prefix, limit)
 
 @players_profiles_router.get('/{player_profile_id}', status_code=status.HTTP_200_OK)
 async def get_profile(player_profile_id: int):
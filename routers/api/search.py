@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Query, status
+
+from services import search_service
+
+search_router = APIRouter(prefix='/api/search', tags=['search'])
+
+
+@search_router.get('', status_code=status.HTTP_200_OK)
+async def search(
+    q: str = Query(..., min_length=2, max_length=100, description="Player, tournament or match to look for"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum hits per type")
+):
+    """Fuzzy search across players, tournaments and matches"""
+    return {"query": q, "results": await search_service.search(q, limit)}
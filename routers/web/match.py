@@ -1,36 +1,38 @@
 from fastapi import APIRouter, Depends, Request, Form, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
-from common.security import csrf
-from common.auth_middleware import validate_token
+from common.security import csrf, require_csrf_token
+from common.auth_middleware import validate_token, get_current_user
 from common.security import InputSanitizer
 from common.template_config import CustomJinja2Templates
 from services import match_service, user_service, tournament_service
-from data.models import Match
+from data.models import Match, User
 from datetime import datetime
+from typing import Optional
 
 
 templates = CustomJinja2Templates(directory="templates")
-web_match_router = APIRouter(prefix="/matches")
+web_match_router = APIRouter(prefix="/matches", dependencies=[Depends(require_csrf_token)])
 
 
 @web_match_router.get("/", response_class=HTMLResponse)
-async def match_list(request: Request, tournament: str = None):
-    # Existing user authentication logic
-    token = request.cookies.get("access_token")
-    user = None
-    if token:
-        payload = await user_service.validate_token_with_session(token)
-        if payload:
-            user = await user_service.get_user_by_id(payload["id"])
-
-    # Updated to include tournament search
-    matches = await match_service.get_all(tournament_search=tournament)
+async def match_list(
+    request: Request,
+    tournament: str = None,
+    cursor: str = None,
+    user: Optional[User] = Depends(get_current_user)
+):
+    # One page at a time, newest first
+    try:
+        matches, next_cursor = await match_service.get_page(cursor=cursor, tournament_search=tournament)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid page cursor")
 
     return templates.TemplateResponse(
         "matches/list.html",
         {"request": request,
          "user": user,
          "matches": matches,
+         "next_cursor": next_cursor,
          "search": tournament}  # Add search term to template context
     )
 
@@ -39,13 +41,8 @@ async def match_list(request: Request, tournament: str = None):
 
 
 @web_match_router.get("/new", response_class=HTMLResponse)
-async def new_match_form(request: Request):
+async def new_match_form(request: Request, user: Optional[User] = Depends(get_current_user)):
     token = request.cookies.get("access_token")
-    user = None
-    if token:
-        payload = await user_service.validate_token_with_session(token)
-        if payload:
-            user = await user_service.get_user_by_id(payload["id"])
 
     is_authorized = await user_service.is_admin(token) or await user_service.is_director(token)
     if not is_authorized:
@@ -60,14 +57,10 @@ async def new_match_form(request: Request):
 @web_match_router.post("/new")
 async def create_match(
     request: Request,
-    sanitized_data: dict = Depends(InputSanitizer.sanitize_form_data)
+    sanitized_data: dict = Depends(InputSanitizer.sanitize_form_data),
+    user: Optional[User] = Depends(get_current_user)
 ):
     token = request.cookies.get("access_token")
-    user = None
-    if token:
-        payload = await user_service.validate_token_with_session(token)
-        if payload:
-            user = await user_service.get_user_by_id(payload["id"])
 
     is_authorized = await user_service.is_admin(token) or await user_service.is_director(token)
     if not is_authorized:
@@ -91,14 +84,7 @@ async def create_match(
     return RedirectResponse(url="/matches", status_code=302)
 
 @web_match_router.get("/{match_id}", response_class=HTMLResponse)
-async def match_detail(request: Request, match_id: int):
-    token = request.cookies.get("access_token")
-    user = None
-    if token:
-        payload = await user_service.validate_token_with_session(token)
-        if payload:
-            user = await user_service.get_user_by_id(payload["id"])
-            
+async def match_detail(request: Request, match_id: int, user: Optional[User] = Depends(get_current_user)):
     match = await match_service.get_match_with_scores(match_id)
     if not match:
         raise HTTPException(status_code=404, detail="Match not found")
@@ -1,16 +1,17 @@
 from fastapi import APIRouter, Depends, Request, Form, HTTPException, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
 from jose import JWTError
+from typing import Optional
 
-from common.auth_middleware import validate_token
+from common.auth_middleware import validate_token, get_current_user
 from common.template_config import CustomJinja2Templates
 from services import player_profile_service, user_service
-from data.models import PlayerProfile, UpdateProfile
+from data.models import PlayerProfile, UpdateProfile, User
 
-from common.security import InputSanitizer, csrf
+from common.security import InputSanitizer, csrf, require_csrf_token
 
 templates = CustomJinja2Templates(directory="templates")
-web_player_router = APIRouter(prefix="/players")
+web_player_router = APIRouter(prefix="/players", dependencies=[Depends(require_csrf_token)])
 
 
 @web_player_router.get("/", response_class=HTMLResponse)
@@ -18,16 +19,10 @@ async def player_list(
         request: Request,
         search: str = None,
         page: int = Query(1, ge=1),
-        per_page: int = Query(9, ge=1, le=100)
+        per_page: int = Query(9, ge=1, le=100),
+        user: Optional[User] = Depends(get_current_user)
 ):
-    token = request.cookies.get("access_token")
-    user = None
-    if token:
-        payload = await user_service.validate_token_with_session(token)
-        if payload:
-            user = await user_service.get_user_by_id(payload["id"])
-
-    result = await player_profile_service.get_all(search, page, per_page)
+    result = await player_profile_service.get_all(search, page, per_page, estimated_count=True)
 
     return templates.TemplateResponse(
         "players/list.html",
@@ -38,6 +33,8 @@ async def player_list(
             "page": result["page"],
             "total_pages": result["total_pages"],
             "total": result["total"],
+            "total_is_estimate": result["total_is_estimate"],
+            "next_cursor": result["next_cursor"],
             "search": search,
             "per_page": per_page,
             "csrf_token": csrf.generate_token()
@@ -48,18 +45,12 @@ async def player_list(
 
 
 @web_player_router.get("/new", response_class=HTMLResponse)
-async def new_player_form(request: Request):
+async def new_player_form(request: Request, user: Optional[User] = Depends(get_current_user)):
     token = request.cookies.get("access_token")
-    user = None
-    if not token:
+    if not user:
         return RedirectResponse(url="/users/login", status_code=302)
 
     try:
-        payload = await user_service.validate_token_with_session(token)  
-        if not payload:
-            return RedirectResponse(url="/users/login", status_code=302)
-            
-        user = await user_service.get_user_by_id(payload["id"])
         is_admin = await user_service.is_admin(token)
         if not is_admin:
             raise HTTPException(status_code=403, detail="Admin access required")
@@ -105,14 +96,7 @@ async def create_player(
     return RedirectResponse(url="/players", status_code=302)
 
 @web_player_router.get("/{player_id}", response_class=HTMLResponse)
-async def player_detail(request: Request, player_id: int):
-    token = request.cookies.get("access_token")
-    user = None
-    if token:
-        payload = await user_service.validate_token_with_session(token)
-        if payload:
-            user = await user_service.get_user_by_id(payload["id"])
-            
+async def player_detail(request: Request, player_id: int, user: Optional[User] = Depends(get_current_user)):
     player = await player_profile_service.get_profile_by_id(player_id)
     profile_linked_user_id = await player_profile_service.get_user_id(player_id)
     if not player:
@@ -132,14 +116,7 @@ async def player_detail(request: Request, player_id: int):
 
 
 @web_player_router.get("/{player_id}/edit", response_class=HTMLResponse)
-async def edit_player_form(request: Request, player_id: int):
-    token = request.cookies.get("access_token")
-    user = None
-    if token:
-        payload = await user_service.validate_token_with_session(token)
-        if payload:
-            user = await user_service.get_user_by_id(payload["id"])
-
+async def edit_player_form(request: Request, player_id: int, user: Optional[User] = Depends(get_current_user)):
     player = await player_profile_service.get_by_id(player_id)
     if not player:
         raise HTTPException(status_code=404, detail="Player not found")
@@ -193,24 +170,11 @@ async def claim_player_profile(request: Request):
 async def delete_player(
     request: Request,
     player_id: int,
-    csrf_token: str = Form(...),
+    user: Optional[User] = Depends(get_current_user)
 ):
-    # Verify CSRF token
-    if not csrf.validate_token(csrf_token):
-        raise HTTPException(status_code=400, detail="Invalid CSRF token")
-        
-   
-    token = request.cookies.get("access_token")
-    if not token:
+    if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
-        
-    payload = await user_service.validate_token_with_session(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid token")
-        
-    user = await user_service.get_user_by_id(payload["id"])
-    
-    
+
     profile_linked_user_id = await player_profile_service.get_user_id(player_id)
     if not user.is_admin and user.id != profile_linked_user_id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this profile")
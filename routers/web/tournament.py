@@ -1,26 +1,20 @@
 from fastapi import APIRouter, Depends, Request, Form, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
 
-from common.auth_middleware import validate_token
-from common.security import InputSanitizer, csrf
+from common.auth_middleware import validate_token, get_current_user
+from common.security import InputSanitizer, csrf, require_csrf_token
 from common.template_config import CustomJinja2Templates
 from services import tournament_service, user_service
-from data.models import Tournament
+from data.models import Tournament, User
 from fastapi.templating import Jinja2Templates
+from typing import Optional
 
 templates = CustomJinja2Templates(directory="templates")
-web_tournament_router = APIRouter(prefix="/tournaments")
+web_tournament_router = APIRouter(prefix="/tournaments", dependencies=[Depends(require_csrf_token)])
 
 
 @web_tournament_router.get("/", response_class=HTMLResponse)
-async def tournament_list(request: Request, search: str = None):
-    token = request.cookies.get("access_token")
-    user = None
-    if token:
-        payload = await user_service.validate_token_with_session(token)
-        if payload:
-            user = await user_service.get_user_by_id(payload["id"])
-        
+async def tournament_list(request: Request, search: str = None, user: Optional[User] = Depends(get_current_user)):
 
     tournaments = await tournament_service.get_all(search)
     return templates.TemplateResponse(
@@ -33,11 +27,9 @@ async def tournament_list(request: Request, search: str = None):
 
 
 @web_tournament_router.get("/new", response_class=HTMLResponse)
-async def new_tournament_form(request: Request):
+async def new_tournament_form(request: Request, user: Optional[User] = Depends(get_current_user)):
     token = request.cookies.get("access_token")
-    payload = await user_service.validate_token_with_session(token)
-    user = await user_service.get_user_by_id(payload["id"])
-    if not token:
+    if not user:
         return RedirectResponse(url="/users/login", status_code=302)
 
     is_authorized = await user_service.is_admin(token) or await user_service.is_director(token)
@@ -57,12 +49,11 @@ async def new_tournament_form(request: Request):
 @web_tournament_router.post("/new")
 async def create_tournament(
     request: Request,
-    sanitized_data: dict = Depends(InputSanitizer.sanitize_form_data)
+    sanitized_data: dict = Depends(InputSanitizer.sanitize_form_data),
+    user: Optional[User] = Depends(get_current_user)
 ):
     token = request.cookies.get("access_token")
-    payload = await user_service.validate_token_with_session(token)
-    user = await user_service.get_user_by_id(payload["id"])
-    if not token:
+    if not user:
         return RedirectResponse(url="/users/login", status_code=302)
 
     is_authorized = await user_service.is_admin(token) or await user_service.is_director(token)
@@ -87,14 +78,7 @@ async def create_tournament(
     return RedirectResponse(url="/tournaments", status_code=302)
 
 @web_tournament_router.get("/{tournament_id}", response_class=HTMLResponse)
-async def tournament_detail(request: Request, tournament_id: int):
-    token = request.cookies.get("access_token")
-    user = None
-    if token:
-        payload = await user_service.validate_token_with_session(token)
-        if payload:
-            user = await user_service.get_user_by_id(payload["id"])
-
+async def tournament_detail(request: Request, tournament_id: int, user: Optional[User] = Depends(get_current_user)):
     tournament = await tournament_service.get_by_id(tournament_id)
     if not tournament:
         raise HTTPException(status_code=404, detail="Tournament not found")
@@ -138,13 +122,7 @@ async def next_round_knockout(
 
 
 @web_tournament_router.get("/{tournament_id}/standings", response_class=HTMLResponse)
-async def tournament_standings(request: Request, tournament_id: int):
-    token = request.cookies.get("access_token")
-    user = None
-    if token:
-        payload = await user_service.validate_token_with_session(token)
-        if payload:
-            user = await user_service.get_user_by_id(payload["id"])
+async def tournament_standings(request: Request, tournament_id: int, user: Optional[User] = Depends(get_current_user)):
     tournament = await tournament_service.get_by_id(tournament_id)
     if not tournament:
         raise HTTPException(status_code=404, detail="Tournament not found")
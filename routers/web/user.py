@@ -1,5 +1,7 @@
 
 
+from typing import Optional
+
 from fastapi import APIRouter, Request, HTTPException, Depends, logger, Cookie
 from fastapi.responses import HTMLResponse, RedirectResponse
 
@@ -7,16 +9,17 @@ from fastapi.responses import HTMLResponse, RedirectResponse
 from jose import JWTError
 
 
+from common.auth_middleware import get_current_user
 from common.rate_limiter import create_rate_limit
 from common.template_config import CustomJinja2Templates
 from data.models import User, UserLogin
 from services import user_service
-from common.security import InputSanitizer, csrf, verify_csrf_token
+from common.security import InputSanitizer, csrf, require_csrf_token
 from services.user_service import validate_token_with_session, get_user_by_id, all_requests, claim_director_request, \
     claim_request, approve_player_claim, approve_director_claim, deny_claim, is_admin
 
 templates = CustomJinja2Templates(directory="templates")
-web_users_router = APIRouter(prefix="/users")
+web_users_router = APIRouter(prefix="/users", dependencies=[Depends(require_csrf_token)])
 
 @web_users_router.get("/login", response_class=HTMLResponse)
 async def login_page(request: Request):
@@ -110,7 +113,7 @@ async def logout(request: Request):
             if payload:
                 user_id = payload.get("id")
                 # Clear session first
-                user_service.SessionManager.clear_session(user_id)
+                await user_service.SessionManager.clear_session(user_id)
                 # Then invalidate user token
                 await user_service.logout_user(token)
         except Exception as e:
@@ -154,20 +157,8 @@ async def admin_dashboard(request: Request):
 
 
 @web_users_router.get("/profile", response_class=HTMLResponse)
-async def profile_page(request: Request):
-
-    token = request.cookies.get("access_token")
-    if not token:
-        return RedirectResponse(url="/users/login", status_code=302)
-
+async def profile_page(request: Request, user: Optional[User] = Depends(get_current_user)):
     try:
-
-        payload = await validate_token_with_session(token)
-        if not payload:
-            return RedirectResponse(url="/users/login", status_code=302)
-
-        user_id = payload.get("id")
-        user = await get_user_by_id(user_id)
         if not user:
             return RedirectResponse(url="/users/login", status_code=302)
 
@@ -1,40 +1,31 @@
-from fastapi import APIRouter, Request
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Request
 from fastapi.responses import HTMLResponse
 
-from common.auth_middleware import validate_token
+from common.auth_middleware import validate_token, get_current_user
 from common.template_config import CustomJinja2Templates
 from services import tournament_service, match_service, user_service
-from datetime import datetime
 from common.security import csrf
+from data.models import User
 
 templates = CustomJinja2Templates(directory="templates")
 
 web_home_router = APIRouter()
 
 @web_home_router.get("/", response_class=HTMLResponse)
-async def home(request: Request):
-    token = request.cookies.get("access_token")
-    user = None
-    if token:
-        payload = await user_service.validate_token_with_session(token)
-        if payload:
-            user = await user_service.get_user_by_id(payload["id"])
-
-
-    tournaments = await tournament_service.get_all()
-    matches = await match_service.get_all()
+async def home(request: Request, user: Optional[User] = Depends(get_current_user)):
+    latest_tournaments = await tournament_service.get_latest(3)
 
-    latest_tournaments = tournaments[:3] if tournaments else []
-    
     upcoming_matches = [
         {
             "id": match["id"],
             "tournament_type": match["tournament_type"],
-            "participants": " vs ".join([participant.split("-")[0] for participant in match["participants"]]),
+            "participants": " vs ".join(match["participants"]),
             "date": match["date"]
         }
-        for match in matches if match["date"] > datetime.now()
-    ][:4]  
+        for match in await match_service.get_upcoming(4)
+    ]
 
     return templates.TemplateResponse(
         "index.html",
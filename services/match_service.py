@@ -1,7 +1,9 @@
-from typing import Optional, List, Dict
+import base64
+from typing import Optional, List, Dict, Tuple
 from data.models import Match, MatchParticipants, PlayerProfile
-from data.database import DatabaseConnection
-from services import player_profile_service
+from data.database import DatabaseConnection, Transaction
+from services import player_profile_service, standings_service
+from services.search_service import contains_pattern
 from datetime import datetime
 
 from services.notification_service import notify_user_added_to_event
@@ -43,14 +45,10 @@ async def create_player_profile(name: str) -> Optional[PlayerProfile]:
 
 async def create(match_data: Match) -> Optional[Match]:
 
-    participant_profiles = []
-    for participant_name in match_data.participants:
-        profile = await player_profile_service.get_player_profile_by_name(participant_name)
-        if not profile:
-            profile = await create_player_profile(participant_name)
-        if not profile:
-            return None
-        participant_profiles.append(profile)
+    profiles = await player_profile_service.resolve_profiles_by_names(match_data.participants)
+    participant_profiles = [profiles.get(participant_name) for participant_name in match_data.participants]
+    if not all(participant_profiles):
+        return None
 
 
     tournament_id = None if match_data.tournament_id in [0, None] else match_data.tournament_id
@@ -60,46 +58,64 @@ async def create(match_data: Match) -> Optional[Match]:
         INSERT INTO match (format, date, tournament_id, tournament_type)
         VALUES ($1, $2, $3, $4)
     """
-    match_id = await DatabaseConnection.insert_query(
-        match_query,
-        match_data.format,
-        match_data.date,
-        tournament_id,
-        tournament_type
-    )
-
-    if not match_id:
-        return None
-
-
     participant_query = """
         INSERT INTO match_participants (match_id, player_profile_id)
         VALUES ($1, $2)
     """
 
-    for profile in participant_profiles:
-        success = await DatabaseConnection.update_query(
-            participant_query,
-            match_id,
-            profile.id
-        )
-        if not success:
-            await DatabaseConnection.update_query(
-                "DELETE FROM match WHERE id = $1",
-                match_id
+    try:
+        async with DatabaseConnection.transaction() as tx:
+            match_id = await tx.insert_query(
+                match_query,
+                match_data.format,
+                match_data.date,
+                tournament_id,
+                tournament_type
             )
-            return None
+
+            for profile in participant_profiles:
+                await tx.update_query(participant_query, match_id, profile.id)
+    except Exception as e:
+        print(f"Error during match creation: {str(e)}")
+        return None
+
+    if not match_id:
+        return None
 
     match_data.id = match_id
-    for profile in participant_profiles:
-        user_data = await DatabaseConnection.read_query("SELECT id, last_name,email FROM users WHERE player_profile_id = $1", profile.id)  
-        if user_data:
-            match_details = [match_data.date,match_data.participants]
-            await notify_user_added_to_event(user_data, "match", match_details)
+    await notify_match_participants([
+        (match_data.date, [(profile.id, participant_name)
+                           for profile, participant_name in zip(participant_profiles, match_data.participants)])
+    ])
 
     return match_data
 
 
+async def notify_match_participants(matches: List[tuple]):
+    """
+    Notifies the linked users of every participant about the matches they were added to.
+
+    `matches` is a list of (date, [(player_profile_id, full_name), ...]) tuples.
+    Linked users for all participants are fetched in one query.
+    """
+    profile_ids = list({profile_id for _, players in matches for profile_id, _ in players})
+    if not profile_ids:
+        return
+
+    query = """
+        SELECT id, last_name, email, player_profile_id
+        FROM users
+        WHERE player_profile_id = ANY($1::int[])
+    """
+    users = {row[3]: (row[0], row[1], row[2]) for row in await DatabaseConnection.read_query(query, profile_ids)}
+
+    for date, players in matches:
+        participant_names = [full_name for _, full_name in players]
+        for profile_id, _ in players:
+            if profile_id in users:
+                await notify_user_added_to_event([users[profile_id]], "match", [date, participant_names])
+
+
 
 
 async def get_match_participants_profiles(match_id: int) -> List[PlayerProfile]:
@@ -167,34 +183,120 @@ async def get_by_id(match_id: int) -> Optional[Match]:
     )
 
 
-async def get_all(tournament_search: Optional[str] = None) -> List[Dict]:
+async def get_upcoming(limit: int = 4) -> List[Dict]:
+    """
+    Returns the next `limit` unfinished matches scheduled after now, soonest first.
+
+    Served by the partial match_upcoming_idx index, so the cost does not
+    depend on how many matches have been played.
+    """
     query = """
-            SELECT 
-                m.id,
-                m.format,
-                m.date,
-                m.tournament_id,
-                m.tournament_type,
-                m.finished,
-                pp.full_name,
-                COALESCE(mp.score, 0) as score,
-                t.title as tournament_name
-            FROM match m
-            JOIN match_participants mp ON m.id = mp.match_id
-            JOIN player_profiles pp ON mp.player_profile_id = pp.id
-            LEFT JOIN tournament t ON m.tournament_id = t.id
+        WITH upcoming AS (
+            SELECT id, date, tournament_type
+            FROM match
+            WHERE finished = FALSE AND date > $1
+            ORDER BY date, id
+            LIMIT $2
+        )
+        SELECT u.id, u.date, u.tournament_type, pp.full_name
+        FROM upcoming u
+        JOIN match_participants mp ON mp.match_id = u.id
+        JOIN player_profiles pp ON pp.id = mp.player_profile_id
+        ORDER BY u.date, u.id, mp.player_profile_id
+    """
+    results = await DatabaseConnection.read_query(query, datetime.now(), limit)
+
+    matches_dict = {}
+    for row in results:
+        if row[0] not in matches_dict:
+            matches_dict[row[0]] = {
+                "id": row[0],
+                "date": row[1],
+                "tournament_type": row[2],
+                "participants": []
+            }
+        matches_dict[row[0]]["participants"].append(row[3])
+
+    return list(matches_dict.values())
+
+
+def encode_cursor(date: Optional[datetime], match_id: int) -> str:
+    """Undated matches get an empty date; they sort before every dated match."""
+    return base64.urlsafe_b64encode(f"{date.isoformat() if date else ''}|{match_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """Raises ValueError if the cursor was not produced by encode_cursor."""
+    try:
+        date, match_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return (datetime.fromisoformat(date) if date else None), int(match_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+async def get_page(
+        cursor: Optional[str] = None,
+        page_size: int = 20,
+        tournament_id: Optional[int] = None,
+        tournament_search: Optional[str] = None
+) -> Tuple[List[Dict], Optional[str]]:
     """
+    Returns one page of matches, newest first, and the cursor of the next page.
 
+    Pages are keyed on (date, id) so each one is read straight from the
+    match (date, id) indexes instead of sorting and skipping earlier rows.
+    The next cursor is None on the last page. Raises ValueError for a
+    malformed cursor.
+
+    Undated matches come first, as DESC orders NULLs first in Postgres and
+    in the index. A row comparison with a NULL date is never true, so a
+    cursor inside that block continues with the lower ids of undated
+    matches and then every dated one.
+    """
+    conditions = []
     params = []
+    if cursor:
+        cursor_date, cursor_id = decode_cursor(cursor)
+        if cursor_date is None:
+            params.append(cursor_id)
+            conditions.append(f"(m.date IS NOT NULL OR m.id < ${len(params)})")
+        else:
+            params.extend([cursor_date, cursor_id])
+            conditions.append(f"(m.date, m.id) < (${len(params) - 1}, ${len(params)})")
+    if tournament_id:
+        params.append(tournament_id)
+        conditions.append(f"m.tournament_id = ${len(params)}")
     if tournament_search:
-        query += " WHERE LOWER(t.title) LIKE LOWER($1)"
-        params.append(f"%{tournament_search}%")
+        params.append(contains_pattern(tournament_search))
+        conditions.append(f"m.tournament_id IN (SELECT id FROM tournament WHERE LOWER(title) LIKE ${len(params)})")
+    params.append(page_size + 1)
 
-    query += " ORDER BY m.date DESC"
+    query = f"""
+        WITH page AS (
+            SELECT m.id, m.format, m.date, m.tournament_id, m.tournament_type, m.finished
+            FROM match m
+            {"WHERE " + " AND ".join(conditions) if conditions else ""}
+            ORDER BY m.date DESC, m.id DESC
+            LIMIT ${len(params)}
+        )
+        SELECT
+            p.id,
+            p.format,
+            p.date,
+            p.tournament_id,
+            p.tournament_type,
+            p.finished,
+            pp.full_name,
+            COALESCE(mp.score, 0) as score,
+            t.title as tournament_name
+        FROM page p
+        LEFT JOIN match_participants mp ON p.id = mp.match_id
+        LEFT JOIN player_profiles pp ON mp.player_profile_id = pp.id
+        LEFT JOIN tournament t ON p.tournament_id = t.id
+        ORDER BY p.date DESC, p.id DESC, mp.player_profile_id
+    """
 
     results = await DatabaseConnection.read_query(query, *params)
-    if not results:
-        return []
 
     matches_dict = {}
     for row in results:
@@ -210,9 +312,18 @@ async def get_all(tournament_search: Optional[str] = None) -> List[Dict]:
                 "tournament_name": row[8],
                 "participants": []
             }
-        matches_dict[match_id]["participants"].append(f"{row[6]}-{row[7]}")
+        # Matches whose participants' profiles were deleted still hold their place in the page
+        if row[6] is not None:
+            matches_dict[match_id]["participants"].append(f"{row[6]}-{row[7]}")
+
+    matches = list(matches_dict.values())
+    if len(matches) <= page_size:
+        return matches, None
+
+    matches = matches[:page_size]
+    return matches, encode_cursor(matches[-1]["date"], matches[-1]["id"])
+
 
-    return list(matches_dict.values())
 async def get_match_with_scores(match_id: int) -> Optional[Dict]:
     query = """
             SELECT 
@@ -285,157 +396,119 @@ async def reschedule_match(match_id: int, new_date: datetime) -> Optional[Match]
     return await get_by_id(match_id)
 
 
-async def match_end_league(match_id: int, tournament_id: int):
-    query = """
-        UPDATE match
-        SET finished = True
-        WHERE id = $1
+async def finish_match(tx: Transaction, match_id: int) -> List[tuple]:
     """
-    success = await DatabaseConnection.update_query(query, match_id)
-    if not success:
-        return None
-
-    match_data = await get_match_with_scores(match_id)
-    participant_scores = [p.split('-') for p in match_data["participants"]]
-
-    if participant_scores[0][1] == participant_scores[1][1]:
-        # Handle draw case
-        draws = [participant_scores[0][0], participant_scores[1][0]]
-
-        # Update tournament_participants for draw
-        tournament_draw_query = """
-        UPDATE tournament_participants
-        SET draws = draws + 1, 
-        points = points + 1
-        WHERE player_profile_id IN ($1, $2) AND tournament_id = $3
-        """
-
-        # Update player_profiles for draw
-        player_draw_query = """
-        UPDATE player_profiles
-        SET draws = draws + 1
-        WHERE id = $1
-        """
-
-        p1_obj = str(await player_profile_service.get_player_profile_by_name(draws[0]))
-        p2_obj = str(await player_profile_service.get_player_profile_by_name(draws[1]))
-        p1_id = int(p1_obj.split('id=')[1].split()[0])
-        p2_id = int(p2_obj.split('id=')[1].split()[0])
-
-        # Execute tournament participants update
-        await DatabaseConnection.update_query(tournament_draw_query, p1_id, p2_id, tournament_id)
-
-        # Execute player profiles updates
-        await DatabaseConnection.update_query(player_draw_query, p1_id)
-        await DatabaseConnection.update_query(player_draw_query, p2_id)
-
-        return f'Match ended at a draw between {draws[0]} and {draws[1]}'
-
-    else:
-        # Handle win/loss case
-        winner = max(participant_scores, key=lambda x: int(x[1]))[0]
-        loser = min(participant_scores, key=lambda x: int(x[1]))[0]
-
-        winner_obj = str(await player_profile_service.get_player_profile_by_name(winner))
-        loser_obj = str(await player_profile_service.get_player_profile_by_name(loser))
-        winner_id = int(winner_obj.split('id=')[1].split()[0])
-        loser_id = int(loser_obj.split('id=')[1].split()[0])
-
-        # Update tournament_participants for winner
-        tournament_winner_query = """
-        UPDATE tournament_participants
-        SET wins = wins + 1,
-        points = points + 3
-        WHERE player_profile_id = $1 AND tournament_id = $2
-        """
-
-        # Update tournament_participants for loser
-        tournament_loser_query = """
-        UPDATE tournament_participants
-        SET losses = losses + 1
-        WHERE player_profile_id = $1 AND tournament_id = $2
-        """
-
-        # Update player_profiles for winner
-        player_winner_query = """
-        UPDATE player_profiles
-        SET wins = wins + 1
-        WHERE id = $1
-        """
-
-        # Update player_profiles for loser
-        player_loser_query = """
-        UPDATE player_profiles
-        SET losses = losses + 1
-        WHERE id = $1
-        """
+    Marks a match finished and applies its result in a single statement.
 
-        # Execute tournament participants updates
-        await DatabaseConnection.update_query(tournament_winner_query, winner_id, tournament_id)
-        await DatabaseConnection.update_query(tournament_loser_query, loser_id, tournament_id)
+    Results are derived from the scores already stored in match_participants
+    and written to player_profiles and, for tournament matches, to
+    tournament_participants (3 points for a win, 1 for a draw). Matches that
+    are already finished are left untouched so a result is never counted
+    twice.
 
-        # Execute player profiles updates
-        await DatabaseConnection.update_query(player_winner_query, winner_id)
-        await DatabaseConnection.update_query(player_loser_query, loser_id)
-
-        return f'Match ended. Winner: {winner}'
+    Returns (full_name, result) rows ordered by player id, where result is
+    'win', 'loss' or 'draw'; an empty list if the match was not found or
+    had already finished.
+    """
+    query = """
+        WITH finished_match AS (
+            UPDATE match
+            SET finished = True
+            WHERE id = $1 AND finished = False
+            RETURNING id, tournament_id
+        ),
+        results AS (
+            SELECT
+                mp.player_profile_id,
+                fm.tournament_id,
+                CASE
+                    WHEN COALESCE(mp.score, 0) > COALESCE(opp.score, 0) THEN 'win'
+                    WHEN COALESCE(mp.score, 0) < COALESCE(opp.score, 0) THEN 'loss'
+                    ELSE 'draw'
+                END AS result
+            FROM finished_match fm
+            JOIN match_participants mp ON mp.match_id = fm.id
+            JOIN match_participants opp ON opp.match_id = fm.id
+                AND opp.player_profile_id <> mp.player_profile_id
+        ),
+        tournament_update AS (
+            UPDATE tournament_participants tp
+            SET wins = tp.wins + (r.result = 'win')::int,
+                losses = tp.losses + (r.result = 'loss')::int,
+                draws = tp.draws + (r.result = 'draw')::int,
+                points = tp.points + CASE r.result WHEN 'win' THEN 3 WHEN 'draw' THEN 1 ELSE 0 END
+            FROM results r
+            WHERE tp.tournament_id = r.tournament_id
+            AND tp.player_profile_id = r.player_profile_id
+        ),
+        profile_update AS (
+            UPDATE player_profiles pp
+            SET wins = COALESCE(pp.wins, 0) + (r.result = 'win')::int,
+                losses = COALESCE(pp.losses, 0) + (r.result = 'loss')::int,
+                draws = COALESCE(pp.draws, 0) + (r.result = 'draw')::int
+            FROM results r
+            WHERE pp.id = r.player_profile_id
+            RETURNING pp.id, pp.full_name, r.result
+        )
+        SELECT full_name, result
+        FROM profile_update
+        ORDER BY id
+    """
+    return await tx.read_query(query, match_id)
 
-async def end_single_match(match_id: int) -> bool:
-    match_data = await get_match_with_scores(match_id)
-    if not match_data:
-        return False
 
-    update_query = """
-        UPDATE match
-        SET finished = True
-        WHERE id = $1
+async def record_league_winner(tx: Transaction, match_id: int) -> bool:
     """
-    success = await DatabaseConnection.update_query(update_query, match_id)
-    if not success:
-        return False
-
-    participant_scores = [p.split('-') for p in match_data["participants"]]
+    Records the winner of the league the match belongs to once its last match has finished.
 
+    The winner is the player ranked first in league_standings. Does nothing
+    while league matches are still open or if a winner has already been
+    recorded.
+    """
+    query = """
+        INSERT INTO tournament_winners (tournament_id, player_profile_id)
+        SELECT ls.tournament_id, ls.player_profile_id
+        FROM league_standings ls
+        WHERE ls.tournament_id = (SELECT tournament_id FROM match WHERE id = $1)
+        AND ls.rank = 1
+        AND NOT EXISTS (
+            SELECT 1 FROM match m
+            WHERE m.tournament_id = ls.tournament_id AND m.finished = FALSE
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM tournament_winners tw
+            WHERE tw.tournament_id = ls.tournament_id
+        )
+    """
+    return await tx.update_query(query, match_id)
 
-    if participant_scores[0][1] == participant_scores[1][1]:
-        # Update both players' draw counts
-        draw_query = """
-            UPDATE player_profiles
-            SET draws = draws + 1
-            WHERE id = $1
-        """
-        for participant in participant_scores:
-            player_obj = await player_profile_service.get_player_profile_by_name(participant[0])
-            if player_obj:
-                await DatabaseConnection.update_query(draw_query, player_obj.id)
-        return True
 
+async def match_end_league(match_id: int, tournament_id: int):
+    try:
+        async with DatabaseConnection.transaction() as tx:
+            results = await finish_match(tx, match_id)
+            if results:
+                await standings_service.apply_match_result(tx, match_id)
+                await record_league_winner(tx, match_id)
+    except Exception as e:
+        print(f"Error ending league match {match_id}: {str(e)}")
+        return None
 
-    winner = max(participant_scores, key=lambda x: int(x[1]))[0]
-    loser = min(participant_scores, key=lambda x: int(x[1]))[0]
+    if not results:
+        return None
 
+    if all(result == 'draw' for _, result in results):
+        return f'Match ended at a draw between {results[0][0]} and {results[1][0]}'
 
-    winner_obj = await player_profile_service.get_player_profile_by_name(winner)
-    loser_obj = await player_profile_service.get_player_profile_by_name(loser)
+    winner = next(full_name for full_name, result in results if result == 'win')
+    return f'Match ended. Winner: {winner}'
 
-    if not winner_obj or not loser_obj:
+async def end_single_match(match_id: int) -> bool:
+    try:
+        async with DatabaseConnection.transaction() as tx:
+            results = await finish_match(tx, match_id)
+    except Exception as e:
+        print(f"Error ending match {match_id}: {str(e)}")
         return False
 
-    winner_query = """
-        UPDATE player_profiles
-        SET wins = wins + 1
-        WHERE id = $1
-    """
-    await DatabaseConnection.update_query(winner_query, winner_obj.id)
-
-
-    loser_query = """
-        UPDATE player_profiles
-        SET losses = losses + 1
-        WHERE id = $1
-    """
-    await DatabaseConnection.update_query(loser_query, loser_obj.id)
-
-    return True
-
-
+    return bool(results)
@@ -1,8 +1,13 @@
-from typing import Optional
+import asyncio
+import json
+import os
+from typing import Optional, List, Dict, Tuple
 
+from common.cache import LRUCache
+from common.prefix_index import PrefixIndex
 from data.database import DatabaseConnection
+from services.search_service import contains_pattern
 from data.models import PlayerProfile, UpdateProfile
-from routers.api.player_profile import players_profiles_router
 
 
 async def get_player_profile_by_name(full_name: str) -> Optional[PlayerProfile]:
@@ -10,17 +15,97 @@ async def get_player_profile_by_name(full_name: str) -> Optional[PlayerProfile]:
     query = """
         SELECT id, full_name, country, sports_club, wins, losses, draws
         FROM player_profiles 
-        WHERE LOWER(TRIM(full_name)) = LOWER(TRIM($1))
+        WHERE normalized_name = LOWER(TRIM($1))
     """
     results = await DatabaseConnection.read_query(query, full_name)
     return PlayerProfile.from_query_result(*results[0]) if results else None
 
 
 
+# In-process prefix index of every profile name, used for autocomplete. Each
+# worker process holds its own copy: writes it handles update it at once
+# through create/resolve/delete below, and changes made by other workers
+# show up after the next periodic reload.
+NAME_INDEX_REFRESH_SECONDS = float(os.getenv("NAME_INDEX_REFRESH_SECONDS", "60"))
+name_index = PrefixIndex()
+
+
+async def load_name_index() -> int:
+    results = await DatabaseConnection.read_query("SELECT id, full_name FROM player_profiles")
+    name_index.build((row[0], row[1]) for row in results)
+    return len(name_index)
+
+
+async def refresh_name_index(interval: float = NAME_INDEX_REFRESH_SECONDS):
+    """Reloads the name index every `interval` seconds; run as a background task."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await load_name_index()
+        except Exception as e:
+            print(f"Error refreshing player name index: {str(e)}")
+
+
+def autocomplete(prefix: str, limit: int = 10) -> List[Dict]:
+    return [{"id": profile_id, "full_name": full_name} for profile_id, full_name in name_index.search(prefix, limit)]
+
+
+async def resolve_profiles_by_names(names: List[str]) -> Dict[str, PlayerProfile]:
+    """
+    Resolves a whole roster of participant names to player profiles,
+    creating empty profiles for names that do not exist yet.
+
+    Existing profiles are fetched with one query and all missing ones are
+    inserted with a single INSERT ... ON CONFLICT ... RETURNING, so the
+    roster costs two round trips regardless of its size. Names are only
+    normalized in SQL, by the same LOWER(TRIM()) as the generated
+    normalized_name column, and every row comes back with the name it was
+    found by. The returned map is keyed by the names exactly as they were
+    passed in.
+    """
+    if not names:
+        return {}
+
+    lookup_query = """
+        SELECT n.name, pp.id, pp.full_name, pp.country, pp.sports_club, pp.wins, pp.losses, pp.draws
+        FROM unnest($1::text[]) AS n(name)
+        JOIN player_profiles pp ON pp.normalized_name = LOWER(TRIM(n.name))
+    """
+    insert_query = """
+        INSERT INTO player_profiles (full_name, country, sports_club, wins, losses, draws)
+        SELECT name, NULL, NULL, 0, 0, 0
+        FROM unnest($1::text[]) AS name
+        ON CONFLICT (normalized_name) DO NOTHING
+        RETURNING id, full_name, country, sports_club, wins, losses, draws
+    """
+
+    distinct_names = list(dict.fromkeys(names))
+    results = await DatabaseConnection.read_query(lookup_query, distinct_names)
+    profiles = {row[0]: PlayerProfile.from_query_result(*row[1:]) for row in results}
+
+    missing = [name for name in distinct_names if name not in profiles]
+    if missing:
+        # Inserted rows keep the name they were created from as full_name.
+        results = await DatabaseConnection.read_query(insert_query, missing)
+        for row in results:
+            profiles[row[1]] = PlayerProfile.from_query_result(*row)
+            name_index.add(row[0], row[1])
+
+        # Names skipped by ON CONFLICT, because another request or another
+        # spelling in this roster created the profile, are read back.
+        unresolved = [name for name in missing if name not in profiles]
+        if unresolved:
+            results = await DatabaseConnection.read_query(lookup_query, unresolved)
+            for row in results:
+                profiles[row[0]] = PlayerProfile.from_query_result(*row[1:])
+
+    return {name: profiles[name] for name in names if name in profiles}
+
+
 async def create(player_profile: PlayerProfile):
     duplicate_query = """
-        SELECT * FROM player_profiles 
-        WHERE LOWER(TRIM(full_name)) = LOWER(TRIM($1))
+        SELECT id FROM player_profiles 
+        WHERE normalized_name = LOWER(TRIM($1))
     """
     duplicate_player = await DatabaseConnection.read_query(
         duplicate_query,
@@ -42,7 +127,7 @@ async def create(player_profile: PlayerProfile):
         ) VALUES ($1, $2, $3, $4, $5, $6)
     """
 
-    return await DatabaseConnection.insert_query(
+    profile_id = await DatabaseConnection.insert_query(
         query,
         player_profile.full_name,
         player_profile.country,
@@ -52,6 +137,10 @@ async def create(player_profile: PlayerProfile):
         player_profile.draws
 
     )
+    if profile_id:
+        name_index.add(profile_id, player_profile.full_name)
+
+    return profile_id
 
 async def update(id: int, player_profile: UpdateProfile):
     existing_profile = await DatabaseConnection.read_query(
@@ -106,48 +195,61 @@ async def delete_player_profile(player_profile_id: int):
 
 
     check_query = """
-        SELECT id FROM player_profiles WHERE id = $1
+        SELECT pp.id, u.id
+        FROM player_profiles pp
+        LEFT JOIN users u ON u.player_profile_id = pp.id
+        WHERE pp.id = $1
+        FOR UPDATE OF pp
     """
-    profile = await DatabaseConnection.read_query(check_query, player_profile_id)
-    if not profile:
-        return None
-
-    linked = await check_linked_player_profile(player_profile_id)
-    if linked:
-        return None
 
     try:
+        async with DatabaseConnection.transaction() as tx:
+            profile = await tx.read_query(check_query, player_profile_id)
+            if not profile:
+                return None
+
+            linked = profile[0][1]
+            if linked:
+                return None
 
-        await DatabaseConnection.update_query("""
-            DELETE FROM match_participants 
-            WHERE player_profile_id = $1
-        """, player_profile_id)
+            await tx.update_query("""
+                DELETE FROM match_participants 
+                WHERE player_profile_id = $1
+            """, player_profile_id)
 
 
-        await DatabaseConnection.update_query("""
-            DELETE FROM tournament_participants 
-            WHERE player_profile_id = $1
-        """, player_profile_id)
+            await tx.update_query("""
+                DELETE FROM tournament_participants 
+                WHERE player_profile_id = $1
+            """, player_profile_id)
 
 
-        await DatabaseConnection.update_query("""
-            DELETE FROM requests 
-            WHERE player_profile_id = $1
-        """, player_profile_id)
+            await tx.update_query("""
+                DELETE FROM league_standings
+                WHERE player_profile_id = $1
+            """, player_profile_id)
 
 
-        await DatabaseConnection.update_query("""
-            UPDATE users 
-            SET player_profile_id = NULL 
-            WHERE player_profile_id = $1
-        """, player_profile_id)
+            await tx.update_query("""
+                DELETE FROM requests 
+                WHERE player_profile_id = $1
+            """, player_profile_id)
 
 
-        success = await DatabaseConnection.update_query("""
-            DELETE FROM player_profiles 
-            WHERE id = $1
-        """, player_profile_id)
+            await tx.update_query("""
+                UPDATE users 
+                SET player_profile_id = NULL 
+                WHERE player_profile_id = $1
+            """, player_profile_id)
 
+
+            success = await tx.update_query("""
+                DELETE FROM player_profiles 
+                WHERE id = $1
+            """, player_profile_id)
+
+        if success:
+            name_index.remove(player_profile_id)
         return success
 
     except Exception as e:
@@ -155,57 +257,156 @@ async def delete_player_profile(player_profile_id: int):
         return False
 
 
-async def get_all(search: str = None, page: int = 1, per_page: int = 10):
+# Page number -> id the page starts after, keyed by (search, per_page, page).
+# Pages are cut by id, so new profiles only extend the last page; the TTL
+# bounds how long a deletion can shift cached page boundaries.
+PAGE_CURSORS = LRUCache(max_size=10_000, ttl_seconds=300)
 
+# Below this many rows an exact COUNT(*) is cheap and planner estimates are
+# least accurate, so estimated counts fall back to counting.
+ESTIMATED_COUNT_THRESHOLD = 10_000
 
-    offset = (page - 1) * per_page
 
+def search_filter(search: Optional[str], params: list) -> List[str]:
+    if not search:
+        return []
+    params.append(contains_pattern(search))
+    return [f"normalized_name LIKE ${len(params)}"]
 
-    count_query = """
-        SELECT COUNT(*) 
-        FROM player_profiles
+
+async def count_profiles(search: str = None, estimated: bool = False) -> Tuple[int, bool]:
     """
+    Returns (count, is_estimate) for the profiles matching `search`.
 
+    With `estimated`, large result sets are sized from planner statistics
+    instead of a full COUNT(*).
+    """
+    params = []
+    conditions = search_filter(search, params)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    if estimated:
+        if search:
+            plan = await DatabaseConnection.read_query(f"EXPLAIN (FORMAT JSON) SELECT id FROM player_profiles{where}", *params)
+            estimate = int(json.loads(plan[0][0])[0]["Plan"]["Plan Rows"])
+        else:
+            result = await DatabaseConnection.read_query(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = 'player_profiles'::regclass"
+            )
+            estimate = int(result[0][0]) if result else 0
+        if estimate >= ESTIMATED_COUNT_THRESHOLD:
+            return estimate, True
+
+    result = await DatabaseConnection.read_query(f"SELECT COUNT(*) FROM player_profiles{where}", *params)
+    return result[0][0], False
+
+
+async def get_page(cursor: Optional[int] = None, per_page: int = 10, search: str = None, estimated_count: bool = False) -> Dict:
+    """
+    Returns the profiles after id `cursor`, ordered by id, and the cursor of the next page.
 
-    data_query = """
+    `next_cursor` is None on the last page.
+    """
+    params = []
+    conditions = search_filter(search, params)
+    if cursor is not None:
+        params.append(cursor)
+        conditions.append(f"id > ${len(params)}")
+    params.append(per_page + 1)
+
+    data_query = f"""
         SELECT id, full_name, country, sports_club, wins, losses, draws
         FROM player_profiles
+        {"WHERE " + " AND ".join(conditions) if conditions else ""}
+        ORDER BY id
+        LIMIT ${len(params)}
     """
+    results = await DatabaseConnection.read_query(data_query, *params)
+    players = [PlayerProfile.from_query_result(*result) for result in results] if results else []
 
+    next_cursor = None
+    if len(players) > per_page:
+        players = players[:per_page]
+        next_cursor = players[-1].id
 
-    if search:
-        search_condition = " WHERE LOWER(full_name) LIKE LOWER($1)"
-        count_query += search_condition
-        data_query += search_condition
-        search_pattern = f'%{search}%'
+    total, total_is_estimate = await count_profiles(search, estimated_count)
 
+    return {
+        "players": players,
+        "next_cursor": next_cursor,
+        "total": total,
+        "total_is_estimate": total_is_estimate,
+        "per_page": per_page
+    }
 
-        total_count = await DatabaseConnection.read_query(count_query, search_pattern)
 
+async def find_page_cursor(search: Optional[str], page: int, per_page: int) -> Tuple[Optional[int], bool]:
+    """
+    Returns (cursor, found) for the id page `page` starts after.
 
-        data_query += " ORDER BY id LIMIT $2 OFFSET $3"
-        results = await DatabaseConnection.read_query(data_query, search_pattern, per_page, offset)
-    else:
+    Starts from the nearest cached earlier page and skips only the rows in
+    between. `found` is False when the page lies past the last profile.
+    """
+    if page <= 1:
+        return None, True
+
+    known_page, cursor = 1, None
+    for candidate in range(page, 1, -1):
+        cached = PAGE_CURSORS.get((search, per_page, candidate))
+        if cached is not None:
+            known_page, cursor = candidate, cached
+            break
+
+    if known_page == page:
+        return cursor, True
+
+    params = []
+    conditions = search_filter(search, params)
+    if cursor is not None:
+        params.append(cursor)
+        conditions.append(f"id > ${len(params)}")
+    params.append((page - known_page) * per_page - 1)
+
+    query = f"""
+        SELECT id
+        FROM player_profiles
+        {"WHERE " + " AND ".join(conditions) if conditions else ""}
+        ORDER BY id
+        OFFSET ${len(params)}
+        LIMIT 1
+    """
+    result = await DatabaseConnection.read_query(query, *params)
+    if not result:
+        return None, False
 
-        total_count = await DatabaseConnection.read_query(count_query)
+    PAGE_CURSORS.set((search, per_page, page), result[0][0])
+    return result[0][0], True
 
 
-        data_query += " ORDER BY id LIMIT $1 OFFSET $2"
-        results = await DatabaseConnection.read_query(data_query, per_page, offset)
+async def get_all(search: str = None, page: int = 1, per_page: int = 10, estimated_count: bool = False):
+    """Page-number listing, served by keyset pages through the cached page -> cursor map."""
+    search = search or None
+    cursor, found = await find_page_cursor(search, page, per_page)
 
+    if found:
+        result = await get_page(cursor, per_page, search, estimated_count)
+        if result["next_cursor"] is not None:
+            PAGE_CURSORS.set((search, per_page, page + 1), result["next_cursor"])
+    else:
+        total, total_is_estimate = await count_profiles(search, estimated_count)
+        result = {"players": [], "next_cursor": None, "total": total, "total_is_estimate": total_is_estimate}
 
-    total_items = total_count[0][0]
+    total_items = result["total"]
     total_pages = (total_items + per_page - 1) // per_page
 
-
-    players = [PlayerProfile.from_query_result(*result) for result in results] if results else []
-
     return {
-        "players": players,
+        "players": result["players"],
         "total": total_items,
+        "total_is_estimate": result["total_is_estimate"],
         "page": page,
         "total_pages": total_pages,
-        "per_page": per_page
+        "per_page": per_page,
+        "next_cursor": result["next_cursor"]
     }
 
 async def get_profile_by_id(player_profile_id: int):
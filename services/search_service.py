@@ -0,0 +1,96 @@
+from typing import List, Dict
+
+from data.database import DatabaseConnection
+
+
+def contains_pattern(term: str) -> str:
+    """
+    Lower-cased LIKE pattern matching `term` anywhere in a string.
+
+    LIKE wildcards in the term are escaped so they match literally. Compare
+    it against LOWER(column) (or normalized_name) so the pg_trgm indexes
+    from migration 0008 can serve the filter.
+    """
+    escaped = term.strip().lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+async def search(term: str, limit: int = 10) -> List[Dict]:
+    """
+    Fuzzy search across players, tournaments and matches in one query.
+
+    Players and tournaments are matched on their names by trigram similarity
+    or substring. Matches are the most recent ones of the players and
+    tournaments that were hit. Every hit carries its type, id, a display
+    title and a similarity score, and hits are ranked by that score.
+    At most `limit` hits of each type are returned.
+    """
+    query = """
+        WITH player_hits AS (
+            SELECT pp.id, pp.full_name AS title, similarity(pp.normalized_name, $1) AS score
+            FROM player_profiles pp
+            WHERE pp.normalized_name % $1 OR pp.normalized_name LIKE $2
+            ORDER BY score DESC, pp.id
+            LIMIT $3
+        ),
+        tournament_hits AS (
+            SELECT t.id, t.title, similarity(LOWER(t.title), $1) AS score
+            FROM tournament t
+            WHERE LOWER(t.title) % $1 OR LOWER(t.title) LIKE $2
+            ORDER BY score DESC, t.id
+            LIMIT $3
+        ),
+        match_candidates AS (
+            SELECT recent.match_id, ph.score
+            FROM player_hits ph
+            CROSS JOIN LATERAL (
+                SELECT mp.match_id
+                FROM match_participants mp
+                WHERE mp.player_profile_id = ph.id
+                ORDER BY mp.match_id DESC
+                LIMIT $3
+            ) recent
+            UNION ALL
+            SELECT recent.id, th.score
+            FROM tournament_hits th
+            CROSS JOIN LATERAL (
+                SELECT m.id
+                FROM match m
+                WHERE m.tournament_id = th.id
+                ORDER BY m.date DESC, m.id DESC
+                LIMIT $3
+            ) recent
+        ),
+        match_hits AS (
+            SELECT match_id AS id, MAX(score) AS score
+            FROM match_candidates
+            GROUP BY match_id
+            ORDER BY score DESC, match_id DESC
+            LIMIT $3
+        ),
+        match_titles AS (
+            SELECT mh.id, string_agg(pp.full_name, ' vs ' ORDER BY pp.id) AS title, mh.score
+            FROM match_hits mh
+            JOIN match_participants mp ON mp.match_id = mh.id
+            JOIN player_profiles pp ON pp.id = mp.player_profile_id
+            GROUP BY mh.id, mh.score
+        )
+        SELECT 'player' AS type, id, title, score FROM player_hits
+        UNION ALL
+        SELECT 'tournament', id, title, score FROM tournament_hits
+        UNION ALL
+        SELECT 'match', id, title, score FROM match_titles
+        ORDER BY score DESC, type, id
+    """
+    normalized = term.strip().lower()
+    results = await DatabaseConnection.read_query(query, normalized, contains_pattern(term), limit)
+
+    return [
+        {
+            "type": row[0],
+            "id": row[1],
+            "title": row[2],
+            "score": round(float(row[3]), 3)
+        }
+        for row in results
+    ]
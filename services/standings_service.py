@@ -0,0 +1,191 @@
+"""
+Maintains the league_standings read model (migration 0005).
+
+Rows are seeded when a league is created and updated in the transaction that
+ends each league match, so reading a table is a range scan on
+(tournament_id, rank). Ranks follow points, then wins, then player name and id.
+
+Rebuild from the match history after a manual data fix with:
+
+    python -m services.standings_service [tournament_id]
+"""
+import asyncio
+import sys
+from typing import Optional
+
+from data.database import DatabaseConnection, Transaction
+
+
+async def seed_league(tx: Transaction, tournament_id: int) -> bool:
+    """Creates an empty standings row for every participant of a new league."""
+    query = """
+        INSERT INTO league_standings (tournament_id, player_profile_id, rank)
+        SELECT
+            tp.tournament_id,
+            tp.player_profile_id,
+            ROW_NUMBER() OVER (ORDER BY pp.full_name, pp.id)
+        FROM tournament_participants tp
+        JOIN player_profiles pp ON pp.id = tp.player_profile_id
+        WHERE tp.tournament_id = $1
+    """
+    return await tx.update_query(query, tournament_id)
+
+
+async def apply_match_result(tx: Transaction, match_id: int) -> bool:
+    """
+    Adds the result of a finished league match to its league's standings.
+
+    The two participants' rows get the new totals and every row whose rank
+    changes is rewritten, all in one statement. Must be called once per
+    match, in the transaction that marks it finished. Matches outside a
+    league leave the table untouched.
+
+    The league's rows are locked first. Totals and ranks are written as
+    absolute values computed from the statement's snapshot, so a second
+    match of the same league finishing concurrently waits for this
+    transaction and then computes from its committed rows instead of
+    overwriting them.
+    """
+    lock_query = """
+        SELECT 1 FROM league_standings
+        WHERE tournament_id = (
+            SELECT tournament_id FROM match
+            WHERE id = $1 AND tournament_type = 'League'
+        )
+        ORDER BY player_profile_id
+        FOR UPDATE
+    """
+    await tx.read_query(lock_query, match_id)
+
+    query = """
+        WITH results AS (
+            SELECT
+                m.tournament_id,
+                mp.player_profile_id,
+                COALESCE(mp.score, 0) AS score_for,
+                COALESCE(opp.score, 0) AS score_against
+            FROM match m
+            JOIN match_participants mp ON mp.match_id = m.id
+            JOIN match_participants opp ON opp.match_id = m.id
+                AND opp.player_profile_id <> mp.player_profile_id
+            WHERE m.id = $1 AND m.tournament_type = 'League'
+        ),
+        totals AS (
+            SELECT
+                ls.tournament_id,
+                ls.player_profile_id,
+                ls.points + CASE
+                    WHEN r.score_for > r.score_against THEN 3
+                    WHEN r.score_for = r.score_against THEN 1
+                    ELSE 0
+                END AS points,
+                ls.wins + COALESCE((r.score_for > r.score_against)::int, 0) AS wins,
+                ls.draws + COALESCE((r.score_for = r.score_against)::int, 0) AS draws,
+                ls.losses + COALESCE((r.score_for < r.score_against)::int, 0) AS losses,
+                ls.score_for + COALESCE(r.score_for, 0) AS score_for,
+                ls.score_against + COALESCE(r.score_against, 0) AS score_against,
+                r.player_profile_id IS NOT NULL AS played
+            FROM league_standings ls
+            LEFT JOIN results r ON r.player_profile_id = ls.player_profile_id
+            WHERE ls.tournament_id = (SELECT tournament_id FROM results LIMIT 1)
+        ),
+        ranked AS (
+            SELECT
+                t.*,
+                ROW_NUMBER() OVER (ORDER BY t.points DESC, t.wins DESC, pp.full_name, pp.id) AS rank
+            FROM totals t
+            JOIN player_profiles pp ON pp.id = t.player_profile_id
+        )
+        UPDATE league_standings ls
+        SET points = r.points,
+            wins = r.wins,
+            draws = r.draws,
+            losses = r.losses,
+            score_for = r.score_for,
+            score_against = r.score_against,
+            rank = r.rank
+        FROM ranked r
+        WHERE ls.tournament_id = r.tournament_id
+        AND ls.player_profile_id = r.player_profile_id
+        AND (r.played OR ls.rank <> r.rank)
+    """
+    return await tx.update_query(query, match_id)
+
+
+async def rebuild(tournament_id: Optional[int] = None) -> int:
+    """
+    Recomputes standings from finished league matches.
+
+    Rebuilds a single league, or every league when no id is given, and
+    returns the number of rows written.
+    """
+    delete_query = """
+        DELETE FROM league_standings
+        WHERE $1::int IS NULL OR tournament_id = $1
+    """
+    insert_query = """
+        WITH results AS (
+            SELECT
+                m.tournament_id,
+                mp.player_profile_id,
+                COALESCE(mp.score, 0) AS score_for,
+                COALESCE(opp.score, 0) AS score_against
+            FROM match m
+            JOIN match_participants mp ON mp.match_id = m.id
+            JOIN match_participants opp ON opp.match_id = m.id
+                AND opp.player_profile_id <> mp.player_profile_id
+            WHERE m.tournament_type = 'League' AND m.finished = TRUE
+            AND ($1::int IS NULL OR m.tournament_id = $1)
+        ),
+        totals AS (
+            SELECT
+                tp.tournament_id,
+                tp.player_profile_id,
+                COUNT(*) FILTER (WHERE r.score_for > r.score_against) AS wins,
+                COUNT(*) FILTER (WHERE r.score_for = r.score_against) AS draws,
+                COUNT(*) FILTER (WHERE r.score_for < r.score_against) AS losses,
+                COALESCE(SUM(r.score_for), 0) AS score_for,
+                COALESCE(SUM(r.score_against), 0) AS score_against
+            FROM tournament_participants tp
+            JOIN tournament t ON t.id = tp.tournament_id AND t.format = 'League'
+            LEFT JOIN results r ON r.tournament_id = tp.tournament_id
+                AND r.player_profile_id = tp.player_profile_id
+            WHERE $1::int IS NULL OR tp.tournament_id = $1
+            GROUP BY tp.tournament_id, tp.player_profile_id
+        ),
+        inserted AS (
+            INSERT INTO league_standings
+                (tournament_id, player_profile_id, points, wins, draws, losses, score_for, score_against, rank)
+            SELECT
+                t.tournament_id,
+                t.player_profile_id,
+                3 * t.wins + t.draws,
+                t.wins,
+                t.draws,
+                t.losses,
+                t.score_for,
+                t.score_against,
+                ROW_NUMBER() OVER (
+                    PARTITION BY t.tournament_id
+                    ORDER BY 3 * t.wins + t.draws DESC, t.wins DESC, pp.full_name, pp.id
+                )
+            FROM totals t
+            JOIN player_profiles pp ON pp.id = t.player_profile_id
+            RETURNING 1
+        )
+        SELECT COUNT(*) FROM inserted
+    """
+    async with DatabaseConnection.transaction() as tx:
+        await tx.update_query(delete_query, tournament_id)
+        result = await tx.read_query(insert_query, tournament_id)
+    return result[0][0]
+
+
+async def main(tournament_id: Optional[int] = None):
+    rows = await rebuild(tournament_id)
+    print(f"Rebuilt {rows} standings rows")
+    await DatabaseConnection.close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else None))
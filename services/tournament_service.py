@@ -2,11 +2,11 @@ import itertools
 from random import random
 from typing import List, Optional, Dict
 from data.models import Tournament, Match, PlayerProfile
-from data.database import DatabaseConnection
-from services import match_service, player_profile_service
+from data.database import DatabaseConnection, Transaction
+from services import match_service, player_profile_service, standings_service
+from services.search_service import contains_pattern
 from datetime import datetime, timedelta
 import random
-from services.match_service import create_player_profile
 
 
 async def create(tournament_data: Tournament, participants: List[str]) -> Optional[Tournament]:
@@ -59,9 +59,9 @@ async def get_all(search: Optional[str] = None) -> List[dict]:
 
     if search:
         query += """
-        WHERE LOWER(t.title) LIKE LOWER($1)
+        WHERE LOWER(t.title) LIKE $1
         """
-        search_pattern = f'%{search}%'
+        search_pattern = contains_pattern(search)
         result = await DatabaseConnection.read_query(query, search_pattern)
     else:
         result = await DatabaseConnection.read_query(query)
@@ -87,6 +87,47 @@ async def get_all(search: Optional[str] = None) -> List[dict]:
 
     return list(result_dict.values())
 
+async def get_latest(limit: int = 3) -> List[dict]:
+    """Returns the `limit` most recently created tournaments with their winner, if any."""
+    query = """
+    SELECT
+        t.id,
+        t.title,
+        t.format,
+        t.match_format,
+        t.prize,
+        tw.player_profile_id IS NOT NULL AS has_winner,
+        p.full_name AS winner_name
+    FROM (
+        SELECT id, title, format, match_format, prize
+        FROM tournament
+        ORDER BY id DESC
+        LIMIT $1
+    ) t
+    LEFT JOIN LATERAL (
+        SELECT player_profile_id
+        FROM tournament_winners
+        WHERE tournament_id = t.id
+        LIMIT 1
+    ) tw ON TRUE
+    LEFT JOIN player_profiles p ON p.id = tw.player_profile_id
+    ORDER BY t.id DESC
+    """
+    result = await DatabaseConnection.read_query(query, limit)
+
+    return [
+        {
+            "id": row[0],
+            "title": row[1],
+            "format": row[2],
+            "match_format": row[3],
+            "prize": row[4],
+            "has_winner": row[5],
+            "winner_name": row[6]
+        }
+        for row in result
+    ]
+
 async def get_by_id(tournament_id: int) -> Optional[Dict]:
     query = """
         SELECT
@@ -153,103 +194,111 @@ async def get_by_id(tournament_id: int) -> Optional[Dict]:
 
 async def create_knockout_matches(tournament_id, participants: List[str], match_format:str):
 
-    participant_profiles = []
-    for participant_name in participants:
-        profile = await player_profile_service.get_player_profile_by_name(participant_name)
-        if not profile:
-            profile = await create_player_profile(participant_name)
-        if not profile:
-            return None
-        participant_profiles.append(profile)
-
-    for participant in participant_profiles:
-        query = """INSERT INTO tournament_participants 
-        (tournament_id, player_profile_id)
-        VALUES ($1, $2)"""
-        await DatabaseConnection.update_query(query, tournament_id,participant.id)
+    profiles = await player_profile_service.resolve_profiles_by_names(participants)
+    participant_profiles = [profiles.get(participant_name) for participant_name in participants]
+    if not all(participant_profiles):
+        return None
 
     random.shuffle(participant_profiles)
 
+    fixtures = []
     days = 1
-    for i in range(0, len(participant_profiles),2):
-        match_data= Match(
-            format=match_format,
-            date= datetime.now() + timedelta(days=days),
-            participants=[participant_profiles[i].full_name,participant_profiles[i + 1].full_name],
-            tournament_id=tournament_id,
-            tournament_type="Knockout"
-        )
-        match = await match_service.create(match_data)
-        if not match:
-            return False
+    start = datetime.now()
+    for i in range(0, len(participant_profiles) - 1, 2):
+        fixtures.append((
+            start + timedelta(days=days),
+            [(participant_profiles[i].id, participant_profiles[i].full_name),
+             (participant_profiles[i + 1].id, participant_profiles[i + 1].full_name)]
+        ))
         days += 1.1
-    return True
 
+    try:
+        async with DatabaseConnection.transaction() as tx:
+            await tx.copy_records(
+                "tournament_participants",
+                [(tournament_id, participant.id) for participant in participant_profiles],
+                ["tournament_id", "player_profile_id"]
+            )
+            await insert_fixtures(
+                tx,
+                tournament_id,
+                "Knockout",
+                match_format,
+                [(date, [player_id for player_id, _ in players]) for date, players in fixtures]
+            )
+    except Exception as e:
+        print(f"Error creating knockout matches: {str(e)}")
+        return False
 
-async def create_league_matches(tournament_id, participants: List[str], match_format: str):
+    await match_service.notify_match_participants(fixtures)
+    return True
 
-    participant_profiles = []
-    for participant_name in participants:
-        profile = await player_profile_service.get_player_profile_by_name(participant_name)
-        if not profile:
-            profile = await create_player_profile(participant_name)
-        if not profile:
-            return None
-        participant_profiles.append(profile)
 
+async def create_league_matches(tournament_id, participants: List[str], match_format: str):
 
-    for participant in participant_profiles:
-        query = """INSERT INTO tournament_participants 
-        (tournament_id, player_profile_id)
-        VALUES ($1, $2)"""
-        await DatabaseConnection.update_query(query, tournament_id, participant.id)
+    profiles = await player_profile_service.resolve_profiles_by_names(participants)
+    participant_profiles = [profiles.get(participant_name) for participant_name in participants]
+    if not all(participant_profiles):
+        return None
 
 
-    matches = []
+    fixtures = []
+    days = 1
+    start = datetime.now()
     for participant1, participant2 in itertools.combinations(participant_profiles, 2):
-        matches.append({
-            "format": match_format,
-            "date": datetime.now(),
-            "tournament_id": tournament_id,
-            "tournament_type": "League",
-            "participants": [(participant1.id, participant1.full_name),
-                             (participant2.id, participant2.full_name)]
-        })
+        fixtures.append((start + timedelta(days=days), [participant1.id, participant2.id]))
+        days += 0.1
 
+    try:
+        async with DatabaseConnection.transaction() as tx:
+            await tx.copy_records(
+                "tournament_participants",
+                [(tournament_id, participant.id) for participant in participant_profiles],
+                ["tournament_id", "player_profile_id"]
+            )
+            await standings_service.seed_league(tx, tournament_id)
+            await insert_fixtures(tx, tournament_id, "League", match_format, fixtures)
+    except Exception as e:
+        print(f"Error creating league matches: {str(e)}")
+        return False
 
-    days = 1
-    for match in matches:
-
-        query = """INSERT INTO match (format, date, tournament_id, tournament_type)
-        VALUES ($1, $2, $3, $4)"""
-        match_id = await DatabaseConnection.insert_query(
-            query,
-            match["format"],
-            match["date"] + timedelta(days=days),
-            match["tournament_id"],
-            match["tournament_type"]
-        )
-        if not match_id:
-            return False
+    return True
 
 
-        participant_query = """
-        INSERT INTO match_participants (match_id, player_profile_id)
-        VALUES ($1, $2)
-        """
+async def insert_fixtures(tx: Transaction, tournament_id: int, tournament_type: str, match_format: str, fixtures: List[tuple]) -> List[int]:
+    """
+    Bulk-inserts tournament matches inside an open transaction.
 
-        for player_id, _ in match["participants"]:
-            success = await DatabaseConnection.update_query(
-                participant_query,
-                match_id,
-                player_id
-            )
-            if not success:
-                return False
+    `fixtures` is a list of (date, [player_profile_id, ...]) tuples. Match ids
+    are reserved from the sequence in one query so that matches and
+    participants can both be streamed with COPY, keeping the number of round
+    trips constant regardless of how many fixtures are created.
+    """
+    if not fixtures:
+        return []
+
+    ids_query = """
+        SELECT nextval(pg_get_serial_sequence('match', 'id'))
+        FROM generate_series(1, $1)
+    """
+    match_ids = [row[0] for row in await tx.read_query(ids_query, len(fixtures))]
+
+    await tx.copy_records(
+        "match",
+        [(match_id, match_format, date, tournament_id, tournament_type)
+         for match_id, (date, _) in zip(match_ids, fixtures)],
+        ["id", "format", "date", "tournament_id", "tournament_type"]
+    )
+    await tx.copy_records(
+        "match_participants",
+        [(match_id, player_id)
+         for match_id, (_, player_ids) in zip(match_ids, fixtures)
+         for player_id in player_ids],
+        ["match_id", "player_profile_id"]
+    )
+    return match_ids
 
-        days += 0.1
 
-    return True
 # async def create_league_matches(tournament_id, participants: List[str], match_format:str):
 #
 #     participant_profiles = []
@@ -313,100 +362,86 @@ async def create_league_matches(tournament_id, participants: List[str], match_fo
 
 
 async def advance_knockout_tournament(tournament_id: int):
-    query = """
-        SELECT id FROM match 
-        WHERE tournament_id = $1 AND finished = False AND tournament_type = 'Knockout'
     """
-    matches = await DatabaseConnection.read_query(query, tournament_id)
+    Finishes the current knockout round and creates the next one.
 
-    if not matches:
-        print(f"No ongoing matches for tournament {tournament_id}.")
-        return False
-
-    update_query = """
-        UPDATE match 
-        SET finished = True 
-        WHERE tournament_id = $1 AND tournament_type = 'Knockout' AND finished = False
+    Marking the round finished, picking each match winner (highest score,
+    lowest profile id on a tie), updating wins/losses and recording the
+    tournament winner all happen in one statement; the next round is then
+    inserted with `insert_fixtures` inside the same transaction.
     """
-    await DatabaseConnection.update_query(update_query, tournament_id)
-
-    winners = []
-    losers = []
-    match_format = None
-
-    for match in matches:
-        match_data = await match_service.get_match_with_scores(match[0])
-        if not match_data:
-            continue
-
-        if match_format is None:
-            match_format = match_data['format']
-
-        participant_scores = [p.split('-') for p in match_data["participants"]]
-
-        sorted_participants = sorted(participant_scores, key=lambda x: int(x[1]), reverse=True)
-        winner = sorted_participants[0][0]
-        loser = sorted_participants[1][0]
-
-        winners.append(winner)
-        losers.append(loser)
-
-
-        winner_profile = await player_profile_service.get_player_profile_by_name(winner)
-        loser_profile = await player_profile_service.get_player_profile_by_name(loser)
-
-
-        winner_update_query = """
-            UPDATE player_profiles 
-            SET wins = wins + 1 
-            WHERE id = $1
-        """
-        await DatabaseConnection.update_query(winner_update_query, winner_profile.id)
-
-
-        loser_update_query = """
-            UPDATE player_profiles 
-            SET losses = losses + 1 
-            WHERE id = $1
-        """
-        await DatabaseConnection.update_query(loser_update_query, loser_profile.id)
-
-    if len(winners) == 1:
-
-        winner_profile = await player_profile_service.get_player_profile_by_name(winners[0])
-        winner_query = """
+    round_query = """
+        WITH finished_round AS (
+            UPDATE match
+            SET finished = True
+            WHERE tournament_id = $1 AND tournament_type = 'Knockout' AND finished = False
+            RETURNING id, format, date
+        ),
+        ranked AS (
+            SELECT
+                mp.match_id,
+                mp.player_profile_id,
+                COALESCE(mp.score, 0) AS score,
+                ROW_NUMBER() OVER (
+                    PARTITION BY mp.match_id
+                    ORDER BY COALESCE(mp.score, 0) DESC, mp.player_profile_id
+                ) AS place
+            FROM finished_round fr
+            JOIN match_participants mp ON mp.match_id = fr.id
+        ),
+        profile_update AS (
+            UPDATE player_profiles pp
+            SET wins = COALESCE(pp.wins, 0) + CASE WHEN r.place = 1 THEN 1 ELSE 0 END,
+                losses = COALESCE(pp.losses, 0) + CASE WHEN r.place = 1 THEN 0 ELSE 1 END
+            FROM ranked r
+            WHERE pp.id = r.player_profile_id
+        )
+        SELECT w.match_id, w.player_profile_id, pp.full_name, w.score, l.score, fr.format, fr.date
+        FROM ranked w
+        JOIN ranked l ON l.match_id = w.match_id AND l.place = 2
+        JOIN finished_round fr ON fr.id = w.match_id
+        JOIN player_profiles pp ON pp.id = w.player_profile_id
+        WHERE w.place = 1
+        ORDER BY w.match_id
+    """
+    winner_query = """
         INSERT INTO tournament_winners (tournament_id, player_profile_id)
         VALUES ($1, $2)
-        """
-        await DatabaseConnection.update_query(winner_query, tournament_id, winner_profile.id)
-        return f"Tournament {tournament_id} has concluded. Winner: {winners[0]}, Score: {participant_scores[0][1]}:{participant_scores[1][1]}"
-
-    if len(winners) < 2:
-        return f"Tournament {tournament_id} cannot proceed with fewer than 2 participants."
-
-
-    date_string = match_data["date"]
-    date = datetime.fromisoformat(date_string)
-    days = 1
-
-    for i in range(0, len(winners), 2):
-        if i + 1 >= len(winners):
-            break
-
-        new_match = Match(
-            format=match_format,
-            date=date + timedelta(days=days),
-            participants=[winners[i], winners[i + 1]],
-            tournament_id=tournament_id,
-            tournament_type="Knockout"
-        )
+    """
 
-        if not await match_service.create(new_match):
-            print(f"Failed to create a match for participants {winners[i]} and {winners[i + 1]}")
-            return False
+    fixtures = []
+    try:
+        async with DatabaseConnection.transaction() as tx:
+            winners = await tx.read_query(round_query, tournament_id)
+            if not winners:
+                print(f"No ongoing matches for tournament {tournament_id}.")
+                return False
 
-        days += 1
+            if len(winners) == 1:
+                _, winner_id, winner_name, winner_score, loser_score, _, _ = winners[0]
+                await tx.update_query(winner_query, tournament_id, winner_id)
+                return f"Tournament {tournament_id} has concluded. Winner: {winner_name}, Score: {winner_score}:{loser_score}"
+
+            match_format = winners[0][5]
+            last_date = winners[-1][6]
+            for days, i in enumerate(range(0, len(winners) - 1, 2), start=1):
+                fixtures.append((
+                    last_date + timedelta(days=days),
+                    [(winners[i][1], winners[i][2]), (winners[i + 1][1], winners[i + 1][2])]
+                ))
+
+            await insert_fixtures(
+                tx,
+                tournament_id,
+                "Knockout",
+                match_format,
+                [(date, [player_id for player_id, _ in players]) for date, players in fixtures]
+            )
+    except Exception as e:
+        print(f"Error advancing tournament {tournament_id}: {str(e)}")
+        return False
 
+    await match_service.notify_match_participants(fixtures)
     return True
 
 # async def finsh_league_tournament(tournament_id: int):
@@ -428,63 +463,37 @@ async def advance_knockout_tournament(tournament_id: int):
 
 
 async def get_league_standings(tournament_id: int):
-    query = """
-    SELECT COUNT(*)
-    FROM match
-    WHERE tournament_id = $1 AND finished = FALSE
     """
-    unfinished_matches = await DatabaseConnection.read_query(query, tournament_id)
-
-    if unfinished_matches[0][0] == 0:
-
-        query = """
-        SELECT player_profile_id, wins, losses, draws, points
-        FROM tournament_participants
-        WHERE tournament_id = $1
-        ORDER BY points DESC
-        LIMIT 1
-        """
-        result = await DatabaseConnection.read_query(query, tournament_id)
-
-        if result:
-            winner_profile_id = result[0][0]
+    Returns the final table of a league, or None while matches are still open.
 
-            # Insert the winner into the tournament_winners table
-            winner_query = """
-            INSERT INTO tournament_winners (tournament_id, player_profile_id)
-            VALUES ($1, $2)
-            """
-            await DatabaseConnection.update_query(winner_query, tournament_id, winner_profile_id)
-
-
-        query = """
-        SELECT player_profile_id, wins, losses, draws, points
-        FROM tournament_participants
-        WHERE tournament_id = $1
-        ORDER BY points DESC
-        """
-        result = await DatabaseConnection.read_query(query, tournament_id)
-        if not result:
-            return None
-
-        standings = []
-        for row in result:
-            standings.append({
-                "Player": await get_names_by_id(row[0]),
-                "Points": row[4],
-                "Wins": row[1],
-                "Losses": row[2],
-                "Draws": row[3]
-            })
-        return standings
-    
-
-
-async def get_names_by_id(player_profile_id: int):
+    Reads the league_standings read model kept up to date by
+    standings_service, ordered by its precomputed rank.
+    """
     query = """
-    SELECT full_name
-    FROM player_profiles
-    WHERE id = $1
+    SELECT ls.rank, pp.full_name, ls.points, ls.wins, ls.losses, ls.draws, ls.score_for, ls.score_against
+    FROM league_standings ls
+    JOIN player_profiles pp ON pp.id = ls.player_profile_id
+    WHERE ls.tournament_id = $1
+    AND NOT EXISTS (
+        SELECT 1 FROM match m
+        WHERE m.tournament_id = $1 AND m.finished = FALSE
+    )
+    ORDER BY ls.rank
     """
-    result = await DatabaseConnection.read_query(query, player_profile_id)
-    return str(result[0][0])
\ No newline at end of file
+    result = await DatabaseConnection.read_query(query, tournament_id)
+    if not result:
+        return None
+
+    return [
+        {
+            "Rank": row[0],
+            "Player": row[1],
+            "Points": row[2],
+            "Wins": row[3],
+            "Losses": row[4],
+            "Draws": row[5],
+            "Score For": row[6],
+            "Score Against": row[7]
+        }
+        for row in result
+    ]
@@ -1,11 +1,17 @@
 from jose import jwt, JWTError
-from passlib.hash import bcrypt
 from passlib.context import CryptContext
 from dotenv import load_dotenv
+import asyncio
 import os
+import secrets
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from common.cache import LRUCache
+from common.password_hasher import PasswordHasher
+from common.session_store import SessionBackend, create_session_backend
 from data.database import DatabaseConnection
-from data.models import Requests, User
-from passlib.hash import bcrypt
+from data.models import Principal, Requests, User
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict
@@ -14,10 +20,40 @@ from services.notification_service import notify_user_request_handled
 
 
 load_dotenv()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+password_hasher = PasswordHasher(
+    pwd_context,
+    max_workers=int(os.getenv("PASSWORD_HASH_WORKERS", "4")),
+    max_queue=int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+)
+# Hash checked for unknown emails, created on first use at the configured cost
+_dummy_hash: Optional[str] = None
+# Cumulative seconds per login stage, see login_timing_stats()
+login_timings = {"count": 0, "db": 0.0, "hash": 0.0, "token": 0.0}
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
+SESSION_TIMEOUT = timedelta(hours=1)
+SESSION_FLUSH_SECONDS = float(os.getenv("SESSION_FLUSH_SECONDS", "5"))
+# Activity is recorded at most once per this interval, so an active session
+# may expire up to this much earlier than SESSION_TIMEOUT after its last request.
+SESSION_TOUCH_GRANULARITY = timedelta(seconds=float(os.getenv("SESSION_TOUCH_SECONDS", "60")))
+
+# Tokens already resolved during the current request, so the middleware and
+# every is_admin/is_director check share one decode and one roles query.
+# Populated only inside request_auth_scope(); elsewhere nothing is cached.
+_request_auth: ContextVar[Optional[Dict]] = ContextVar("request_auth", default=None)
+
+
+@contextmanager
+def request_auth_scope():
+    """Starts a per-request cache of validated tokens and resolved principals."""
+    reset_token = _request_auth.set({})
+    try:
+        yield
+    finally:
+        _request_auth.reset(reset_token)
 
 
 
@@ -35,64 +71,73 @@ async def create_access_token(user_id: int, email: str) -> str:
     token = jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
     
    
-    SessionManager.update_session(user_id, email)
+    await SessionManager.update_session(user_id, email)
     
     return token
 
 class SessionManager:
     """Manages user sessions and activity tracking"""
-    _sessions = {}  
+    backend: SessionBackend = create_session_backend()
+    touches_written = 0
+    touches_skipped = 0
 
     @classmethod
-    def update_session(cls, user_id: int, email: str):
+    async def update_session(cls, user_id: int, email: str):
         """Updates or creates a session for a user"""
-        cls._sessions[user_id] = {
-            'last_activity': datetime.now(),
-            'email': email
-        }
-        
+        await cls.backend.save(user_id, email, datetime.now())
+
+    @classmethod
+    def touch_session(cls, user_id: int, session: Dict):
+        """Records activity on an active session, unless it was recorded within SESSION_TOUCH_GRANULARITY"""
+        now = datetime.now()
+        if now - session['last_activity'] < SESSION_TOUCH_GRANULARITY:
+            cls.touches_skipped += 1
+            return
+        cls.touches_written += 1
+        cls.backend.touch(user_id, now)
+
+    @classmethod
+    async def get_active_session(cls, user_id: int) -> Optional[Dict]:
+        """Returns a user's session if it is still active"""
+        session = await cls.backend.get(user_id)
+        if session and datetime.now() - session['last_activity'] < SESSION_TIMEOUT:
+            return session
+        return None
 
     @classmethod
-    def is_session_active(cls, user_id: int) -> bool:
+    async def is_session_active(cls, user_id: int) -> bool:
         """Checks if a user's session is still active"""
-        if user_id not in cls._sessions:
-           
-            return False
-        
-        session = cls._sessions[user_id]
-        last_activity = session['last_activity']
-        current_time = datetime.now()
-        time_diff = current_time - last_activity
-        is_active = time_diff < timedelta(hours=1)
-        
-        
-        
-        return is_active
+        return await cls.get_active_session(user_id) is not None
+
+    @classmethod
+    def touch_stats(cls) -> Dict[str, int]:
+        """Activity writes made and avoided by touch throttling since startup"""
+        return {"written": cls.touches_written, "skipped": cls.touches_skipped}
 
     @classmethod
-    def get_user_session(cls, user_id: int) -> Optional[Dict]:
+    async def get_user_session(cls, user_id: int) -> Optional[Dict]:
         """Retrieves session information for a user"""
-        return cls._sessions.get(user_id)
+        return await cls.backend.get(user_id)
 
     @classmethod
-    def clear_session(cls, user_id: int):
+    async def clear_session(cls, user_id: int):
         """Removes a user's session"""
-        if user_id in cls._sessions:
-            del cls._sessions[user_id]
-            print(f"Session cleared for user {user_id}")  # Debug log
-        cls._cleanup_all()  # Force cleanup
+        await cls.backend.delete(user_id)
 
-    @classmethod
-    def _cleanup_all(cls):
-        """Force cleanup of all expired sessions"""
-        expired_users = []
-        for user_id in cls._sessions:
-            if not cls.is_session_active(user_id):
-                expired_users.append(user_id)
-        
-        for user_id in expired_users:
-            if user_id in cls._sessions:
-                del cls._sessions[user_id]
+
+async def session_maintenance(interval: float = SESSION_FLUSH_SECONDS):
+    """
+    Writes buffered session activity and removes expired sessions every
+    `interval` seconds; run as a background task. Requests never sweep
+    sessions themselves: is_session_active already rejects expired ones.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await SessionManager.backend.flush()
+            await cleanup_expired_sessions()
+        except Exception as e:
+            print(f"Error in session maintenance: {str(e)}")
 
 async def all_users() -> List[User]:
     query = "SELECT * FROM users"
@@ -109,6 +154,23 @@ async def get_user_by_id(user_id: int) -> Optional[User]:
         return a
     return None
 
+# Users shown on web pages, by id. Entries are dropped when a claim approval
+# changes the row; the TTL bounds staleness for changes made elsewhere.
+user_cache = LRUCache(max_size=10_000, ttl_seconds=60)
+
+
+async def get_cached_user(user_id: int) -> Optional[User]:
+    user = user_cache.get(user_id)
+    if user is None:
+        user = await get_user_by_id(user_id)
+        if user:
+            user_cache.set(user_id, user)
+    return user
+
+
+def invalidate_cached_user(user_id: int):
+    user_cache.pop(user_id)
+
 async def create_user(user: User) -> Optional[User]:
     duplicate_query = "SELECT * FROM users WHERE username = $1 OR email = $2"
     duplicate_user = await DatabaseConnection.read_query(
@@ -119,7 +181,7 @@ async def create_user(user: User) -> Optional[User]:
     if duplicate_user:
         return None
 
-    user.password = bcrypt.hash(user.password)
+    user.password = await password_hasher.hash(user.password)
 
     query = """
         INSERT INTO users (first_name, last_name, username, password, email)
@@ -139,71 +201,110 @@ async def login_user(email: str, password: str) -> Optional[Dict[str, str]]:
     """
     Authenticates a user and creates both a token and an active session.
     Returns None if authentication fails.
+
+    Unknown emails are checked against a dummy hash of the same cost, so the
+    response time does not reveal whether an account exists.
     """
-    query = "SELECT * FROM users WHERE email = $1"
+    started = time.perf_counter()
+    query = "SELECT id, email, password FROM users WHERE email = $1"
     user_data = await DatabaseConnection.read_query(query, email)
-    if not user_data:
-        return None
-
-    user = await get_user_by_id(user_data[0][0])
-    if not user:
-        return None
+    fetched = time.perf_counter()
 
-    if not bcrypt.verify(password, user.password):
+    hashed_password = user_data[0][2] if user_data else await _get_dummy_hash()
+    is_valid = await password_hasher.verify(password, hashed_password)
+    verified = time.perf_counter()
+    if not user_data or not is_valid:
+        _record_login_timing(fetched - started, verified - fetched, 0.0)
         return None
 
-    token = await create_access_token(user.id, user.email)
+    token = await create_access_token(user_data[0][0], user_data[0][1])
+    _record_login_timing(fetched - started, verified - fetched, time.perf_counter() - verified)
     return {"access_token": token, "token_type": "bearer"}
 
+async def _get_dummy_hash() -> str:
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = await password_hasher.hash(secrets.token_urlsafe(16))
+    return _dummy_hash
+
+def _record_login_timing(db: float, hash: float, token: float):
+    login_timings["count"] += 1
+    login_timings["db"] += db
+    login_timings["hash"] += hash
+    login_timings["token"] += token
+
+def login_timing_stats() -> Dict[str, float]:
+    """Average milliseconds spent per login in the database, password hash and token stages"""
+    count = login_timings["count"]
+    stats = {
+        f"{stage}_ms": round(login_timings[stage] * 1000 / count, 3) if count else 0.0
+        for stage in ("db", "hash", "token")
+    }
+    stats["logins"] = count
+    return stats
+
 async def validate_token_with_session(token: str) -> Optional[Dict]:
     """
     Validates a token and checks if the associated session is active.
     Returns the token payload if valid and session is active, None otherwise.
     """
+    cache = _request_auth.get()
+    if cache is not None and ("payload", token) in cache:
+        return cache[("payload", token)]
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id = payload.get("id")
-        email = payload.get("email")
-        
-        if user_id and SessionManager.is_session_active(user_id):
-            SessionManager.update_session(user_id, email)
-            return payload
-            
-        return None
+
+        session = await SessionManager.get_active_session(user_id) if user_id else None
+        if session:
+            SessionManager.touch_session(user_id, session)
+        else:
+            payload = None
     except JWTError:
-        return None
+        payload = None
 
-async def is_admin(token: str) -> bool:
-    """Check if user is admin while validating their session"""
-    try:
-        payload = await validate_token_with_session(token)
-        if not payload:
-            return False
+    if cache is not None:
+        cache[("payload", token)] = payload
+    return payload
 
-        user_id = payload.get("id")
-        query = "SELECT is_admin FROM users WHERE id = $1"
-        result = await DatabaseConnection.read_query(query, user_id)
+async def resolve_principal(token: str) -> Optional[Principal]:
+    """
+    Returns the user behind a token with their roles, or None if the token
+    or its session is not valid.
 
-        return bool(result and result[0] and result[0][0])
+    Roles are read from the database rather than the token so that approved
+    director claims apply immediately. Within a request the principal is
+    resolved once and reused.
+    """
+    if not token:
+        return None
 
-    except JWTError:
-        return False
+    cache = _request_auth.get()
+    if cache is not None and ("principal", token) in cache:
+        return cache[("principal", token)]
 
-async def is_director(token: str) -> bool:
-    """Check if user is director while validating their session"""
-    try:
-        payload = await validate_token_with_session(token)
-        if not payload:
-            return False
+    principal = None
+    payload = await validate_token_with_session(token)
+    if payload:
+        query = "SELECT id, email, is_admin, is_director FROM users WHERE id = $1"
+        result = await DatabaseConnection.read_query(query, payload.get("id"))
+        if result:
+            principal = Principal.from_query_result(*result[0])
 
-        user_id = payload.get("id")
-        query = "SELECT is_director FROM users WHERE id = $1"
-        result = await DatabaseConnection.read_query(query, user_id)
+    if cache is not None:
+        cache[("principal", token)] = principal
+    return principal
 
-        return bool(result and result[0] and result[0][0])
+async def is_admin(token: str) -> bool:
+    """Check if user is admin while validating their session"""
+    principal = await resolve_principal(token)
+    return bool(principal and principal.is_admin)
 
-    except JWTError:
-        return False
+async def is_director(token: str) -> bool:
+    """Check if user is director while validating their session"""
+    principal = await resolve_principal(token)
+    return bool(principal and principal.is_director)
     
 async def logout_user(token: str) -> bool:
     """Properly logout user by clearing their session"""
@@ -211,7 +312,7 @@ async def logout_user(token: str) -> bool:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id = payload.get("id")
         if user_id:
-            SessionManager.clear_session(user_id)
+            await SessionManager.clear_session(user_id)
             return True
         return False
     except JWTError:
@@ -255,19 +356,9 @@ async def claim_director_request(token):
     result = await DatabaseConnection.insert_query(query, user_id)
     return result
 
-async def cleanup_expired_sessions():
-    """Periodically clean up expired sessions"""
-    current_time = datetime.now()
-    expired_users = []
-    
-    for user_id in SessionManager._sessions:
-        if not SessionManager.is_session_active(user_id):
-            expired_users.append(user_id)
-    
-    for user_id in expired_users:
-        SessionManager.clear_session(user_id)
-        
-   
+async def cleanup_expired_sessions() -> int:
+    """Removes sessions inactive for longer than SESSION_TIMEOUT and returns how many"""
+    return await SessionManager.backend.delete_expired(datetime.now() - SESSION_TIMEOUT)
 
 
 async def all_requests():
@@ -290,66 +381,67 @@ async def claim_type(id):
     
 
 async def approve_player_claim(id):
-    query = """
+    request_query = """
     UPDATE requests
     SET approved_or_denied = True
     WHERE id = $1
     """
-    status = await DatabaseConnection.update_query(query, id)
-    if status:
-        query = """
-        UPDATE users
-        SET player_profile_id = r.player_profile_id
-        FROM requests r
-        WHERE users.id = r.user_id
-        AND r.id = $1
-        """
-        result = await DatabaseConnection.update_query(query, id)
+    link_query = """
+    UPDATE users
+    SET player_profile_id = r.player_profile_id
+    FROM requests r
+    WHERE users.id = r.user_id
+    AND r.id = $1
+    RETURNING users.id, users.last_name, users.email
+    """
+    try:
+        async with DatabaseConnection.transaction() as tx:
+            await tx.update_query(request_query, id)
+            user_data = await tx.read_query(link_query, id)
+    except Exception as e:
+        print(f"Error approving player claim {id}: {str(e)}")
+        return False
 
-        
-        if result:
-            user_data = await DatabaseConnection.read_query(
-                "SELECT u.id, u.last_name, u.email FROM users u JOIN requests r ON u.id = r.user_id WHERE r.id = $1",
-                id
-            )
-            if user_data:
-                await notify_user_request_handled(user_data, "player claim", approved=True)
+    for row in user_data:
+        invalidate_cached_user(row[0])
 
-        return result
-    else:
-        return status
+    if user_data:
+        await notify_user_request_handled(user_data, "player claim", approved=True)
+
+    return True
 
 
 
 async def approve_director_claim(id):
-    query = """
+    request_query = """
     UPDATE requests
     SET approved_or_denied = True
     WHERE id = $1
     """
-    status = await DatabaseConnection.update_query(query, id)
-    if status:
-        query = """
-        UPDATE users
-        SET is_director = True
-        FROM requests r
-        WHERE users.id = r.user_id
-        AND r.id = $1
-        """
-        result = await DatabaseConnection.update_query(query, id)
+    promote_query = """
+    UPDATE users
+    SET is_director = True
+    FROM requests r
+    WHERE users.id = r.user_id
+    AND r.id = $1
+    RETURNING users.id, users.last_name, users.email
+    """
+    try:
+        async with DatabaseConnection.transaction() as tx:
+            await tx.update_query(request_query, id)
+            user_data = await tx.read_query(promote_query, id)
+    except Exception as e:
+        print(f"Error approving director claim {id}: {str(e)}")
+        return False
 
-        # Send notification
-        if result:
-            user_data = await DatabaseConnection.read_query(
-                "SELECT u.id, u.last_name, u.email FROM users u JOIN requests r ON u.id = r.user_id WHERE r.id = $1",
-                id
-            )
-            if user_data:
-                await notify_user_request_handled(user_data, "director claim", approved=True)
+    for row in user_data:
+        invalidate_cached_user(row[0])
 
-        return result
-    else:
-        return status
+    # Send notification
+    if user_data:
+        await notify_user_request_handled(user_data, "director claim", approved=True)
+
+    return True
 
     
 async def deny_claim(id):
@@ -0,0 +1,37 @@
+from unittest.mock import patch
+from common.cache import LRUCache
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_entries_expire_after_ttl():
+    cache = LRUCache(max_size=10, ttl_seconds=30)
+    with patch("common.cache.time.monotonic", return_value=100.0):
+        cache.set("a", 1)
+    with patch("common.cache.time.monotonic", return_value=129.0):
+        assert cache.get("a") == 1
+    with patch("common.cache.time.monotonic", return_value=130.0):
+        assert cache.get("a") is None
+        assert "a" not in cache
+
+
+def test_pop_and_clear():
+    cache = LRUCache()
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    assert cache.pop("a") == 1
+    assert cache.pop("a", "missing") == "missing"
+    cache.clear()
+    assert len(cache) == 0
@@ -0,0 +1,26 @@
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+@pytest.fixture
+def mock_transaction():
+    """
+    Stands in for the Transaction yielded by DatabaseConnection.transaction().
+
+    Every query helper of Transaction is mocked; tests set return values or
+    side effects on the ones they exercise.
+    """
+    tx = MagicMock()
+    tx.read_query = AsyncMock(return_value=[])
+    tx.insert_query = AsyncMock(return_value=1)
+    tx.update_query = AsyncMock(return_value=True)
+    tx.execute_many = AsyncMock(return_value=True)
+    tx.copy_records = AsyncMock(side_effect=lambda table, records, columns: len(records))
+
+    @asynccontextmanager
+    async def transaction():
+        yield tx
+
+    with patch("data.database.DatabaseConnection.transaction", transaction):
+        yield tx
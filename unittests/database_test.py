@@ -0,0 +1,47 @@
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+from data.database import DatabaseConnection, Transaction
+
+
+@pytest.fixture
+def mock_connection():
+    conn = MagicMock()
+    conn.fetch = AsyncMock(return_value=[(1, "John Doe")])
+    conn.fetchval = AsyncMock(return_value=7)
+    conn.execute = AsyncMock(return_value="UPDATE 1")
+
+    @asynccontextmanager
+    async def transaction():
+        yield
+
+    conn.transaction = MagicMock(side_effect=transaction)
+    return conn
+
+
+@pytest.mark.asyncio
+async def test_transaction_uses_single_connection(mock_connection):
+    @asynccontextmanager
+    async def get_connection():
+        yield mock_connection
+
+    with patch("data.database.DatabaseConnection.get_connection", get_connection):
+        async with DatabaseConnection.transaction() as tx:
+            rows = await tx.read_query("SELECT id, full_name FROM player_profiles")
+            new_id = await tx.insert_query("INSERT INTO match (format) VALUES ($1)", "Time limited")
+            success = await tx.update_query("UPDATE match SET finished = True WHERE id = $1", new_id)
+
+    assert rows == [(1, "John Doe")]
+    assert new_id == 7
+    assert success is True
+    mock_connection.transaction.assert_called_once()
+    assert mock_connection.fetchval.call_args[0][0].endswith("RETURNING id")
+
+
+@pytest.mark.asyncio
+async def test_transaction_update_query_raises(mock_connection):
+    mock_connection.execute.side_effect = Exception("constraint violation")
+    tx = Transaction(mock_connection)
+
+    with pytest.raises(Exception):
+        await tx.update_query("DELETE FROM player_profiles WHERE id = $1", 1)
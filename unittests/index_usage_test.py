@@ -0,0 +1,229 @@
+import json
+from contextlib import asynccontextmanager
+from unittest.mock import patch
+
+import asyncpg
+import pytest
+import pytest_asyncio
+from passlib.hash import bcrypt
+
+from services import match_service, player_profile_service, search_service, tournament_service, user_service
+
+# Runs the service queries against a seeded database and checks their plans
+# with EXPLAIN. Needs the database from database_info with all migrations
+# applied; everything is seeded inside a transaction that is rolled back.
+
+PLAYERS = 20_000
+TOURNAMENTS = 5_000
+PLAYERS_PER_TOURNAMENT = 20
+MATCHES = 100_000
+
+SEEDED_TABLES = {
+    "player_profiles",
+    "tournament",
+    "tournament_participants",
+    "tournament_winners",
+    "match",
+    "match_participants",
+    "users",
+    "requests",
+    "league_standings",
+}
+
+
+class ExplainingConnection:
+    """Connection proxy that records the plan of every query it runs."""
+
+    def __init__(self, conn: asyncpg.Connection):
+        self._conn = conn
+        self.plans = []
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    async def _explain(self, sql: str, *params):
+        if sql.lstrip().upper().startswith(("SELECT", "WITH")):
+            plan = await self._conn.fetchval(f"EXPLAIN (FORMAT JSON) {sql}", *params)
+            self.plans.append((sql, json.loads(plan)[0]["Plan"]))
+
+    async def fetch(self, sql: str, *params):
+        await self._explain(sql, *params)
+        return await self._conn.fetch(sql, *params)
+
+    async def fetchval(self, sql: str, *params):
+        await self._explain(sql, *params)
+        return await self._conn.fetchval(sql, *params)
+
+
+def sequential_scans(plan: dict) -> list:
+    scans = []
+    if plan["Node Type"] == "Seq Scan" and plan.get("Relation Name") in SEEDED_TABLES:
+        scans.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        scans.extend(sequential_scans(child))
+    return scans
+
+
+async def seed(conn: asyncpg.Connection) -> dict:
+    base = {}
+    for table in ("player_profiles", "tournament", "match", "users"):
+        base[table] = await conn.fetchval(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+
+    await conn.execute("""
+        INSERT INTO player_profiles (id, full_name, country, sports_club, wins, losses, draws)
+        SELECT $1 + i, 'Index Test Player ' || i, 'Country', NULL, 0, 0, 0
+        FROM generate_series(1, $2) AS i
+    """, base["player_profiles"], PLAYERS)
+    await conn.execute("""
+        INSERT INTO tournament (id, title, format, match_format, prize)
+        SELECT $1 + i, 'Index Test Tournament ' || i, 'League', 'Score limited', 0
+        FROM generate_series(1, $2) AS i
+    """, base["tournament"], TOURNAMENTS)
+    await conn.execute("""
+        INSERT INTO tournament_participants (tournament_id, player_profile_id)
+        SELECT $1 + t, $2 + ((t * $4 + k) % $3) + 1
+        FROM generate_series(1, $5) AS t, generate_series(0, $4 - 1) AS k
+    """, base["tournament"], base["player_profiles"], PLAYERS, PLAYERS_PER_TOURNAMENT, TOURNAMENTS)
+    await conn.execute("""
+        INSERT INTO tournament_winners (tournament_id, player_profile_id)
+        SELECT $1 + t, $2 + (t % $3) + 1
+        FROM generate_series(1, $4) AS t
+    """, base["tournament"], base["player_profiles"], PLAYERS, TOURNAMENTS)
+    await conn.execute("""
+        INSERT INTO match (id, format, date, tournament_id, tournament_type, finished)
+        SELECT $1 + i, 'Score limited', now() - i * interval '1 minute', $2 + (i % $3) + 1, 'League', i % 3 <> 0
+        FROM generate_series(1, $4) AS i
+    """, base["match"], base["tournament"], TOURNAMENTS, MATCHES)
+    await conn.execute("""
+        INSERT INTO match_participants (match_id, player_profile_id, score)
+        SELECT $1 + i, $2 + (i % $3) + 1, i % 5
+        FROM generate_series(1, $4) AS i
+        UNION ALL
+        SELECT $1 + i, $2 + ((i * 7 + 1) % $3) + 1, i % 7
+        FROM generate_series(1, $4) AS i
+    """, base["match"], base["player_profiles"], PLAYERS, MATCHES)
+    await conn.execute("""
+        INSERT INTO users (id, first_name, last_name, username, password, email, player_profile_id)
+        SELECT $1 + i, 'Index', 'Tester', 'index_tester_' || i, $4, 'index-test-' || i || '@example.com', $2 + i
+        FROM generate_series(1, $3) AS i
+    """, base["users"], base["player_profiles"], PLAYERS, bcrypt.using(rounds=4).hash("password123"))
+    await conn.execute("""
+        INSERT INTO requests (user_id, player_profile_id)
+        SELECT $1 + i, $2 + i
+        FROM generate_series(1, $3) AS i
+    """, base["users"], base["player_profiles"], PLAYERS)
+
+    await conn.execute("""
+        INSERT INTO league_standings (tournament_id, player_profile_id, points, rank)
+        SELECT tournament_id, player_profile_id, 0,
+            ROW_NUMBER() OVER (PARTITION BY tournament_id ORDER BY player_profile_id)
+        FROM tournament_participants
+        WHERE tournament_id > $1
+    """, base["tournament"])
+
+    for table in SEEDED_TABLES:
+        await conn.execute(f"ANALYZE {table}")
+    return base
+
+
+@pytest_asyncio.fixture
+async def explaining_connection():
+    import database_info as db
+    try:
+        conn = await asyncpg.connect(
+            user=db.DB_USER,
+            password=db.DB_PASSWORD,
+            host=db.DB_HOST,
+            port=db.DB_PORT,
+            database=db.DB_DATABASE,
+            timeout=5
+        )
+    except (OSError, asyncpg.PostgresError) as e:
+        pytest.skip(f"Database not available: {e}")
+
+    tx = conn.transaction()
+    await tx.start()
+    try:
+        base = await seed(conn)
+        proxy = ExplainingConnection(conn)
+
+        @asynccontextmanager
+        async def get_connection():
+            yield proxy
+
+        with patch("data.database.DatabaseConnection.get_connection", get_connection):
+            yield proxy, base
+    finally:
+        await tx.rollback()
+        await conn.close()
+
+
+def assert_index_scans(proxy: ExplainingConnection):
+    assert proxy.plans, "no queries were captured"
+    for sql, plan in proxy.plans:
+        scans = sequential_scans(plan)
+        assert not scans, f"sequential scan on {scans} for query:\n{sql}"
+
+
+@pytest.mark.asyncio
+async def test_get_statistics_uses_indexes(explaining_connection):
+    proxy, base = explaining_connection
+    await player_profile_service.get_statistics(base["player_profiles"] + 42)
+    assert_index_scans(proxy)
+
+
+@pytest.mark.asyncio
+async def test_get_league_standings_uses_indexes(explaining_connection):
+    proxy, base = explaining_connection
+    await tournament_service.get_league_standings(base["tournament"] + 42)
+    assert_index_scans(proxy)
+
+
+@pytest.mark.asyncio
+async def test_login_user_uses_indexes(explaining_connection):
+    proxy, base = explaining_connection
+    await user_service.login_user("index-test-42@example.com", "wrong-password")
+    assert_index_scans(proxy)
+
+
+@pytest.mark.asyncio
+async def test_linked_profile_lookups_use_indexes(explaining_connection):
+    proxy, base = explaining_connection
+    await player_profile_service.check_linked_player_profile(base["player_profiles"] + 42)
+    await player_profile_service.get_user_id(base["player_profiles"] + 42)
+    await player_profile_service.get_player_profile_by_name("Index Test Player 42")
+    assert_index_scans(proxy)
+
+
+@pytest.mark.asyncio
+async def test_match_lookups_use_indexes(explaining_connection):
+    proxy, base = explaining_connection
+    await match_service.get_tournament_by_match_id(base["match"] + 42)
+    await match_service.get_match_with_scores(base["match"] + 42)
+    assert_index_scans(proxy)
+
+
+@pytest.mark.asyncio
+async def test_match_pages_use_indexes(explaining_connection):
+    proxy, base = explaining_connection
+    matches, next_cursor = await match_service.get_page(page_size=20)
+    await match_service.get_page(next_cursor, 20)
+    await match_service.get_page(None, 20, tournament_id=base["tournament"] + 42)
+    assert_index_scans(proxy)
+
+
+@pytest.mark.asyncio
+async def test_home_page_queries_use_indexes(explaining_connection):
+    proxy, base = explaining_connection
+    await tournament_service.get_latest(3)
+    await match_service.get_upcoming(4)
+    assert_index_scans(proxy)
+
+
+@pytest.mark.asyncio
+async def test_search_uses_indexes(explaining_connection):
+    proxy, base = explaining_connection
+    await search_service.search("index test player 42")
+    await player_profile_service.get_page(search="player 42")
+    await tournament_service.get_all("tournament 42")
+    assert_index_scans(proxy)
@@ -1,6 +1,6 @@
 import pytest
 from unittest.mock import patch, AsyncMock
-from datetime import datetime
+from datetime import datetime, timedelta
 from data.models import Match, PlayerProfile
 from services import match_service
 import re
@@ -50,21 +50,28 @@ async def test_create_player_profile():
         mock_get.assert_called_once()
 
 @pytest.mark.asyncio
-async def test_create_match(mock_match_data, mock_player_profile):
-    with patch("services.player_profile_service.get_player_profile_by_name", new_callable=AsyncMock) as mock_get_profile, \
-         patch("services.match_service.create_player_profile", new_callable=AsyncMock) as mock_create_profile, \
-         patch("data.database.DatabaseConnection.insert_query", new_callable=AsyncMock) as mock_insert_query, \
-         patch("data.database.DatabaseConnection.update_query", new_callable=AsyncMock) as mock_update_query:
-        mock_get_profile.return_value = mock_player_profile
-        mock_create_profile.return_value = mock_player_profile
-        mock_insert_query.return_value = 1
-        mock_update_query.return_value = True
+async def test_create_match(mock_match_data, mock_player_profile, mock_transaction):
+    with patch("services.player_profile_service.resolve_profiles_by_names", new_callable=AsyncMock) as mock_resolve, \
+         patch("data.database.DatabaseConnection.read_query", new_callable=AsyncMock) as mock_read_query:
+        mock_resolve.return_value = {name: mock_player_profile for name in mock_match_data.participants}
+        mock_read_query.return_value = []
 
         match = await match_service.create(mock_match_data)
         assert match is not None
         assert match.id == 1
-        mock_insert_query.assert_called_once()
-        mock_update_query.assert_called()
+        mock_resolve.assert_called_once_with(mock_match_data.participants)
+        mock_transaction.insert_query.assert_called_once()
+        assert mock_transaction.update_query.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_create_match_rolls_back_on_failure(mock_match_data, mock_player_profile, mock_transaction):
+    with patch("services.player_profile_service.resolve_profiles_by_names", new_callable=AsyncMock) as mock_resolve:
+        mock_resolve.return_value = {name: mock_player_profile for name in mock_match_data.participants}
+        mock_transaction.update_query.side_effect = Exception("duplicate key")
+
+        match = await match_service.create(mock_match_data)
+        assert match is None
 
 
 
@@ -127,51 +134,136 @@ async def test_get_match_with_scores():
         mock_read_query.assert_called_once()
 
 @pytest.mark.asyncio
-async def test_match_end_league_draw():
-    with patch("services.match_service.get_match_with_scores", new_callable=AsyncMock) as mock_get_scores, \
-         patch("services.player_profile_service.get_player_profile_by_name", new_callable=AsyncMock) as mock_get_player, \
-         patch("data.database.DatabaseConnection.update_query", new_callable=AsyncMock) as mock_update_query:
+async def test_match_end_league_draw(mock_transaction):
+    mock_transaction.read_query.return_value = [("John Doe", "draw"), ("Jane Smith", "draw")]
 
-        mock_get_scores.return_value = {
-            "participants": ["John Doe-5", "Jane Smith-5"]
-        }
+    result = await match_service.match_end_league(1, 1)
 
-        mock_get_player.side_effect = [
-            PlayerProfile(id=1, full_name="John Doe", country="USA", sports_club=None, wins=0, losses=0, draws=0),
-            PlayerProfile(id=2, full_name="Jane Smith", country="Canada", sports_club=None, wins=0, losses=0, draws=0)
-        ]
+    assert result == "Match ended at a draw between John Doe and Jane Smith"
+    # finishing the match, then locking the league's standings
+    assert mock_transaction.read_query.call_count == 2
+    assert all(call.args[1:] == (1,) for call in mock_transaction.read_query.call_args_list)
 
-        mock_update_query.return_value = True
+@pytest.mark.asyncio
+async def test_match_end_league_winner(mock_transaction):
+    mock_transaction.read_query.return_value = [("John Doe", "win"), ("Jane Smith", "loss")]
 
-        result = await match_service.match_end_league(1, 1)
+    result = await match_service.match_end_league(1, 1)
 
-        assert "Match ended at a draw" in result
-        mock_get_scores.assert_called_once_with(1)
-        assert mock_get_player.call_count == 2
-        mock_update_query.assert_called()
+    assert "Winner: John Doe" in result
+    assert "FOR UPDATE" in mock_transaction.read_query.call_args_list[1].args[0]
+    # Standings and the league winner are updated in the same transaction as the result
+    queries = [call.args[0] for call in mock_transaction.update_query.call_args_list]
+    assert len(queries) == 2
+    assert "UPDATE league_standings" in queries[0]
+    assert "INSERT INTO tournament_winners" in queries[1]
 
 @pytest.mark.asyncio
-async def test_match_end_league_winner():
-    with patch("services.match_service.get_match_with_scores", new_callable=AsyncMock) as mock_get_scores, \
-         patch("services.player_profile_service.get_player_profile_by_name", new_callable=AsyncMock) as mock_get_player, \
-         patch("data.database.DatabaseConnection.update_query", new_callable=AsyncMock) as mock_update_query:
+async def test_match_end_league_already_finished(mock_transaction):
+    mock_transaction.read_query.return_value = []
 
-        mock_get_scores.return_value = {
-            "participants": ["John Doe-10", "Jane Smith-5"]
-        }
+    result = await match_service.match_end_league(1, 1)
 
-        mock_get_player.side_effect = [
-            PlayerProfile(id=1, full_name="John Doe", country="USA", sports_club=None, wins=0, losses=0, draws=0),
-            PlayerProfile(id=2, full_name="Jane Smith", country="Canada", sports_club=None, wins=0, losses=0, draws=0)
+    assert result is None
+    mock_transaction.update_query.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_end_single_match(mock_transaction):
+    mock_transaction.read_query.return_value = [("John Doe", "loss"), ("Jane Smith", "win")]
+
+    result = await match_service.end_single_match(1)
+
+    assert result is True
+    mock_transaction.read_query.assert_called_once()
+    mock_transaction.update_query.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_get_page_returns_next_cursor():
+    dates = [datetime(2024, 5, day) for day in (3, 2, 1)]
+    rows = []
+    for match_id, date in zip((3, 2, 1), dates):
+        rows.append((match_id, "Time limited", date, None, None, False, "John Doe", 1, None))
+        rows.append((match_id, "Time limited", date, None, None, False, "Jane Smith", 2, None))
+    with patch("data.database.DatabaseConnection.read_query", new_callable=AsyncMock) as mock_read_query:
+        mock_read_query.return_value = rows
+
+        matches, next_cursor = await match_service.get_page(page_size=2)
+
+        assert [match["id"] for match in matches] == [3, 2]
+        assert matches[0]["participants"] == ["John Doe-1", "Jane Smith-2"]
+        assert match_service.decode_cursor(next_cursor) == (dates[1], 2)
+        # one extra row is requested to detect the next page
+        assert mock_read_query.call_args[0][1:] == (3,)
+
+@pytest.mark.asyncio
+async def test_get_page_with_cursor_and_tournament():
+    cursor = match_service.encode_cursor(datetime(2024, 5, 2), 2)
+    with patch("data.database.DatabaseConnection.read_query", new_callable=AsyncMock) as mock_read_query:
+        mock_read_query.return_value = [
+            (1, "Time limited", datetime(2024, 5, 1), 7, "League", True, "John Doe", 3, "Spring League"),
+            (1, "Time limited", datetime(2024, 5, 1), 7, "League", True, "Jane Smith", 1, "Spring League"),
         ]
 
+        matches, next_cursor = await match_service.get_page(cursor, 2, tournament_id=7)
 
-        mock_update_query.return_value = True
+        assert [match["id"] for match in matches] == [1]
+        assert next_cursor is None
+        query = mock_read_query.call_args[0][0]
+        assert "(m.date, m.id) < ($1, $2)" in query
+        assert "m.tournament_id = $3" in query
+        assert mock_read_query.call_args[0][1:] == (datetime(2024, 5, 2), 2, 7, 3)
+
+@pytest.mark.asyncio
+async def test_get_page_with_undated_match_on_page_boundary():
+    with patch("data.database.DatabaseConnection.read_query", new_callable=AsyncMock) as mock_read_query:
+        mock_read_query.return_value = [
+            (9, "Time limited", None, None, None, False, "John Doe", 0, None),
+            (8, "Time limited", datetime(2024, 5, 3), None, None, False, "Jane Smith", 0, None),
+        ]
+
+        matches, next_cursor = await match_service.get_page(page_size=1)
+
+        assert [match["id"] for match in matches] == [9]
+        assert match_service.decode_cursor(next_cursor) == (None, 9)
 
-        result = await match_service.match_end_league(1, 1)
+        await match_service.get_page(next_cursor, 1)
+
+        query = mock_read_query.call_args[0][0]
+        assert "(m.date IS NOT NULL OR m.id < $1)" in query
+        assert mock_read_query.call_args[0][1:] == (9, 2)
+
+@pytest.mark.asyncio
+async def test_get_page_keeps_match_without_participants_on_page_boundary():
+    with patch("data.database.DatabaseConnection.read_query", new_callable=AsyncMock) as mock_read_query:
+        # Match 2 lost its only participants when their profiles were deleted
+        mock_read_query.return_value = [
+            (3, "Time limited", datetime(2024, 5, 3), None, None, False, "John Doe", 1, None),
+            (2, "Time limited", datetime(2024, 5, 2), None, None, False, None, 0, None),
+            (1, "Time limited", datetime(2024, 5, 1), None, None, False, "Jane Smith", 2, None),
+        ]
+
+        matches, next_cursor = await match_service.get_page(page_size=2)
+
+        assert [match["id"] for match in matches] == [3, 2]
+        assert matches[1]["participants"] == []
+        assert match_service.decode_cursor(next_cursor) == (datetime(2024, 5, 2), 2)
+        assert "LEFT JOIN match_participants" in mock_read_query.call_args[0][0]
+
+def test_decode_cursor_invalid():
+    with pytest.raises(ValueError):
+        match_service.decode_cursor("not-a-cursor")
+
+@pytest.mark.asyncio
+async def test_get_upcoming():
+    date = datetime.now() + timedelta(days=1)
+    with patch("data.database.DatabaseConnection.read_query", new_callable=AsyncMock) as mock_read_query:
+        mock_read_query.return_value = [
+            (4, date, "League", "John Doe"),
+            (4, date, "League", "Jane Smith"),
+        ]
 
-        assert "Winner: John Doe" in result
-        mock_get_scores.assert_called_once_with(1)
-        assert mock_get_player.call_count == 2
-        mock_update_query.assert_called()
+        matches = await match_service.get_upcoming(4)
 
+        assert matches == [{"id": 4, "date": date, "tournament_type": "League", "participants": ["John Doe", "Jane Smith"]}]
+        assert "finished = FALSE" in mock_read_query.call_args[0][0]
+        assert mock_read_query.call_args[0][2] == 4
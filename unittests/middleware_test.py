@@ -0,0 +1,81 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from common.middleware import API, PUBLIC, STATIC, WEB, RequestMiddleware
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(
+        RequestMiddleware,
+        public_paths={"/", "/players/"},
+        public_detail_prefixes=["/players/"]
+    )
+
+    @app.get("/{path:path}")
+    async def echo(path: str, request: Request):
+        return {"path": path, "user": getattr(request.state, "user", None)}
+
+    with patch("services.user_service.validate_token_with_session", new_callable=AsyncMock) as mock_validate:
+        mock_validate.side_effect = lambda token: {"id": 1} if token == "valid" else None
+        yield TestClient(app), mock_validate
+
+
+def test_classify():
+    middleware = RequestMiddleware(None, public_paths={"/", "/players/"}, public_detail_prefixes=["/players/"])
+    assert middleware.classify("/") == PUBLIC
+    assert middleware.classify("/players/42") == PUBLIC
+    assert middleware.classify("/players/42/") == PUBLIC
+    assert middleware.classify("/players/42/edit") == WEB
+    assert middleware.classify("/static/css/site.css") == STATIC
+    assert middleware.classify("/api/matches/") == API
+    assert middleware.classify("/users/profile") == WEB
+
+
+def test_public_search_endpoints_need_no_token():
+    from main import PUBLIC_DETAIL_PREFIXES, PUBLIC_PATHS
+
+    middleware = RequestMiddleware(None, PUBLIC_PATHS, PUBLIC_DETAIL_PREFIXES)
+    # Both serve the same public player, tournament and match data
+    assert middleware.classify("/api/search") == PUBLIC
+    assert middleware.classify("/api/player_profiles/autocomplete") == PUBLIC
+    assert middleware.classify("/api/player_profiles/") == API
+
+
+def test_public_and_static_paths_skip_authentication(client):
+    client, mock_validate = client
+    assert client.get("/").status_code == 200
+    assert client.get("/players/7").status_code == 200
+    assert client.get("/static/app.js").status_code == 200
+    mock_validate.assert_not_called()
+
+
+def test_api_requires_token_header(client):
+    client, _ = client
+    response = client.get("/api/matches/")
+    assert response.status_code == 401
+    assert response.json() == {"detail": "Authorization header missing"}
+
+    response = client.get("/api/matches/", headers={"token": "expired"})
+    assert response.status_code == 401
+    assert response.json() == {"detail": "Session expired"}
+
+    response = client.get("/api/matches/", headers={"token": "valid"})
+    assert response.status_code == 200
+    assert response.json()["user"] == {"id": 1}
+
+
+def test_web_pages_redirect_without_session(client):
+    client, _ = client
+    response = client.get("/users/profile", follow_redirects=False)
+    assert response.status_code == 302
+    assert response.headers["location"] == "/users/login"
+
+    client.cookies.set("access_token", "valid")
+    response = client.get("/users/profile")
+    assert response.status_code == 200
+    assert response.json()["user"] == {"id": 1}
@@ -0,0 +1,45 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from common.password_hasher import PasswordHasher
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def hasher():
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4)
+    hasher = PasswordHasher(context, max_workers=1, max_queue=1)
+    yield hasher
+    hasher.shutdown()
+
+
+async def test_hash_and_verify(hasher):
+    hashed = await hasher.hash("password123")
+    assert hashed.startswith("$2b$04$")
+    assert await hasher.verify("password123", hashed) is True
+    assert await hasher.verify("wrongpassword", hashed) is False
+    assert hasher.pending == 0
+
+
+async def test_rejects_when_saturated(hasher):
+    release = threading.Event()
+    hasher.context = type("BlockingContext", (), {"hash": staticmethod(lambda password: release.wait(5) and password)})()
+
+    running = asyncio.create_task(hasher.hash("a"))
+    queued = asyncio.create_task(hasher.hash("b"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await hasher.hash("c")
+    assert exc_info.value.status_code == 503
+    assert hasher.rejected == 1
+
+    release.set()
+    assert await running == "a"
+    assert await queued == "b"
+    assert hasher.pending == 0
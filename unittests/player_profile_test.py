@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 from fastapi.testclient import TestClient
 from routers.api.player_profile import players_profiles_router
@@ -80,3 +81,186 @@ async def test_create_duplicate_player_profile(mock_player_profile):
         result = await player_profile_service.create(mock_player_profile)
 
         assert result is None  # Duplicate player detected
+
+
+@pytest.mark.asyncio
+async def test_resolve_profiles_by_names_existing_and_missing():
+    existing_row = (" john doe", 1, "John Doe", "USA", None, 3, 1, 0)
+    created_row = (2, "Jane Smith", None, None, 0, 0, 0)
+    with patch("data.database.DatabaseConnection.read_query", new_callable=AsyncMock) as mock_read_query:
+        mock_read_query.side_effect = [[existing_row], [created_row]]
+
+        result = await player_profile_service.resolve_profiles_by_names([" john doe", "Jane Smith"])
+
+        assert result[" john doe"].id == 1
+        assert result["Jane Smith"].id == 2
+        assert mock_read_query.call_count == 2
+        # names are passed through unchanged and normalized by the lookup query
+        lookup_query, lookup_names = mock_read_query.call_args_list[0][0]
+        assert "LOWER(TRIM(n.name))" in lookup_query
+        assert lookup_names == [" john doe", "Jane Smith"]
+        assert mock_read_query.call_args_list[1][0][1] == ["Jane Smith"]
+
+
+@pytest.mark.asyncio
+async def test_resolve_profiles_by_names_all_existing():
+    rows = [("John Doe", 1, "John Doe", "USA", None, 3, 1, 0), ("JANE SMITH", 2, "Jane Smith", None, None, 0, 0, 0)]
+    with patch("data.database.DatabaseConnection.read_query", new_callable=AsyncMock) as mock_read_query:
+        mock_read_query.return_value = rows
+
+        result = await player_profile_service.resolve_profiles_by_names(["John Doe", "JANE SMITH"])
+
+        assert {name: profile.id for name, profile in result.items()} == {"John Doe": 1, "JANE SMITH": 2}
+        mock_read_query.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_resolve_profiles_by_names_reads_back_conflicts():
+    created_row = (3, "Łukasz Nowak", None, None, 0, 0, 0)
+    conflict_row = ("ŁUKASZ NOWAK", 3, "Łukasz Nowak", None, None, 0, 0, 0)
+    with patch("data.database.DatabaseConnection.read_query", new_callable=AsyncMock) as mock_read_query:
+        mock_read_query.side_effect = [[], [created_row], [conflict_row]]
+
+        result = await player_profile_service.resolve_profiles_by_names(["Łukasz Nowak", "ŁUKASZ NOWAK"])
+
+        assert result["Łukasz Nowak"].id == result["ŁUKASZ NOWAK"].id == 3
+        assert mock_read_query.call_args_list[2][0][1] == ["ŁUKASZ NOWAK"]
+
+
+def profile_rows(ids):
+    return [(player_id, f"Player {player_id}", None, None, 0, 0, 0) for player_id in ids]
+
+
+@pytest.mark.asyncio
+async def test_get_page_after_cursor():
+    with patch("data.database.DatabaseConnection.read_query", new_callable=AsyncMock) as mock_read_query:
+        mock_read_query.side_effect = [profile_rows([11, 12, 13]), [(40,)]]
+
+        result = await player_profile_service.get_page(cursor=10, per_page=2)
+
+        assert [player.id for player in result["players"]] == [11, 12]
+        assert result["next_cursor"] == 12
+        assert result["total"] == 40
+        assert result["total_is_estimate"] is False
+        data_call = mock_read_query.call_args_list[0]
+        assert "id > $1" in data_call[0][0]
+        assert data_call[0][1:] == (10, 3)
+
+
+@pytest.mark.asyncio
+async def test_count_profiles_estimated_for_large_tables():
+    with patch("data.database.DatabaseConnection.read_query", new_callable=AsyncMock) as mock_read_query:
+        mock_read_query.return_value = [(2_500_000,)]
+
+        total, is_estimate = await player_profile_service.count_profiles(estimated=True)
+
+        assert (total, is_estimate) == (2_500_000, True)
+        assert "reltuples" in mock_read_query.call_args[0][0]
+
+
+@pytest.mark.asyncio
+async def test_count_profiles_estimate_falls_back_to_exact():
+    with patch("data.database.DatabaseConnection.read_query", new_callable=AsyncMock) as mock_read_query:
+        mock_read_query.side_effect = [[('[{"Plan": {"Plan Rows": 12}}]',)], [(9,)]]
+
+        total, is_estimate = await player_profile_service.count_profiles("doe", estimated=True)
+
+        assert (total, is_estimate) == (9, False)
+        assert mock_read_query.call_args[0][0].startswith("SELECT COUNT(*)")
+
+
+@pytest.mark.asyncio
+async def test_get_all_uses_cached_page_cursor():
+    player_profile_service.PAGE_CURSORS.clear()
+    with patch("data.database.DatabaseConnection.read_query", new_callable=AsyncMock) as mock_read_query:
+        mock_read_query.side_effect = [profile_rows([1, 2, 3]), [(5,)], profile_rows([3, 4]), [(5,)]]
+
+        first = await player_profile_service.get_all(page=1, per_page=2)
+        second = await player_profile_service.get_all(page=2, per_page=2)
+
+        assert first["total_pages"] == 3
+        assert [player.id for player in second["players"]] == [3, 4]
+        # page 2 starts after the last id of page 1, without an OFFSET scan
+        assert mock_read_query.call_count == 4
+        assert mock_read_query.call_args_list[2][0][1:] == (2, 3)
+
+
+@pytest.mark.asyncio
+async def test_get_all_skips_to_uncached_page():
+    player_profile_service.PAGE_CURSORS.clear()
+    with patch("data.database.DatabaseConnection.read_query", new_callable=AsyncMock) as mock_read_query:
+        mock_read_query.side_effect = [[(20,)], profile_rows([21, 22]), [(30,)]]
+
+        result = await player_profile_service.get_all(page=3, per_page=10)
+
+        assert [player.id for player in result["players"]] == [21, 22]
+        assert "OFFSET" in mock_read_query.call_args_list[0][0][0]
+        assert mock_read_query.call_args_list[0][0][1:] == (19,)
+        assert player_profile_service.PAGE_CURSORS.get((None, 10, 3)) == 20
+
+
+@pytest.mark.asyncio
+async def test_autocomplete_follows_profile_changes(mock_player_profile, mock_transaction):
+    with patch("data.database.DatabaseConnection.read_query", new_callable=AsyncMock) as mock_read_query, \
+        patch("data.database.DatabaseConnection.insert_query", new_callable=AsyncMock) as mock_insert_query:
+        mock_read_query.side_effect = [[(7, "Johanna Konta"), (8, "Jo Wilfried")], []]
+        mock_insert_query.return_value = 9
+
+        await player_profile_service.load_name_index()
+        await player_profile_service.create(mock_player_profile)
+
+        assert [hit["full_name"] for hit in player_profile_service.autocomplete("jo")] == [
+            "Jo Wilfried", "Johanna Konta", "John Doe"
+        ]
+
+        mock_transaction.read_query.return_value = [(7, None)]
+        await player_profile_service.delete_player_profile(7)
+
+        assert player_profile_service.autocomplete("joh") == [{"id": 9, "full_name": "John Doe"}]
+
+
+@pytest.mark.asyncio
+async def test_refresh_name_index_picks_up_other_workers_changes():
+    with patch("data.database.DatabaseConnection.read_query", new_callable=AsyncMock) as mock_read_query, \
+        patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+        # Startup load, a failed reload, then a reload after another worker renamed 7 and deleted 8
+        mock_read_query.side_effect = [
+            [(7, "Johanna Konta"), (8, "Jo Wilfried")],
+            Exception("connection lost"),
+            [(7, "Joanna Konta"), (10, "John Isner")],
+        ]
+        mock_sleep.side_effect = [None, None, asyncio.CancelledError()]
+
+        await player_profile_service.load_name_index()
+        with pytest.raises(asyncio.CancelledError):
+            await player_profile_service.refresh_name_index(60)
+
+        assert [hit["full_name"] for hit in player_profile_service.autocomplete("jo")] == [
+            "Joanna Konta", "John Isner"
+        ]
+        mock_sleep.assert_called_with(60)
+
+
+def test_list_profiles_defaults_to_page_numbers():
+    with patch("services.player_profile_service.get_all", new_callable=AsyncMock) as mock_get_all, \
+        patch("services.player_profile_service.get_page", new_callable=AsyncMock) as mock_get_page:
+        mock_get_all.return_value = {"players": [], "total": 0, "page": 1, "total_pages": 0, "per_page": 10}
+
+        response = client.get("/api/player_profiles/")
+
+        assert response.status_code == 200
+        assert response.json()["total_pages"] == 0
+        mock_get_all.assert_called_once_with(None, 1, 10, False)
+        mock_get_page.assert_not_called()
+
+
+def test_list_profiles_by_cursor_is_opt_in():
+    with patch("services.player_profile_service.get_all", new_callable=AsyncMock) as mock_get_all, \
+        patch("services.player_profile_service.get_page", new_callable=AsyncMock) as mock_get_page:
+        mock_get_page.return_value = {"players": [], "next_cursor": None, "total": 0, "total_is_estimate": False}
+
+        response = client.get("/api/player_profiles/?cursor=20&per_page=5")
+
+        assert response.status_code == 200
+        mock_get_page.assert_called_once_with(20, 5, None, False)
+        mock_get_all.assert_not_called()
@@ -0,0 +1,39 @@
+from common.prefix_index import PrefixIndex
+
+
+def build_index():
+    index = PrefixIndex()
+    index.build([(1, "John Doe"), (2, "Jane Smith"), (3, "johnny Cash"), (4, "Bob Marley")])
+    return index
+
+
+def test_search_by_prefix_is_case_insensitive():
+    index = build_index()
+
+    assert index.search("JOHN") == [(1, "John Doe"), (3, "johnny Cash")]
+    assert index.search(" j", limit=2) == [(2, "Jane Smith"), (1, "John Doe")]
+    assert index.search("x") == []
+    assert index.search("") == []
+
+
+def test_add_and_remove():
+    index = build_index()
+
+    index.add(5, "Joan Baez")
+    assert index.search("jo") == [(5, "Joan Baez"), (1, "John Doe"), (3, "johnny Cash")]
+
+    index.remove(1)
+    index.remove(42)
+    assert index.search("john") == [(3, "johnny Cash")]
+    assert len(index) == 4
+
+
+def test_add_replaces_existing_entries():
+    index = build_index()
+
+    index.add(4, "Bob Dylan")
+    assert index.search("bob") == [(4, "Bob Dylan")]
+
+    index.add(6, "jane smith")
+    assert index.search("jane") == [(6, "jane smith")]
+    assert len(index) == 4
@@ -0,0 +1,171 @@
+import pytest
+import sqlite3
+import threading
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from common.rate_limiter import MemoryRateLimitStore, RateLimitPolicy, RateLimiter, SqliteRateLimitStore, \
+    create_rate_limit, create_rate_limiter, parse_policies
+
+
+def test_allows_up_to_the_limit_within_a_window():
+    limiter = RateLimiter()
+    policy = RateLimitPolicy(3, 60)
+
+    results = [limiter.hit("1.2.3.4", "POST /login", policy, now=600 + i)[0] for i in range(4)]
+    assert results == [True, True, True, False]
+    assert limiter.rejected == 1
+
+
+def test_previous_window_is_weighted_by_its_overlap():
+    limiter = RateLimiter()
+    policy = RateLimitPolicy(10, 60)
+    for i in range(10):
+        limiter.hit("1.2.3.4", "POST /login", policy, now=600 + i)
+
+    # A quarter into the next window, 75% of the previous 10 requests still count
+    allowed = [limiter.hit("1.2.3.4", "POST /login", policy, now=675)[0] for _ in range(4)]
+    assert allowed == [True, True, True, False]
+
+    # Two windows later the old requests no longer count
+    assert limiter.hit("1.2.3.4", "POST /login", policy, now=780)[0] is True
+
+
+def test_rejection_reports_time_until_window_end():
+    limiter = RateLimiter()
+    policy = RateLimitPolicy(1, 60)
+    limiter.hit("1.2.3.4", "POST /login", policy, now=610)
+    allowed, retry_after = limiter.hit("1.2.3.4", "POST /login", policy, now=630)
+    assert allowed is False
+    assert retry_after == 30
+
+
+def test_tracked_keys_are_capped():
+    limiter = RateLimiter(MemoryRateLimitStore(max_keys=100))
+    policy = RateLimitPolicy(5, 60)
+    for i in range(1_000):
+        limiter.hit("1.2.3.4", f"GET /spray/{i}", policy, now=600)
+    assert len(limiter) == 100
+
+
+def test_parse_policies():
+    policies = parse_policies("POST /api/users/login=5/60; POST /users/claim-director=10/3600;GET /x=7")
+    assert policies == {
+        "POST /api/users/login": RateLimitPolicy(5, 60),
+        "POST /users/claim-director": RateLimitPolicy(10, 3600),
+        "GET /x": RateLimitPolicy(7, 60),
+    }
+    assert parse_policies(None) == {}
+
+
+def test_dependency_keys_by_route_template_and_applies_overrides():
+    limiter = RateLimiter(policies={"GET /items/{item_id}": RateLimitPolicy(2, 60)})
+    app = FastAPI()
+    app.state.rate_limiter = limiter
+
+    @app.get("/items/{item_id}", dependencies=[Depends(create_rate_limit(100))])
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    client = TestClient(app)
+    statuses = [client.get(f"/items/{i}").status_code for i in range(3)]
+    response = client.get("/items/99")
+
+    assert statuses == [200, 200, 429]
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert len(limiter) == 1
+
+
+def test_sqlite_store_matches_memory_store(tmp_path):
+    memory = RateLimiter(MemoryRateLimitStore())
+    shared = RateLimiter(SqliteRateLimitStore(str(tmp_path / "rate_limits.sqlite3")))
+    policy = RateLimitPolicy(10, 60)
+
+    for now in [600 + i for i in range(12)] + [675 + i * 0.1 for i in range(5)] + [780, 781]:
+        assert shared.hit("1.2.3.4", "POST /login", policy, now) == memory.hit("1.2.3.4", "POST /login", policy, now)
+    assert shared.rejected == memory.rejected == 4
+    shared.close()
+
+
+def test_sqlite_store_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "rate_limits.sqlite3")
+    workers = [RateLimiter(SqliteRateLimitStore(path)) for _ in range(3)]
+    policy = RateLimitPolicy(3, 60)
+
+    allowed = [workers[i % 3].hit("1.2.3.4", "POST /login", policy, now=600 + i)[0] for i in range(6)]
+    assert allowed == [True, True, True, False, False, False]
+    for worker in workers:
+        worker.close()
+
+
+def test_sqlite_store_prune_removes_expired_and_excess_keys(tmp_path):
+    store = SqliteRateLimitStore(str(tmp_path / "rate_limits.sqlite3"), max_keys=5)
+    limiter = RateLimiter(store)
+    policy = RateLimitPolicy(5, 60)
+    for i in range(10):
+        limiter.hit("1.2.3.4", f"GET /old/{i}", policy, now=600)
+    for i in range(8):
+        limiter.hit("1.2.3.4", f"GET /new/{i}", policy, now=900 + i)
+
+    # Old counters expired after two windows, then the oldest new ones go above the cap
+    assert store.prune(now=900) == 13
+    assert len(limiter) == 5
+    limiter.close()
+
+
+def test_sqlite_store_checks_run_off_the_event_loop(tmp_path):
+    limiter = RateLimiter(SqliteRateLimitStore(str(tmp_path / "rate_limits.sqlite3")))
+    threads = []
+    hit = limiter.hit
+    limiter.hit = lambda *args: threads.append(threading.current_thread().name) or hit(*args)
+    app = FastAPI()
+    app.state.rate_limiter = limiter
+
+    @app.post("/login", dependencies=[Depends(create_rate_limit(1))])
+    async def login():
+        return {}
+
+    client = TestClient(app)
+    assert [client.post("/login").status_code for _ in range(2)] == [200, 429]
+    assert all(name.startswith("rate-limit-store") for name in threads)
+    limiter.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_counts_on_its_own_thread(tmp_path):
+    store = SqliteRateLimitStore(str(tmp_path / "rate_limits.sqlite3"))
+    limiter = RateLimiter(store)
+    limiter.hit("1.2.3.4", "POST /login", RateLimitPolicy(5, 60), now=600)
+    threads = []
+    count = store._count
+    store._count = lambda: threads.append(threading.current_thread().name) or count()
+
+    assert await limiter.count() == 1
+    assert len(limiter) == 1
+    assert all(name.startswith("rate-limit-store") for name in threads) and len(threads) == 2
+    limiter.close()
+
+
+def test_sqlite_store_fails_open_when_the_file_is_locked(tmp_path):
+    path = str(tmp_path / "rate_limits.sqlite3")
+    store = SqliteRateLimitStore(path)
+    limiter = RateLimiter(store)
+    policy = RateLimitPolicy(1, 60)
+    limiter.hit("1.2.3.4", "POST /login", policy, now=600)
+
+    other_worker = sqlite3.connect(path, isolation_level=None)
+    other_worker.execute("BEGIN IMMEDIATE")
+    try:
+        assert limiter.hit("1.2.3.4", "POST /login", policy, now=601)[0] is True
+    finally:
+        other_worker.execute("ROLLBACK")
+        other_worker.close()
+    assert limiter.hit("1.2.3.4", "POST /login", policy, now=602)[0] is False
+    limiter.close()
+
+
+def test_create_rate_limiter_rejects_unknown_backend():
+    assert isinstance(create_rate_limiter("memory").store, MemoryRateLimitStore)
+    with pytest.raises(ValueError):
+        create_rate_limiter("redis")
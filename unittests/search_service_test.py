@@ -0,0 +1,34 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from services import search_service
+
+
+def test_contains_pattern_escapes_wildcards():
+    assert search_service.contains_pattern(" John ") == "%john%"
+    assert search_service.contains_pattern("100%_fun") == "%100\\%\\_fun%"
+
+
+@pytest.mark.asyncio
+async def test_search_returns_typed_hits():
+    with patch("data.database.DatabaseConnection.read_query", new_callable=AsyncMock) as mock_read_query:
+        mock_read_query.return_value = [
+            ("player", 1, "John Doe", 0.8),
+            ("match", 7, "John Doe vs Jane Smith", 0.8),
+            ("tournament", 3, "Doe Cup", 0.41666),
+        ]
+
+        results = await search_service.search(" John Doe", 5)
+
+        assert results[0] == {"type": "player", "id": 1, "title": "John Doe", "score": 0.8}
+        assert [hit["type"] for hit in results] == ["player", "match", "tournament"]
+        assert results[2]["score"] == 0.417
+        mock_read_query.assert_called_once()
+        assert mock_read_query.call_args[0][1:] == ("john doe", "%john doe%", 5)
+
+
+@pytest.mark.asyncio
+async def test_search_no_hits():
+    with patch("data.database.DatabaseConnection.read_query", new_callable=AsyncMock) as mock_read_query:
+        mock_read_query.return_value = []
+
+        assert await search_service.search("zzz") == []
@@ -0,0 +1,62 @@
+from unittest.mock import patch
+
+from fastapi import APIRouter, Depends, FastAPI, Form, Request
+from fastapi.testclient import TestClient
+from starlette.formparsers import FormParser
+
+from common.security import InputSanitizer, csrf, require_csrf_token
+from common.template_config import CustomJinja2Templates
+
+
+def make_client() -> TestClient:
+    router = APIRouter(prefix="/web", dependencies=[Depends(require_csrf_token)])
+
+    @router.post("/sanitized")
+    async def sanitized(sanitized_data: dict = Depends(InputSanitizer.sanitize_form_data)):
+        return sanitized_data
+
+    @router.post("/fields")
+    async def fields(name: str = Form(...), sanitized_data: dict = Depends(InputSanitizer.sanitize_form_data)):
+        return {"name": name, "sanitized": sanitized_data["name"]}
+
+    @router.get("/page")
+    async def page():
+        return {"ok": True}
+
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_form_post_without_valid_csrf_token_is_rejected():
+    client = make_client()
+    assert client.post("/web/sanitized", data={"name": "x"}).status_code == 403
+    assert client.post("/web/sanitized", data={"name": "x", "csrf_token": "forged"}).status_code == 403
+    assert client.get("/web/page").status_code == 200
+
+
+def test_form_is_parsed_once_for_csrf_check_sanitizer_and_form_fields():
+    client = make_client()
+    with patch.object(FormParser, "parse", autospec=True, side_effect=FormParser.parse) as mock_parse:
+        response = client.post("/web/fields", data={"name": "<b>Ann</b>; --", "csrf_token": csrf.generate_token()})
+
+    assert response.status_code == 200
+    assert response.json() == {"name": "<b>Ann</b>; --", "sanitized": "ltbgtAnnlt/bgt"}
+    mock_parse.assert_called_once()
+
+
+def test_sanitize_string_removes_injection_characters():
+    assert InputSanitizer.sanitize_string("a;b--c/*d&e|f`g$h") == "abcdampefgh"
+    assert InputSanitizer.sanitize_email("<john@example.com>") == "ltjohn@example.comgt"
+
+
+def test_template_responses_always_carry_a_csrf_token(tmp_path):
+    (tmp_path / "page.html").write_text("{{ csrf_token }}")
+    templates = CustomJinja2Templates(directory=str(tmp_path))
+    request = Request({"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": b""})
+
+    response = templates.TemplateResponse("page.html", {"request": request})
+    assert csrf.validate_token(response.body.decode())
+
+    response = templates.TemplateResponse("page.html", {"request": request, "csrf_token": "given"})
+    assert response.body == b"given"
@@ -0,0 +1,151 @@
+import pytest
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from common.session_store import MemorySessionBackend, PostgresSessionBackend, SessionBackend, \
+    SqliteSessionBackend, create_session_backend
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def sqlite_backend(tmp_path):
+    backend = SqliteSessionBackend(str(tmp_path / "sessions.sqlite3"))
+    yield backend
+    backend._conn.close()
+    backend._executor.shutdown()
+
+
+async def test_memory_backend_round_trip():
+    backend = MemorySessionBackend()
+    now = datetime.now()
+    await backend.save(1, "john@example.com", now - timedelta(minutes=5))
+    backend.touch(1, now)
+
+    session = await backend.get(1)
+    assert session == {"email": "john@example.com", "last_activity": now}
+
+    await backend.delete(1)
+    assert await backend.get(1) is None
+
+
+async def test_memory_backend_delete_expired():
+    backend = MemorySessionBackend()
+    now = datetime.now()
+    await backend.save(1, "old@example.com", now - timedelta(hours=2))
+    await backend.save(2, "new@example.com", now)
+
+    assert await backend.delete_expired(now - timedelta(hours=1)) == 1
+    assert await backend.get(1) is None
+    assert await backend.get(2) is not None
+
+
+async def test_sqlite_backend_batches_touches(sqlite_backend):
+    now = datetime.now().replace(microsecond=0)
+    await sqlite_backend.save(1, "john@example.com", now - timedelta(minutes=5))
+    sqlite_backend.touch(1, now)
+
+    # Buffered activity is visible before it is written
+    assert (await sqlite_backend.get(1))["last_activity"] == now
+    stored = sqlite_backend._conn.execute("SELECT last_activity FROM user_sessions WHERE user_id = 1").fetchone()
+    assert stored[0] == (now - timedelta(minutes=5)).timestamp()
+
+    assert await sqlite_backend.flush() == 1
+    stored = sqlite_backend._conn.execute("SELECT last_activity FROM user_sessions WHERE user_id = 1").fetchone()
+    assert stored[0] == now.timestamp()
+    assert await sqlite_backend.flush() == 0
+
+
+async def test_sqlite_backend_runs_statements_off_the_event_loop(sqlite_backend):
+    threads = []
+    read = sqlite_backend._read_sync
+    sqlite_backend._read_sync = lambda user_id: threads.append(threading.current_thread().name) or read(user_id)
+
+    assert await sqlite_backend.get(1) is None
+    assert threads[0].startswith("session-store")
+
+
+async def test_sqlite_backend_is_shared_between_connections(sqlite_backend, tmp_path):
+    await sqlite_backend.save(1, "john@example.com", datetime.now())
+    other_worker = SqliteSessionBackend(str(tmp_path / "sessions.sqlite3"))
+    try:
+        assert (await other_worker.get(1))["email"] == "john@example.com"
+        await other_worker.delete(1)
+        assert await sqlite_backend.get(1) is None
+    finally:
+        await other_worker.close()
+
+
+async def test_sqlite_backend_delete_expired(sqlite_backend):
+    now = datetime.now()
+    await sqlite_backend.save(1, "old@example.com", now - timedelta(hours=2))
+    await sqlite_backend.save(2, "new@example.com", now)
+
+    assert await sqlite_backend.delete_expired(now - timedelta(hours=1)) == 1
+    assert await sqlite_backend.get(1) is None
+
+
+async def test_postgres_backend_flush_writes_one_batch():
+    backend = PostgresSessionBackend()
+    now = datetime.now()
+    backend.touch(1, now)
+    backend.touch(2, now)
+    backend.touch(1, now + timedelta(seconds=1))
+
+    with patch('data.database.DatabaseConnection.update_query') as mock_update:
+        assert await backend.flush() == 2
+        mock_update.assert_called_once()
+        assert mock_update.call_args[0][1] == [1, 2]
+        assert mock_update.call_args[0][2] == [now + timedelta(seconds=1), now]
+
+
+async def test_postgres_backend_get_merges_buffered_activity():
+    backend = PostgresSessionBackend()
+    now = datetime.now()
+    backend.touch(1, now)
+
+    with patch('data.database.DatabaseConnection.read_query') as mock_query:
+        mock_query.return_value = [("john@example.com", now - timedelta(minutes=5))]
+        session = await backend.get(1)
+        assert session == {"email": "john@example.com", "last_activity": now}
+
+
+async def test_session_backend_requires_storage_methods():
+    with pytest.raises(TypeError):
+        SessionBackend()
+
+
+async def test_create_session_backend_rejects_unknown_name():
+    assert isinstance(create_session_backend("memory"), MemorySessionBackend)
+    with pytest.raises(ValueError):
+        create_session_backend("redis")
+
+
+async def test_memory_backend_expiry_skips_touched_and_deleted_sessions():
+    backend = MemorySessionBackend()
+    now = datetime.now()
+    for user_id in range(1, 4):
+        await backend.save(user_id, f"user{user_id}@example.com", now - timedelta(hours=2))
+    backend.touch(2, now)
+    await backend.delete(3)
+
+    assert await backend.delete_expired(now - timedelta(hours=1)) == 1
+    assert await backend.get(1) is None
+    assert await backend.get(2) is not None
+    # The touched session was rescheduled at its new activity time
+    assert backend._expiry_heap == [(now, 2)]
+
+    assert await backend.delete_expired(now + timedelta(seconds=1)) == 1
+    assert len(backend) == 0
+    assert backend._expiry_heap == []
+
+
+async def test_memory_backend_expiry_stops_at_first_active_session():
+    backend = MemorySessionBackend()
+    now = datetime.now()
+    for user_id in range(1, 1001):
+        await backend.save(user_id, "user@example.com", now)
+
+    assert await backend.delete_expired(now - timedelta(hours=1)) == 0
+    assert len(backend._expiry_heap) == 1000
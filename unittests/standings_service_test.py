@@ -0,0 +1,49 @@
+import pytest
+from services import standings_service
+
+
+@pytest.mark.asyncio
+async def test_apply_match_result(mock_transaction):
+    result = await standings_service.apply_match_result(mock_transaction, 5)
+
+    assert result is True
+    query = mock_transaction.update_query.call_args[0][0]
+    assert "UPDATE league_standings" in query
+    assert "ROW_NUMBER()" in query
+    assert mock_transaction.update_query.call_args[0][1:] == (5,)
+
+
+@pytest.mark.asyncio
+async def test_apply_match_result_locks_league_first(mock_transaction):
+    calls = []
+    mock_transaction.read_query.side_effect = lambda *args: calls.append("lock") or []
+    mock_transaction.update_query.side_effect = lambda *args: calls.append("update") or True
+
+    await standings_service.apply_match_result(mock_transaction, 5)
+
+    lock_query = mock_transaction.read_query.call_args[0][0]
+    assert "FROM league_standings" in lock_query
+    assert "FOR UPDATE" in lock_query
+    assert mock_transaction.read_query.call_args[0][1:] == (5,)
+    assert calls == ["lock", "update"]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_single_league(mock_transaction):
+    mock_transaction.read_query.return_value = [(6,)]
+    rows = await standings_service.rebuild(3)
+
+    assert rows == 6
+    delete_call, = mock_transaction.update_query.call_args_list
+    assert "DELETE FROM league_standings" in delete_call.args[0]
+    assert delete_call.args[1:] == (3,)
+    assert mock_transaction.read_query.call_args[0][1:] == (3,)
+
+
+@pytest.mark.asyncio
+async def test_rebuild_all_leagues(mock_transaction):
+    mock_transaction.read_query.return_value = [(0,)]
+    await standings_service.rebuild()
+
+    assert mock_transaction.update_query.call_args[0][1:] == (None,)
+    assert mock_transaction.read_query.call_args[0][1:] == (None,)
@@ -1,4 +1,3 @@
-import re
 import pytest
 from unittest.mock import AsyncMock, patch
 from datetime import datetime, timedelta
@@ -22,38 +21,42 @@ def mock_participants():
     return ["John Doe", "Jane Smith", "Bob Johnson", "Alice Williams"]
 
 
+@pytest.fixture
+def mock_profiles(mock_participants):
+    return {
+        name: PlayerProfile(id=i, full_name=name, country=None, sports_club=None, wins=0, losses=0, draws=0)
+        for i, name in enumerate(mock_participants, start=1)
+    }
+
+
 @pytest.mark.asyncio
-async def test_create_knockout_tournament(mock_tournament_data: Tournament, mock_participants: list[str]):
+async def test_create_knockout_tournament(mock_tournament_data: Tournament, mock_participants: list[str], mock_profiles, mock_transaction):
     with patch("data.database.DatabaseConnection.insert_query", new_callable=AsyncMock) as mock_insert_query, \
-         patch("data.database.DatabaseConnection.read_query", new_callable=AsyncMock) as mock_read_query, \
+         patch("services.player_profile_service.resolve_profiles_by_names", new_callable=AsyncMock) as mock_resolve, \
+         patch("services.match_service.notify_match_participants", new_callable=AsyncMock) as mock_notify, \
          patch("services.match_service.create", new_callable=AsyncMock) as mock_create_match:
         
         mock_insert_query.return_value = 1 
-        
-        # Mock profile query return value (simulate a database row)
-        mock_read_query.return_value = [
-            [1, "John Doe", "USA", "", 0, 0, 0]  # Simulating a single row of query results
-        ]
-
-        mock_create_match.return_value = True
+        mock_resolve.return_value = mock_profiles
+        mock_transaction.read_query.return_value = [(10,), (11,)]
 
 
         result = await tournament_service.create(mock_tournament_data, mock_participants)
 
         assert result is True
         mock_insert_query.assert_called_once()
-        mock_read_query.assert_called()
-        mock_create_match.assert_called()
+        mock_resolve.assert_called_once_with(mock_participants)
+        mock_create_match.assert_not_called()
+        mock_notify.assert_called_once()
 
 
 
 @pytest.mark.asyncio
-async def test_create_league_tournament(mock_tournament_data: Tournament, mock_participants: list[str]):
+async def test_create_league_tournament(mock_tournament_data: Tournament, mock_participants: list[str], mock_profiles, mock_transaction):
     mock_tournament_data.format = "League"
 
     with patch("data.database.DatabaseConnection.insert_query", new_callable=AsyncMock) as mock_insert_query, \
-         patch("services.player_profile_service.get_player_profile_by_name", new_callable=AsyncMock) as mock_get_profile, \
-         patch("data.database.DatabaseConnection.update_query", new_callable=AsyncMock) as mock_update_query:
+         patch("services.player_profile_service.resolve_profiles_by_names", new_callable=AsyncMock) as mock_resolve:
 
         # Use side_effect to simulate different behavior for different queries
         def insert_query_side_effect(query, *args):
@@ -65,13 +68,8 @@ async def test_create_league_tournament(mock_tournament_data: Tournament, mock_p
 
         mock_insert_query.side_effect = insert_query_side_effect
 
-        # Mock profile query return value (simulate a database row)
-        mock_get_profile.return_value = PlayerProfile(
-            id=1, full_name="John Doe", country="USA", sports_club="", wins=0, losses=0, draws=0
-        )
-        mock_update_query.return_value = True
+        mock_resolve.return_value = mock_profiles
 
-        
         result = await tournament_service.create(mock_tournament_data, mock_participants)
 
         assert result is True
@@ -82,8 +80,8 @@ async def test_create_league_tournament(mock_tournament_data: Tournament, mock_p
             mock_tournament_data.match_format,
             mock_tournament_data.prize,
         )
-        mock_get_profile.assert_called()
-        mock_update_query.assert_called()
+        mock_resolve.assert_called_once_with(mock_participants)
+        mock_transaction.copy_records.assert_called()
 
 
 
@@ -91,102 +89,194 @@ async def test_create_league_tournament(mock_tournament_data: Tournament, mock_p
 
 
 @pytest.mark.asyncio
-async def test_advance_knockout_tournament():
+async def test_advance_knockout_tournament(mock_transaction):
     tournament_id = 1
+    last_date = datetime.now() + timedelta(days=1)
 
-    with patch("data.database.DatabaseConnection.read_query", new_callable=AsyncMock) as mock_read_query, \
-         patch("data.database.DatabaseConnection.update_query", new_callable=AsyncMock) as mock_update_query, \
-         patch("services.match_service.get_match_with_scores", new_callable=AsyncMock) as mock_get_scores, \
-         patch("services.match_service.create", new_callable=AsyncMock) as mock_create_match:
+    with patch("services.match_service.notify_match_participants", new_callable=AsyncMock) as mock_notify:
 
-        # Simulate ongoing matches
-        mock_read_query.return_value = [[1], [2]]
-        # Simulate updating matches to finished
-        mock_update_query.return_value = True
-        # Simulate match scores
-        mock_get_scores.return_value = {
-            "participants": ["John Doe-10", "Jane Smith-5"],
-            "date": (datetime.now() + timedelta(days=1)).isoformat(),
-            "format": "Score limited"
-        }
-        # Simulate successful match creation
-        mock_create_match.return_value = True
+        # Round query returns one winner row per finished match, then match ids are reserved
+        mock_transaction.read_query.side_effect = [
+            [
+                (1, 11, "John Doe", 10, 5, "Score limited", last_date),
+                (2, 12, "Jane Smith", 7, 3, "Score limited", last_date),
+            ],
+            [(3,)],
+        ]
 
         # Call the service function
         result = await tournament_service.advance_knockout_tournament(tournament_id)
 
-        # Function to normalize SQL queries by collapsing extra spaces and trimming
-        def normalize_query(query):
-            return re.sub(r"\s+", " ", query).strip()
-
-        # Expected and actual queries after normalization
-        expected_query = normalize_query("""
-            SELECT id FROM match
-            WHERE tournament_id = $1 AND finished = False AND tournament_type = 'Knockout'
-        """)
-        actual_query = normalize_query(mock_read_query.call_args[0][0])
-
         # Assertions
         assert result is True
-        assert actual_query == expected_query  # Compare normalized queries
-        mock_update_query.assert_called()
-        mock_get_scores.assert_called()
-        mock_create_match.assert_called()
+        round_query = mock_transaction.read_query.call_args_list[0][0][0]
+        assert "UPDATE match" in round_query
+        assert "ROW_NUMBER()" in round_query
+        copied = {call.args[0]: call.args[1] for call in mock_transaction.copy_records.call_args_list}
+        assert copied["match"] == [(3, "Score limited", last_date + timedelta(days=1), tournament_id, "Knockout")]
+        assert copied["match_participants"] == [(3, 11), (3, 12)]
+        mock_transaction.update_query.assert_not_called()
+        mock_notify.assert_called_once_with([
+            (last_date + timedelta(days=1), [(11, "John Doe"), (12, "Jane Smith")])
+        ])
+
+
+@pytest.mark.asyncio
+async def test_advance_knockout_tournament_final(mock_transaction):
+    tournament_id = 1
+
+    with patch("services.match_service.notify_match_participants", new_callable=AsyncMock) as mock_notify:
+        mock_transaction.read_query.return_value = [
+            (1, 11, "John Doe", 10, 5, "Score limited", datetime.now())
+        ]
+
+        result = await tournament_service.advance_knockout_tournament(tournament_id)
+
+        assert result == "Tournament 1 has concluded. Winner: John Doe, Score: 10:5"
+        mock_transaction.update_query.assert_called_once()
+        assert mock_transaction.update_query.call_args[0][1:] == (tournament_id, 11)
+        mock_transaction.copy_records.assert_not_called()
+        mock_notify.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_advance_knockout_tournament_no_matches(mock_transaction):
+    result = await tournament_service.advance_knockout_tournament(1)
+
+    assert result is False
+    mock_transaction.copy_records.assert_not_called()
 
 
 
 
 
 @pytest.mark.asyncio
-async def test_create_knockout_matches(mock_tournament_data: Tournament, mock_participants: list[str]):
+async def test_create_knockout_matches(mock_tournament_data: Tournament, mock_participants: list[str], mock_profiles, mock_transaction):
     tournament_id = 1
 
-    with patch("services.player_profile_service.get_player_profile_by_name", new_callable=AsyncMock) as mock_get_profile, \
-         patch("data.database.DatabaseConnection.update_query", new_callable=AsyncMock) as mock_update_query, \
+    with patch("services.player_profile_service.resolve_profiles_by_names", new_callable=AsyncMock) as mock_resolve, \
+         patch("services.match_service.notify_match_participants", new_callable=AsyncMock) as mock_notify, \
          patch("services.match_service.create", new_callable=AsyncMock) as mock_create_match:
 
-        # Mock player profile retrieval
-        mock_get_profile.return_value = PlayerProfile(
-            id=1, full_name="John Doe", country="USA", sports_club="", wins=0, losses=0, draws=0
-        )
-        # Mock database updates
-        mock_update_query.return_value = True
-        # Mock match creation
-        mock_create_match.return_value = True
+        # Mock roster resolution
+        mock_resolve.return_value = mock_profiles
+        mock_transaction.read_query.return_value = [(10,), (11,)]
 
         # Call the service function
         result = await tournament_service.create_knockout_matches(tournament_id, mock_participants, "Score limited")
 
         # Assertions
         assert result is True
-        mock_get_profile.assert_called()
-        mock_update_query.assert_called()
-        mock_create_match.assert_called()
+        mock_resolve.assert_called_once_with(mock_participants)
+        # 4 players -> 2 first-round matches: ids reserved in one query, then three COPY batches
+        mock_create_match.assert_not_called()
+        mock_transaction.update_query.assert_not_called()
+        mock_transaction.read_query.assert_called_once()
+        copied = {call.args[0]: call.args[1] for call in mock_transaction.copy_records.call_args_list}
+        assert sorted(copied["tournament_participants"]) == [(1, 1), (1, 2), (1, 3), (1, 4)]
+        assert [row[0] for row in copied["match"]] == [10, 11]
+        assert all(row[4] == "Knockout" for row in copied["match"])
+        assert sorted(player_id for _, player_id in copied["match_participants"]) == [1, 2, 3, 4]
+
+        # Linked users are notified once, after the transaction, for the whole bracket
+        fixtures, = mock_notify.call_args[0]
+        assert len(fixtures) == 2
+
+
+@pytest.mark.asyncio
+async def test_create_knockout_matches_failure_creates_nothing(mock_participants: list[str], mock_profiles, mock_transaction):
+    with patch("services.player_profile_service.resolve_profiles_by_names", new_callable=AsyncMock) as mock_resolve, \
+         patch("services.match_service.notify_match_participants", new_callable=AsyncMock) as mock_notify:
+
+        mock_resolve.return_value = mock_profiles
+        mock_transaction.copy_records.side_effect = Exception("copy failed")
+
+        result = await tournament_service.create_knockout_matches(1, mock_participants, "Score limited")
+
+        assert result is False
+        mock_notify.assert_not_called()
 
 
 
 @pytest.mark.asyncio
-async def test_create_league_matches(mock_tournament_data: Tournament, mock_participants: list[str]):
+async def test_create_league_matches(mock_tournament_data: Tournament, mock_participants: list[str], mock_profiles, mock_transaction):
     tournament_id = 1
 
-    with patch("services.player_profile_service.get_player_profile_by_name", new_callable=AsyncMock) as mock_get_profile, \
-         patch("data.database.DatabaseConnection.update_query", new_callable=AsyncMock) as mock_update_query, \
-         patch("data.database.DatabaseConnection.insert_query", new_callable=AsyncMock) as mock_insert_query:
+    with patch("services.player_profile_service.resolve_profiles_by_names", new_callable=AsyncMock) as mock_resolve:
 
-        # Mock player profile retrieval
-        mock_get_profile.return_value = PlayerProfile(
-            id=1, full_name="John Doe", country="USA", sports_club="", wins=0, losses=0, draws=0
-        )
-        # Mock database updates
-        mock_update_query.return_value = True
-        # Mock match creation
-        mock_insert_query.side_effect = lambda query, *args: 1 if query.startswith("INSERT INTO match") else None
+        # Mock roster resolution
+        mock_resolve.return_value = mock_profiles
+
+        mock_transaction.read_query.return_value = [(match_id,) for match_id in range(10, 16)]
 
         # Call the service function
         result = await tournament_service.create_league_matches(tournament_id, mock_participants, "Score limited")
 
         # Assertions
         assert result is True
-        mock_get_profile.assert_called()
-        mock_update_query.assert_called()
-        mock_insert_query.assert_called()
+        mock_resolve.assert_called_once_with(mock_participants)
+        # 4 players -> 6 pairings: match ids reserved in one query, then three COPY batches
+        mock_transaction.read_query.assert_called_once()
+        mock_transaction.insert_query.assert_not_called()
+        # Standings rows are seeded from the copied participants
+        mock_transaction.update_query.assert_called_once()
+        assert "INSERT INTO league_standings" in mock_transaction.update_query.call_args[0][0]
+        copied = {call.args[0]: call.args[1] for call in mock_transaction.copy_records.call_args_list}
+        assert len(copied["tournament_participants"]) == 4
+        assert [row[0] for row in copied["match"]] == list(range(10, 16))
+        assert len(copied["match_participants"]) == 12
+
+
+@pytest.mark.asyncio
+async def test_insert_fixtures_empty(mock_transaction):
+    match_ids = await tournament_service.insert_fixtures(mock_transaction, 1, "League", "Score limited", [])
+
+    assert match_ids == []
+    mock_transaction.read_query.assert_not_called()
+    mock_transaction.copy_records.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_league_standings():
+    with patch("data.database.DatabaseConnection.read_query", new_callable=AsyncMock) as mock_read_query, \
+         patch("data.database.DatabaseConnection.update_query", new_callable=AsyncMock) as mock_update_query:
+        mock_read_query.return_value = [
+            (1, "John Doe", 7, 2, 0, 1, 12, 5),
+            (2, "Jane Smith", 4, 1, 1, 1, 8, 9),
+        ]
+
+        result = await tournament_service.get_league_standings(1)
+
+        assert [standing["Rank"] for standing in result] == [1, 2]
+        assert result[0] == {
+            "Rank": 1, "Player": "John Doe", "Points": 7, "Wins": 2, "Losses": 0, "Draws": 1,
+            "Score For": 12, "Score Against": 5
+        }
+        mock_read_query.assert_called_once()
+        mock_update_query.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_league_standings_unfinished():
+    with patch("data.database.DatabaseConnection.read_query", new_callable=AsyncMock) as mock_read_query:
+        mock_read_query.return_value = []
+
+        result = await tournament_service.get_league_standings(1)
+
+        assert result is None
+
+
+@pytest.mark.asyncio
+async def test_get_latest():
+    with patch("data.database.DatabaseConnection.read_query", new_callable=AsyncMock) as mock_read_query:
+        mock_read_query.return_value = [
+            (9, "Autumn Cup", "Knockout", "Score limited", 500, True, "John Doe"),
+            (8, "Summer League", "League", "Time limited", 100, False, None),
+        ]
+
+        result = await tournament_service.get_latest(3)
+
+        assert [tournament["id"] for tournament in result] == [9, 8]
+        assert result[0]["winner_name"] == "John Doe"
+        assert result[1]["has_winner"] is False
+        assert mock_read_query.call_args[0][1:] == (3,)
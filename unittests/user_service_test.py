@@ -1,12 +1,13 @@
 import pytest
 import pytest_asyncio
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from datetime import datetime, timedelta
 from passlib.hash import bcrypt
 from jose import jwt
 from data.models import User, Requests
 from services.user_service import approve_player_claim, claim_type, all_requests, claim_director_request, claim_request, \
-    is_director, is_admin, login_user, create_user, get_user_by_id, all_users, approve_director_claim
+    is_director, is_admin, login_user, create_user, get_user_by_id, all_users, approve_director_claim, \
+    request_auth_scope, validate_token_with_session, SessionManager, get_cached_user, user_cache, login_timing_stats
 
 pytestmark = pytest.mark.asyncio
 
@@ -23,10 +24,11 @@ def mock_user():
     )
 
 
-@pytest.fixture
-def mock_token():
+@pytest_asyncio.fixture
+async def mock_token():
     expire = datetime.now().astimezone() + timedelta(minutes=60)
     payload = {"id": 1, "email": "john@example.com", "exp": expire}
+    await SessionManager.update_session(1, "john@example.com")
     return jwt.encode(payload, "6a631f3a77008d5586d9ecc2ca7bea47695d575b5e6195dd6ca200829a8ae40c", "HS256")
 
 
@@ -58,6 +60,19 @@ async def test_get_user_by_id_not_exists():
         assert user is None
 
 
+@pytest.mark.asyncio
+async def test_get_cached_user_reads_database_once():
+    user_cache.clear()
+    mock_user_data = [(1, "John", "Doe", "johndoe", "hashedpassword123", "john@example.com", False, False, None)]
+    with patch('data.database.DatabaseConnection.read_query') as mock_query:
+        mock_query.return_value = mock_user_data
+        first = await get_cached_user(1)
+        second = await get_cached_user(1)
+        assert first.id == second.id == 1
+        mock_query.assert_called_once()
+    user_cache.clear()
+
+
 @pytest.mark.asyncio
 async def test_create_user_success(mock_user):
     with (
@@ -82,43 +97,51 @@ async def test_create_user_duplicate(mock_user):
 
 
 @pytest.mark.asyncio
-async def test_login_user_success(mock_user):
+async def test_login_user_success():
     hashed_password = bcrypt.hash("password123")
-    mock_user.password = hashed_password
 
-    with (
-        patch('data.database.DatabaseConnection.read_query') as mock_query,
-        patch('services.user_service.get_user_by_id') as mock_get_user
-    ):
-        mock_query.return_value = [(1,)]
-        mock_get_user.return_value = mock_user
+    with patch('data.database.DatabaseConnection.read_query') as mock_query:
+        mock_query.return_value = [(1, "john@example.com", hashed_password)]
 
         result = await login_user("john@example.com", "password123")
         assert result is not None
         assert "access_token" in result
         assert result["token_type"] == "bearer"
+        mock_query.assert_called_once()
 
 
 @pytest.mark.asyncio
-async def test_login_user_invalid_password(mock_user):
+async def test_login_user_invalid_password():
     hashed_password = bcrypt.hash("password123")
-    mock_user.password = hashed_password
 
+    with patch('data.database.DatabaseConnection.read_query') as mock_query:
+        mock_query.return_value = [(1, "john@example.com", hashed_password)]
+
+        result = await login_user("john@example.com", "wrongpassword")
+        assert result is None
+
+
+@pytest.mark.asyncio
+async def test_login_user_unknown_email_still_verifies_a_hash():
+    before = login_timing_stats()["logins"]
     with (
         patch('data.database.DatabaseConnection.read_query') as mock_query,
-        patch('services.user_service.get_user_by_id') as mock_get_user
+        patch('services.user_service.password_hasher.verify', new_callable=AsyncMock) as mock_verify
     ):
-        mock_query.return_value = [(1,)]
-        mock_get_user.return_value = mock_user
+        mock_query.return_value = []
+        mock_verify.return_value = True
 
-        result = await login_user("john@example.com", "wrongpassword")
+        result = await login_user("nobody@example.com", "password123")
         assert result is None
+        mock_verify.assert_called_once()
+        assert mock_verify.call_args[0][1].startswith("$2b$")
+    assert login_timing_stats()["logins"] == before + 1
 
 
 @pytest.mark.asyncio
 async def test_is_admin_success(mock_token):
     with patch('data.database.DatabaseConnection.read_query') as mock_query:
-        mock_query.return_value = [(True,)]
+        mock_query.return_value = [(1, "john@example.com", True, False)]
         result = await is_admin(mock_token)
         assert result is True
 
@@ -126,7 +149,7 @@ async def test_is_admin_success(mock_token):
 @pytest.mark.asyncio
 async def test_is_admin_not_admin(mock_token):
     with patch('data.database.DatabaseConnection.read_query') as mock_query:
-        mock_query.return_value = [(False,)]
+        mock_query.return_value = [(1, "john@example.com", False, False)]
         result = await is_admin(mock_token)
         assert result is False
 
@@ -134,10 +157,52 @@ async def test_is_admin_not_admin(mock_token):
 @pytest.mark.asyncio
 async def test_is_director_success(mock_token):
     with patch('data.database.DatabaseConnection.read_query') as mock_query:
-        mock_query.return_value = [(True,)]
+        mock_query.return_value = [(1, "john@example.com", False, True)]
         result = await is_director(mock_token)
         assert result is True
 
+
+@pytest.mark.asyncio
+async def test_role_checks_resolve_principal_once_per_request(mock_token):
+    with patch('data.database.DatabaseConnection.read_query') as mock_query, \
+         patch('services.user_service.jwt.decode', wraps=jwt.decode) as mock_decode:
+        mock_query.return_value = [(1, "john@example.com", False, True)]
+
+        with request_auth_scope():
+            assert await validate_token_with_session(mock_token)
+            assert await is_admin(mock_token) is False
+            assert await is_director(mock_token) is True
+
+        mock_query.assert_called_once()
+        mock_decode.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_session_activity_is_written_once_per_granularity(mock_token):
+    backend = SessionManager.backend
+    before = SessionManager.touch_stats()
+
+    # A fresh session is not touched again on the next requests
+    assert await validate_token_with_session(mock_token)
+    assert await validate_token_with_session(mock_token)
+    stats = SessionManager.touch_stats()
+    assert stats["skipped"] == before["skipped"] + 2
+    assert stats["written"] == before["written"]
+
+    stale = datetime.now() - timedelta(minutes=5)
+    await backend.save(1, "john@example.com", stale)
+    assert await validate_token_with_session(mock_token)
+    assert SessionManager.touch_stats()["written"] == before["written"] + 1
+    assert (await backend.get(1))["last_activity"] > stale
+
+
+@pytest.mark.asyncio
+async def test_is_admin_invalid_token():
+    with patch('data.database.DatabaseConnection.read_query') as mock_query:
+        assert await is_admin("not-a-token") is False
+        assert await is_admin(None) is False
+        mock_query.assert_not_called()
+
 @pytest.mark.asyncio
 async def test_claim_director_request_success(mock_token):
     with patch('data.database.DatabaseConnection.insert_query') as mock_insert:
@@ -172,22 +237,25 @@ async def test_claim_type_director():
 
 
 @pytest.mark.asyncio
-async def test_approve_player_claim_success():
-    with (
-        patch('data.database.DatabaseConnection.update_query') as mock_update
-    ):
-        mock_update.return_value = True
-        result = await approve_player_claim(1)
-        assert result is True
-        assert mock_update.call_count == 2
+async def test_approve_player_claim_success(mock_transaction):
+    result = await approve_player_claim(1)
+    assert result is True
+    mock_transaction.update_query.assert_called_once()
+    mock_transaction.read_query.assert_called_once()
 
 
 @pytest.mark.asyncio
-async def test_approve_director_claim_success():
-    with (
-        patch('data.database.DatabaseConnection.update_query') as mock_update
-    ):
-        mock_update.return_value = True
-        result = await approve_director_claim(1)
-        assert result is True
-        assert mock_update.call_count == 2
\ No newline at end of file
+async def test_approve_director_claim_success(mock_transaction):
+    result = await approve_director_claim(1)
+    assert result is True
+    mock_transaction.update_query.assert_called_once()
+    mock_transaction.read_query.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_approve_player_claim_invalidates_cached_user(mock_transaction, mock_user):
+    user_cache.set(1, mock_user)
+    mock_transaction.read_query.return_value = [(1, "Doe", "john@example.com")]
+    with patch('services.user_service.notify_user_request_handled', new_callable=AsyncMock):
+        result = await approve_player_claim(1)
+    assert result is True
+    assert 1 not in user_cache